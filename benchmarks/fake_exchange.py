@@ -0,0 +1,197 @@
+import asyncio
+import json
+import multiprocessing
+import random
+import socket
+import time
+from aiohttp import WSMsgType, web
+from typing import Dict, List, Optional
+from .fixtures import FixtureUniverse
+
+try:
+    import orjson
+    def _dumps(data) -> bytes:
+        return orjson.dumps(data)
+except ImportError:
+    def _dumps(data) -> bytes:
+        return json.dumps(data).encode()
+
+CANDLES_PATH = "/market_data/candlesticks"
+INSTRUMENTS_PATH = "/exchange/v1/derivatives/futures/data/active_instruments"
+FEED_PATH = "/ws"
+
+class FakeExchange:
+    """Local stand-in for the CoinDCX candlestick and active_instruments endpoints.
+
+    Every response is delayed by `latency` seconds (uniform +/-50% jitter) and a fraction
+    `error_rate` of candle requests fails with a 429 (with Retry-After) or a 503. The `/ws`
+    live feed streams random-walk trades for the subscribed pairs at `feed_rate` per second,
+    continuing from the latest fixture close.
+    """
+
+    def __init__(self, universe: FixtureUniverse, latency: float = 0.0, error_rate: float = 0.0,
+                 seed: int = 0, feed_rate: float = 200.0):
+        self.universe = universe
+        self.latency = latency
+        self.error_rate = error_rate
+        self.feed_rate = feed_rate
+        self.random = random.Random(seed)
+        self.stats = {'requests': 0, 'errors': 0, 'bytes_sent': 0}
+
+    async def _delay(self):
+        if self.latency > 0:
+            await asyncio.sleep(self.latency * self.random.uniform(0.5, 1.5))
+
+    def _respond(self, data) -> web.Response:
+        body = _dumps(data)
+        self.stats['bytes_sent'] += len(body)
+        return web.Response(body=body, content_type='application/json')
+
+    async def handle_instruments(self, request: web.Request) -> web.Response:
+        self.stats['requests'] += 1
+        await self._delay()
+        return self._respond(self.universe.pairs)
+
+    async def handle_candles(self, request: web.Request) -> web.Response:
+        self.stats['requests'] += 1
+        await self._delay()
+
+        if self.error_rate > 0 and self.random.random() < self.error_rate:
+            self.stats['errors'] += 1
+            if self.random.random() < 0.5:
+                return web.Response(status=429, headers={'Retry-After': '0.1'})
+            return web.Response(status=503)
+
+        query = request.query
+        bars = self.universe.bars(query['pair'], query['resolution'], int(query['from']), int(query['to']))
+        return self._respond({'s': 'ok', 'data': bars})
+
+    async def _stream_trades(self, ws: web.WebSocketResponse, pairs: List[str]):
+        prices = {pair: float(self.universe.series[pair]['15']['close'][-1])
+                  for pair in pairs if '15' in self.universe.series.get(pair, {})}
+        pairs = list(prices)
+        if not pairs:
+            return
+        # Batch trades into ~100 frames per second so high rates do not need sub-millisecond sleeps
+        frame_interval = max(1.0 / self.feed_rate, 0.01)
+        per_frame = max(int(round(self.feed_rate * frame_interval)), 1)
+        while not ws.closed:
+            trades = []
+            for _ in range(per_frame):
+                pair = self.random.choice(pairs)
+                prices[pair] *= 1 + self.random.gauss(0, 0.001)
+                trades.append({
+                    'type': 'trade',
+                    'pair': pair,
+                    'price': prices[pair],
+                    'quantity': self.random.lognormvariate(2, 1),
+                    'time': int(time.time() * 1000)
+                })
+            await ws.send_bytes(_dumps(trades))
+            await asyncio.sleep(frame_interval)
+
+    async def handle_feed(self, request: web.Request) -> web.WebSocketResponse:
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        sender = None
+        try:
+            async for message in ws:
+                if message.type != WSMsgType.TEXT:
+                    continue
+                command = json.loads(message.data)
+                if command.get('type') == 'subscribe' and sender is None:
+                    sender = asyncio.ensure_future(self._stream_trades(ws, command.get('pairs', [])))
+        finally:
+            if sender is not None:
+                sender.cancel()
+        return ws
+
+    async def handle_stats(self, request: web.Request) -> web.Response:
+        return self._respond(self.stats)
+
+    async def handle_reset(self, request: web.Request) -> web.Response:
+        self.stats = {key: 0 for key in self.stats}
+        return self._respond(self.stats)
+
+    def make_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get(CANDLES_PATH, self.handle_candles)
+        app.router.add_get(INSTRUMENTS_PATH, self.handle_instruments)
+        app.router.add_get(FEED_PATH, self.handle_feed)
+        app.router.add_get("/stats", self.handle_stats)
+        app.router.add_post("/stats/reset", self.handle_reset)
+        return app
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def _serve(port: int, universe_options: Dict, latency: float, error_rate: float, feed_rate: float, ready):
+    universe = FixtureUniverse.load(universe_options['fixture']) if universe_options.get('fixture') \
+        else FixtureUniverse.from_exports(**universe_options['generate'])
+    exchange = FakeExchange(universe, latency=latency, error_rate=error_rate, feed_rate=feed_rate)
+
+    async def run():
+        runner = web.AppRunner(exchange.make_app(), access_log=None)
+        await runner.setup()
+        await web.TCPSite(runner, '127.0.0.1', port).start()
+        ready.set()
+        while True:
+            await asyncio.sleep(3600)
+
+    asyncio.run(run())
+
+
+class FakeExchangeProcess:
+    """Runs a FakeExchange in its own process so serving does not compete with the analyzer's event loop"""
+
+    def __init__(self, universe_options: Dict, latency: float = 0.0, error_rate: float = 0.0,
+                 port: Optional[int] = None, feed_rate: float = 200.0):
+        self.port = port or free_port()
+        self.universe_options = universe_options
+        self.latency = latency
+        self.error_rate = error_rate
+        self.feed_rate = feed_rate
+        self.process: Optional[multiprocessing.Process] = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    @property
+    def feed_url(self) -> str:
+        return f"ws://127.0.0.1:{self.port}{FEED_PATH}"
+
+    def point_fetcher(self, data_fetcher):
+        data_fetcher.base_url = self.base_url + CANDLES_PATH
+        data_fetcher.active_instruments_url = (self.base_url + INSTRUMENTS_PATH +
+                                               "?margin_currency_short_name[]=USDT")
+
+    def start(self, timeout: float = 120.0):
+        context = multiprocessing.get_context('spawn')
+        ready = context.Event()
+        self.process = context.Process(
+            target=_serve,
+            args=(self.port, self.universe_options, self.latency, self.error_rate, self.feed_rate, ready),
+            daemon=True
+        )
+        self.process.start()
+        if not ready.wait(timeout):
+            self.stop()
+            raise RuntimeError("Fake exchange did not start")
+
+    def stop(self):
+        if self.process is not None:
+            self.process.terminate()
+            self.process.join()
+            self.process = None
+
+    def __enter__(self) -> 'FakeExchangeProcess':
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
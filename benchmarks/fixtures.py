@@ -0,0 +1,128 @@
+import glob
+import gzip
+import json
+import os
+import time
+import zlib
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Optional
+
+RESOLUTIONS = ['15', '30', '60', '240', '1D']
+
+def resolution_seconds(resolution: str) -> int:
+    return 24 * 60 * 60 if resolution == '1D' else int(resolution) * 60
+
+class FixtureUniverse:
+    """Candle series served by the fake exchange, stored relative to the latest bar.
+
+    A universe is either generated from the shapes in `exports/` CSVs (per-timeframe
+    20-bar price change and recent/average volume ratio) or loaded from a recorded
+    fixture file. Bar times are anchored so the latest bar of every series is the one
+    forming at `anchor`, which lets incremental `from`/`to` requests behave like live ones.
+    """
+
+    def __init__(self, series: Dict[str, Dict[str, Dict[str, np.ndarray]]], anchor: Optional[float] = None):
+        # series[pair][resolution] -> {'open', 'high', 'low', 'close', 'volume'}, oldest bar first
+        self.series = series
+        # The latest bar of every series is the one forming at `anchor`
+        self.anchor = anchor if anchor is not None else time.time()
+
+    @property
+    def pairs(self) -> List[str]:
+        return list(self.series)
+
+    @staticmethod
+    def _shapes_from_exports(exports_glob: str) -> pd.DataFrame:
+        files = sorted(glob.glob(exports_glob))
+        if not files:
+            raise FileNotFoundError(f"No export CSVs match '{exports_glob}'")
+        return pd.concat([pd.read_csv(f) for f in files], ignore_index=True)
+
+    @staticmethod
+    def _generate_series(seed: int, price_change: float, volume_ratio: float,
+                         n_bars: int, resolution: str) -> Dict[str, np.ndarray]:
+        rng = np.random.default_rng(seed)
+        scale = np.sqrt(resolution_seconds(resolution) / 900)
+        returns = rng.normal(0, 0.004 * scale, n_bars)
+        # Spread the exported 20-bar price change over the last 19 returns
+        returns[-19:] += np.log1p(price_change / 100) / 19 - returns[-19:].mean()
+        close = np.exp(rng.uniform(-3, 6)) * np.exp(np.cumsum(returns))
+        open_ = np.concatenate([[close[0]], close[:-1]])
+        spread = np.abs(rng.normal(0, 0.002 * scale, n_bars)) * close
+        volume = rng.lognormal(8, 0.5, n_bars)
+        recent = volume[-5:].mean()
+        volume[-5:] *= max(volume_ratio, 0.05) * volume[:-5].mean() / recent
+        return {
+            'open': open_,
+            'high': np.maximum(open_, close) + spread,
+            'low': np.minimum(open_, close) - spread,
+            'close': close,
+            'volume': volume
+        }
+
+    @classmethod
+    def from_exports(cls, exports_glob: str = os.path.join("exports", "crypto_momentum_analysis_*.csv"),
+                     size: int = 330, n_bars: int = 300, seed: int = 7) -> 'FixtureUniverse':
+        shapes = cls._shapes_from_exports(exports_glob)
+        series = {}
+        for i in range(size):
+            row = shapes.iloc[i % len(shapes)]
+            base = row['Pair'].replace('/USDT', '')
+            name = base if i < len(shapes) else f"{base}{i // len(shapes)}"
+            pair = f"B-{name}_USDT"
+            series[pair] = {}
+            for resolution in RESOLUTIONS:
+                price_change = row.get(f'Price_Change_{resolution}')
+                volume_ratio = row.get(f'Volume_Ratio_{resolution}')
+                if pd.isna(price_change) or pd.isna(volume_ratio):
+                    continue
+                pair_seed = zlib.crc32(f"{seed}:{pair}:{resolution}".encode())
+                series[pair][resolution] = cls._generate_series(pair_seed, price_change, volume_ratio,
+                                                                n_bars, resolution)
+        return cls(series)
+
+    @classmethod
+    def load(cls, path: str) -> 'FixtureUniverse':
+        """Load a recorded fixture (see `record`) of raw candlestick responses"""
+        with gzip.open(path, 'rt') as f:
+            raw = json.load(f)
+        series = {}
+        for pair, resolutions in raw.items():
+            series[pair] = {}
+            for resolution, bars in resolutions.items():
+                bars = sorted(bars, key=lambda bar: bar['time'])
+                series[pair][resolution] = {
+                    field: np.array([bar[field] for bar in bars], dtype=float)
+                    for field in ('open', 'high', 'low', 'close', 'volume')
+                }
+        return cls(series)
+
+    @staticmethod
+    def record(responses: Dict[str, Dict[str, List[Dict]]], path: str):
+        """Store raw `data` lists of candlestick responses, keyed by pair and resolution"""
+        with gzip.open(path, 'wt') as f:
+            json.dump(responses, f)
+
+    def bars(self, pair: str, resolution: str, start: int, end: int) -> List[Dict]:
+        """Bars whose open time falls in [start, end] seconds"""
+        data = self.series.get(pair, {}).get(resolution)
+        if data is None:
+            return []
+
+        interval = resolution_seconds(resolution)
+        n_bars = len(data['close'])
+        latest = int(self.anchor) // interval * interval
+        times = latest - (n_bars - 1 - np.arange(n_bars)) * interval
+        selected = np.flatnonzero((times >= start) & (times <= end))
+        return [
+            {
+                'open': float(data['open'][i]),
+                'high': float(data['high'][i]),
+                'low': float(data['low'][i]),
+                'close': float(data['close'][i]),
+                'volume': float(data['volume'][i]),
+                'time': int(times[i]) * 1000
+            }
+            for i in selected
+        ]
@@ -0,0 +1,100 @@
+"""Per-pair reference implementations the batch engine and vectorized score are checked against.
+
+They are the analyzer's original pandas/`ta` code paths, kept out of `src` so a cycle never
+imports `ta`; the stages benchmark fails when the batch results drift from them.
+"""
+
+import numpy as np
+import pandas as pd
+from typing import Dict, Optional
+
+def reference_indicators(df: pd.DataFrame) -> Optional[Dict]:
+    """Indicators of one pair and timeframe from its candle frame, computed with `ta` and pandas"""
+    if len(df) < 30:
+        return None
+
+    import ta
+
+    rsi = ta.momentum.RSIIndicator(df['close'], window=14).rsi()
+    current_rsi = rsi.iloc[-1] if not pd.isna(rsi.iloc[-1]) else 50
+
+    recent_volume = df['volume'].iloc[-5:].mean()
+    avg_volume = df['volume'].mean()
+    volume_ratio = recent_volume / avg_volume if avg_volume > 0 else 1
+
+    price_change = ((df['close'].iloc[-1] - df['close'].iloc[-20]) / df['close'].iloc[-20]) * 100 if len(df) >= 20 else 0
+
+    return {
+        'rsi': current_rsi,
+        'volume_ratio': volume_ratio,
+        'price_change': price_change,
+        'current_price': df['close'].iloc[-1],
+        'volume': recent_volume
+    }
+
+def max_indicator_difference(table: pd.DataFrame, pairs, frames: Dict[str, Dict[str, pd.DataFrame]]) -> float:
+    """Largest absolute difference between a results table's indicators and the reference ones"""
+    rows = {pair: row for row, pair in enumerate(table['pair'])}
+    worst = 0.0
+    for pair in pairs:
+        for tf, df in frames[pair].items():
+            expected = reference_indicators(df)
+            for field, value in (expected or {}).items():
+                actual = table[f"{field}_{tf}"].iloc[rows[pair]]
+                difference = abs(float(actual) - float(value))
+                if np.isnan(difference):
+                    return np.nan
+                worst = max(worst, difference)
+    return worst
+
+def reference_score(timeframe_data: Dict, timeframes: Dict, weights: Dict[str, float]) -> float:
+    """Momentum score of one pair from its per-timeframe `{'indicators': ...}` dicts, one timeframe at a time"""
+    total_score = 0
+    total_weight = 0
+
+    for tf, data in timeframe_data.items():
+        if data and data.get('indicators'):
+            indicators = data['indicators']
+            weight = timeframes[tf]['weight']
+
+            base_score = 0.5
+
+            rsi = indicators.get('rsi', 50)
+            if 50 <= rsi <= 70:
+                rsi_score = 0.8
+            elif 70 < rsi <= 80:
+                rsi_score = 0.6
+            elif rsi > 80:
+                rsi_score = 0.3
+            elif 40 <= rsi < 50:
+                rsi_score = 0.4
+            else:
+                rsi_score = 0.2
+
+            volume_ratio = indicators.get('volume_ratio', 1)
+            volume_score = min(volume_ratio / 1.5, 1.0) if volume_ratio >= 1.5 else volume_ratio / 1.5
+
+            price_change = indicators.get('price_change', 0)
+            price_score = min(max(price_change / 10 + 0.5, 0), 1)
+
+            tf_score = (base_score * weights['base_bullish'] +
+                        rsi_score * weights['rsi'] +
+                        volume_score * weights['volume'] +
+                        price_score * weights['price_change'])
+
+            total_score += tf_score * weight
+            total_weight += weight
+
+    return total_score / total_weight if total_weight > 0 else 0
+
+def max_score_difference(table: pd.DataFrame, pairs, frames: Dict[str, Dict[str, pd.DataFrame]],
+                         timeframes: Dict, weights: Dict[str, float]) -> float:
+    """Largest absolute difference between a results table's scores and the reference scores"""
+    scores = dict(zip(table['pair'], table['momentum_score'].tolist()))
+    worst = 0.0
+    for pair in pairs:
+        if pair not in scores:
+            continue
+        timeframe_data = {tf: {'indicators': reference_indicators(df)} for tf, df in frames[pair].items()}
+        worst = max(worst, abs(scores[pair] - reference_score(timeframe_data, timeframes, weights)))
+    return worst
@@ -0,0 +1,372 @@
+#!/usr/bin/env python3
+"""Offline performance benchmarks against a local fake exchange.
+
+    python -m benchmarks.run_benchmarks --pairs 330 --latency 0.05
+    python -m benchmarks.run_benchmarks --pairs 5000 --save-baseline
+    python -m benchmarks.run_benchmarks --pairs 5000 --check
+
+`--save-baseline` stores the measured values for the scenario in benchmarks/baselines.json;
+`--check` compares against them and exits non-zero when any metric regresses by more than
+`--tolerance`. The startup group also fails outright when importing the analyzer takes longer
+than `--import-budget` or a headless run loads chart or progress-bar modules.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import aiohttp
+import numpy as np
+import pandas as pd
+from typing import Callable, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fake_exchange import FakeExchangeProcess
+from benchmarks.fixtures import FixtureUniverse
+from benchmarks.reference import max_indicator_difference, max_score_difference
+from src.crypto_analyzer import CryptoMomentumAnalyzer
+from src.data_fetcher import DataFetcher
+from src.indicator_engine import CandleSeries
+from src.live_stream import LiveMomentumStream
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE_PATH = os.path.join(REPO_ROOT, "benchmarks", "baselines.json")
+# Stage timings below this many seconds are too noisy to gate on
+MIN_GATED_SECONDS = 0.05
+# Batch indicators may differ from the per-pair reference by at most this much
+PARITY_TOLERANCE = 1e-9
+# Modules a scores-only run must never import
+HEAVY_MODULES = ('matplotlib', 'tqdm', 'ta')
+
+STARTUP_PROBE = """
+import json, sys, time
+started = time.perf_counter()
+from main import analyzer_options
+from src.crypto_analyzer import CryptoMomentumAnalyzer
+imported = time.perf_counter()
+# What `main.py --once --outputs json` builds
+analyzer = CryptoMomentumAnalyzer(**analyzer_options(['json']))
+constructed = time.perf_counter()
+analyzer.close()
+print(json.dumps({'import': imported - started, 'init': constructed - imported,
+                  'heavy': [name for name in HEAVY_MODULES if name in sys.modules],
+                  'dirs': sorted(os.listdir('.'))}))
+"""
+
+def scenario_key(args) -> str:
+    return (f"pairs={args.pairs},latency={args.latency},error_rate={args.error_rate},"
+            f"concurrency={args.concurrency},preset={args.chart_preset},feed_rate={args.feed_rate}")
+
+def universe_options(args) -> Dict:
+    if args.fixture:
+        return {'fixture': os.path.abspath(args.fixture)}
+    return {'generate': {'exports_glob': os.path.join(REPO_ROOT, "exports", "crypto_momentum_analysis_*.csv"),
+                         'size': args.pairs, 'seed': args.seed}}
+
+def best_of(func: Callable, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+@contextlib.contextmanager
+def quiet(enabled: bool):
+    if not enabled:
+        yield
+        return
+    with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+        yield
+
+async def _server_stats(session: aiohttp.ClientSession, exchange: FakeExchangeProcess, reset: bool = False) -> Dict:
+    method = session.post if reset else session.get
+    async with method(exchange.base_url + ("/stats/reset" if reset else "/stats")) as response:
+        return await response.json()
+
+async def bench_end_to_end(exchange: FakeExchangeProcess, workdir: str, args) -> Dict[str, float]:
+    """Cold and warm run_analysis cycles; the warm one reuses the candle store filled by the cold one"""
+    metrics_dir = os.path.join(workdir, "metrics")
+    # Both cycles write every artifact, so the warm one is not measured against skipped outputs
+    analyzer = CryptoMomentumAnalyzer(max_concurrent=args.concurrency, candle_db=os.path.join(workdir, "candles.db"),
+                                      chart_preset=args.chart_preset, metrics_dir=metrics_dir,
+                                      alerts_path=None, skip_unchanged=False, compact_after_days=None)
+    exchange.point_fetcher(analyzer.data_fetcher)
+    analyzer.data_fetcher.rate_limiter.rate = args.rate_limit
+    analyzer.data_fetcher.rate_limiter.capacity = args.rate_limit
+
+    measured = {}
+    async with aiohttp.ClientSession() as stats_session:
+        try:
+            for label in ('cold', 'warm'):
+                await _server_stats(stats_session, exchange, reset=True)
+                started = time.perf_counter()
+                with quiet(not args.verbose):
+                    await analyzer.run_analysis()
+                    await analyzer.wait_for_outputs()
+                elapsed = time.perf_counter() - started
+                served = await _server_stats(stats_session, exchange)
+
+                with open(os.path.join(metrics_dir, "cycle_metrics.jsonl")) as f:
+                    snapshot = json.loads(f.readlines()[-1])
+
+                fetch_seconds = snapshot['stages'].get('fetch', {}).get('wall_seconds', elapsed)
+                measured[f'e2e_{label}_cycle_seconds'] = elapsed
+                measured[f'e2e_{label}_requests_per_second'] = served['requests'] / max(fetch_seconds, 1e-9)
+                measured[f'e2e_{label}_requests'] = served['requests']
+                if snapshot['peak_rss_bytes'] is not None:
+                    measured[f'e2e_{label}_peak_rss_mb'] = snapshot['peak_rss_bytes'] / 2 ** 20
+                for name, stage in snapshot['stages'].items():
+                    measured[f'e2e_{label}_stage_{name}_seconds'] = stage['wall_seconds']
+        finally:
+            analyzer.close()
+    return measured
+
+async def bench_fetch(exchange: FakeExchangeProcess, pairs: List[str], args) -> Dict[str, float]:
+    """Raw DataFetcher throughput without the candle store, parsing included"""
+    fetcher = DataFetcher(args.concurrency)
+    exchange.point_fetcher(fetcher)
+    fetcher.rate_limiter.rate = args.rate_limit
+    fetcher.rate_limiter.capacity = args.rate_limit
+
+    async with aiohttp.ClientSession() as session:
+        started = time.perf_counter()
+        with quiet(not args.verbose):
+            await asyncio.gather(*[
+                fetcher.fetch_candlestick_data(session, pair, resolution)
+                for pair in pairs for resolution in ('15', '30', '60', '240', '1D')
+            ])
+        elapsed = time.perf_counter() - started
+    return {
+        'fetch_seconds': elapsed,
+        'fetch_requests_per_second': fetcher.stats['requests'] / elapsed
+    }
+
+async def bench_live(exchange: FakeExchangeProcess, workdir: str, args) -> Dict[str, float]:
+    """Live mode: score updates per second and trade-to-score latency against the fake trade feed"""
+    analyzer = CryptoMomentumAnalyzer(max_concurrent=args.concurrency, candle_db=os.path.join(workdir, "candles.db"),
+                                      metrics_dir=None)
+    exchange.point_fetcher(analyzer.data_fetcher)
+    analyzer.data_fetcher.rate_limiter.rate = args.rate_limit
+    analyzer.data_fetcher.rate_limiter.capacity = args.rate_limit
+    stream = LiveMomentumStream(analyzer, exchange.feed_url, report_interval=0)
+
+    latencies = []
+    handle_event = stream.handle_event
+    def timed_handle_event(event):
+        handle_event(event)
+        latencies.append(time.time() - event['time'] / 1000)
+    stream.handle_event = timed_handle_event
+
+    async with aiohttp.ClientSession() as session:
+        with quiet(not args.verbose):
+            await stream.seed(session, await analyzer.data_fetcher.get_active_instruments(session))
+        updates_before = stream.updates
+        started = time.perf_counter()
+        with quiet(not args.verbose):
+            try:
+                await asyncio.wait_for(stream._consume(session, list(stream.states)), args.live_seconds)
+            except asyncio.TimeoutError:
+                pass
+        elapsed = time.perf_counter() - started
+    analyzer.close()
+
+    latencies = np.sort(latencies) if latencies else np.array([np.nan])
+    return {
+        'live_updates_per_second': (stream.updates - updates_before) / elapsed,
+        'live_latency_p50_seconds': float(np.percentile(latencies, 50)),
+        'live_latency_p99_seconds': float(np.percentile(latencies, 99))
+    }
+
+def bench_startup(workdir: str, args) -> Dict[str, float]:
+    """Cold interpreter import and construction of a scores-only analyzer, as a cron run would pay it"""
+    probe = f"import os\nHEAVY_MODULES = {HEAVY_MODULES!r}\n" + STARTUP_PROBE
+    probe_dir = os.path.join(workdir, "startup")
+    os.makedirs(probe_dir, exist_ok=True)
+    env = dict(os.environ, PYTHONPATH=REPO_ROOT)
+
+    runs = []
+    for _ in range(args.repeat):
+        output = subprocess.run([sys.executable, "-c", probe], cwd=probe_dir, env=env,
+                                capture_output=True, text=True, check=True).stdout
+        runs.append(json.loads(output.splitlines()[-1]))
+
+    return {
+        'startup_import_seconds': min(run['import'] for run in runs),
+        'startup_headless_init_seconds': min(run['init'] for run in runs),
+        'startup_heavy_modules_loaded': float(max(len(run['heavy']) for run in runs)),
+        'startup_output_dirs_created': float(max(len(run['dirs']) for run in runs))
+    }
+
+def startup_violations(measured: Dict[str, float], budget: float) -> List[str]:
+    violations = []
+    if measured.get('startup_import_seconds', 0) > budget:
+        violations.append(f"importing the analyzer took {measured['startup_import_seconds']:.3f}s, budget {budget:.3f}s")
+    if measured.get('startup_heavy_modules_loaded', 0):
+        violations.append(f"a scores-only run imported one of {', '.join(HEAVY_MODULES)}")
+    if measured.get('startup_output_dirs_created', 0):
+        violations.append("a scores-only analyzer created output directories before writing anything")
+    return violations
+
+def parity_violations(measured: Dict[str, float]) -> List[str]:
+    violations = []
+    for metric, value in measured.items():
+        # NaN means a value was missing on one side
+        if metric.startswith('parity_') and not value <= PARITY_TOLERANCE:
+            violations.append(f"{metric} is {value:.3g}, tolerance {PARITY_TOLERANCE:g}")
+    return violations
+
+def bench_stages(universe: FixtureUniverse, args) -> Dict[str, float]:
+    """Each CPU-bound stage in isolation on in-memory fixture data"""
+    analyzer = CryptoMomentumAnalyzer(candle_db=None, metrics_dir=None, chart_preset=args.chart_preset)
+    pairs = universe.pairs
+    pair_series = [
+        {tf: CandleSeries(data['close'][-100:].copy(), data['volume'][-100:].copy())
+         for tf, data in universe.series[pair].items()}
+        for pair in pairs
+    ]
+
+    measured = {}
+    try:
+        with quiet(not args.verbose):
+            batch = analyzer.score_batch
+            measured['stage_score_batches_seconds'] = best_of(
+                lambda: [analyzer.score_pairs(pairs[i:i + batch], pair_series[i:i + batch])
+                         for i in range(0, len(pairs), batch)],
+                args.repeat
+            )
+            measured['stage_batch_analysis_seconds'] = best_of(lambda: analyzer.analyze_pairs(pairs, pair_series), args.repeat)
+
+            table = analyzer.analyze_pairs(pairs, pair_series)
+            frames = {pair: {tf: pd.DataFrame({'close': series.close, 'volume': series.volume})
+                             for tf, series in pair_series[i].items()} for i, pair in enumerate(pairs)}
+            measured['parity_indicators_max_abs_diff'] = max_indicator_difference(table, pairs, frames)
+            measured['parity_scores_max_abs_diff'] = max_score_difference(table, pairs, frames, analyzer.timeframes,
+                                                                          analyzer.scoring_weights)
+            measured['stage_scoring_seconds'] = best_of(lambda: analyzer.calculate_momentum_scores(table), args.repeat)
+            measured['stage_report_seconds'] = best_of(
+                lambda: analyzer.report_generator.generate_insights_report(table, analyzer.timeframes), args.repeat)
+            measured['stage_export_seconds'] = best_of(
+                lambda: analyzer.file_manager.export_results(table, analyzer.timeframes), args.repeat)
+            measured['stage_visualization_seconds'] = best_of(
+                lambda: analyzer.visualizer.create_visualizations(table, analyzer.timeframes), 1)
+    finally:
+        analyzer.close()
+    return measured
+
+def higher_is_better(metric: str) -> bool:
+    return metric.endswith('_per_second')
+
+def compare(measured: Dict[str, float], baseline: Dict[str, float], tolerance: float) -> List[str]:
+    regressions = []
+    for metric, base in baseline.items():
+        if metric not in measured or metric.endswith('_requests'):
+            continue
+        value = measured[metric]
+        if higher_is_better(metric):
+            if value < base * (1 - tolerance):
+                regressions.append(f"{metric}: {value:.3f} < baseline {base:.3f}")
+        elif metric.endswith('_seconds') and base < MIN_GATED_SECONDS:
+            continue
+        elif value > base * (1 + tolerance):
+            regressions.append(f"{metric}: {value:.3f} > baseline {base:.3f}")
+    return regressions
+
+def load_baselines() -> Dict:
+    if not os.path.exists(BASELINE_PATH):
+        return {}
+    with open(BASELINE_PATH) as f:
+        return json.load(f)
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Offline crypto momentum benchmarks")
+    parser.add_argument('--pairs', type=int, default=330, help="universe size (300-5000)")
+    parser.add_argument('--latency', type=float, default=0.02, help="mean fake exchange latency in seconds")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="fraction of candle requests that fail")
+    parser.add_argument('--concurrency', type=int, default=15)
+    parser.add_argument('--rate-limit', type=float, default=1000.0, help="client token bucket rate")
+    parser.add_argument('--chart-preset', default='preview')
+    parser.add_argument('--fixture', help="recorded fixture file instead of generated data")
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--repeat', type=int, default=3, help="repetitions for isolated stages (best is kept)")
+    parser.add_argument('--feed-rate', type=float, default=200.0, help="fake live feed trades per second")
+    parser.add_argument('--live-seconds', type=float, default=10.0, help="duration of the live mode benchmark")
+    parser.add_argument('--import-budget', type=float, default=1.0,
+                        help="seconds a cold `import src.crypto_analyzer` may take")
+    parser.add_argument('--only', choices=['e2e', 'fetch', 'stages', 'live', 'startup'], action='append',
+                        help="run only the given benchmark group(s)")
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--check', action='store_true')
+    parser.add_argument('--tolerance', type=float, default=0.25)
+    parser.add_argument('--verbose', action='store_true')
+    return parser.parse_args(argv)
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    groups = args.only or ['startup', 'e2e', 'fetch', 'stages', 'live']
+    workdir = tempfile.mkdtemp(prefix="momentum_bench_")
+    original_cwd = os.getcwd()
+    measured = {}
+
+    print(f"Scenario: {scenario_key(args)}")
+    try:
+        os.chdir(workdir)
+        if 'startup' in groups:
+            measured.update(bench_startup(workdir, args))
+        with FakeExchangeProcess(universe_options(args), latency=args.latency, error_rate=args.error_rate,
+                                 feed_rate=args.feed_rate) as exchange:
+            if 'e2e' in groups:
+                measured.update(asyncio.run(bench_end_to_end(exchange, workdir, args)))
+            if 'live' in groups:
+                measured.update(asyncio.run(bench_live(exchange, workdir, args)))
+            if 'fetch' in groups or 'stages' in groups:
+                universe = FixtureUniverse.load(args.fixture) if args.fixture else \
+                    FixtureUniverse.from_exports(**universe_options(args)['generate'])
+                if 'fetch' in groups:
+                    measured.update(asyncio.run(bench_fetch(exchange, universe.pairs, args)))
+                if 'stages' in groups:
+                    measured.update(bench_stages(universe, args))
+    finally:
+        os.chdir(original_cwd)
+
+    for metric, value in sorted(measured.items()):
+        print(f"{metric:50} {value:12.4f}")
+
+    violations = startup_violations(measured, args.import_budget) + parity_violations(measured)
+    if violations:
+        print("\nSTARTUP BUDGET OR PARITY CHECK FAILED:")
+        for line in violations:
+            print(f"  {line}")
+        return 1
+
+    key = scenario_key(args)
+    baselines = load_baselines()
+    if args.check:
+        if key not in baselines:
+            print(f"No baseline stored for scenario '{key}'")
+            return 1
+        regressions = compare(measured, baselines[key], args.tolerance)
+        if regressions:
+            print("\n" + "!" * 60)
+            print(f"PERFORMANCE REGRESSION ({len(regressions)} metric(s) beyond {args.tolerance:.0%}):")
+            for line in regressions:
+                print(f"  {line}")
+            print("!" * 60)
+            return 1
+        print("\nNo regressions against baseline")
+    if args.save_baseline:
+        baselines[key] = measured
+        with open(BASELINE_PATH, 'w') as f:
+            json.dump(baselines, f, indent=2, sort_keys=True)
+        print(f"Baseline saved to '{BASELINE_PATH}'")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
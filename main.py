@@ -1,42 +1,158 @@
 #!/usr/bin/env python3
 
+import argparse
 import asyncio
-import time
-from datetime import datetime
 from src.crypto_analyzer import CryptoMomentumAnalyzer
+from src.render_presets import RENDER_PRESETS
 
-async def main():
-    analyzer = CryptoMomentumAnalyzer(max_concurrent=15)
-    results = await analyzer.run_analysis()
+# CLI output names; 'csv' and 'history' both map to the analyzer's 'export' output
+CLI_OUTPUTS = ('json', 'report', 'csv', 'history', 'charts', 'snapshot')
+
+def analyzer_options(outputs, chart_preset: str = 'full', compact_after_days=None, retention_days=30.0,
+                     metrics_dir=None) -> dict:
+    """Analyzer keyword arguments for a list of CLI output names"""
+    selected = set(outputs)
+    options = {'outputs': [name for name in ('json', 'report', 'charts', 'snapshot') if name in selected],
+               'chart_preset': chart_preset, 'compact_after_days': compact_after_days, 'retention_days': retention_days,
+               'metrics_dir': metrics_dir}
+    if {'csv', 'history'} & selected:
+        options['outputs'].append('export')
+        options['export_format'] = 'both' if {'csv', 'history'} <= selected else \
+            ('csv' if 'csv' in selected else 'history')
+    if 'report' not in selected:
+        options['provisional_report_at'] = None
+    return options
+
+async def main(max_concurrent: int = 15, shards: int = 1, **options):
+    analyzer = CryptoMomentumAnalyzer(max_concurrent=max_concurrent, shards=shards, **options)
+    try:
+        results = await analyzer.run_analysis()
+        await analyzer.wait_for_outputs()
+    finally:
+        analyzer.close()
     return results
 
-def run_scheduler():
-    print("Starting scheduled crypto momentum analysis (every 15 minutes)")
+def run_scheduler(interval_minutes: int = 15, max_concurrent: int = 15, shards: int = 1, **options):
+    from src.scheduler import MomentumService
+    service = MomentumService(interval_minutes=interval_minutes, max_concurrent=max_concurrent, shards=shards, **options)
+    
+    try:
+        asyncio.run(service.run_forever())
+    except KeyboardInterrupt:
+        print("\nAnalysis stopped by user")
+
+async def live(feed_url: str, max_concurrent: int = 15):
+    import aiohttp
+    from src.live_stream import LiveMomentumStream
+    # Live mode keeps its own leaderboard, so no per-cycle outputs are loaded
+    analyzer = CryptoMomentumAnalyzer(max_concurrent=max_concurrent, outputs=())
+    try:
+        async with aiohttp.ClientSession() as session:
+            await LiveMomentumStream(analyzer, feed_url).run(session)
+    finally:
+        analyzer.close()
+
+def run_live(feed_url: str, max_concurrent: int = 15):
+    try:
+        asyncio.run(live(feed_url, max_concurrent))
+    except KeyboardInterrupt:
+        print("\nLive mode stopped by user")
+
+async def backtest(days: float, backfill: bool = False, workers=None, max_concurrent: int = 15):
+    from src.backtest import Backtester
+    analyzer = CryptoMomentumAnalyzer(max_concurrent=max_concurrent, outputs=())
+    try:
+        tester = Backtester(analyzer, days=days, workers=workers)
+        if backfill:
+            import aiohttp
+            async with aiohttp.ClientSession() as session:
+                await tester.backfill(session)
+        # Replaying is CPU-bound, so it runs off the event loop
+        observations = await asyncio.get_running_loop().run_in_executor(None, tester.run)
+        report = tester.bucket_report(observations)
+        print(tester.format_report(report))
+        analyzer.file_manager.export_table(report, 'backtest')
+    finally:
+        analyzer.close()
+    return report
+
+async def sweep(days: float, search: str = 'grid', configs: int = 2000, objective: str = 'excess_4h_pct',
+                workers=None, max_concurrent: int = 15, top: int = 20):
+    from src.sweep import WeightSweep
+    analyzer = CryptoMomentumAnalyzer(max_concurrent=max_concurrent, outputs=())
+    try:
+        weight_sweep = WeightSweep(analyzer, days=days, workers=workers)
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, weight_sweep.build_tensor)
+        candidates = weight_sweep.grid() if search == 'grid' else weight_sweep.random(configs)
+        table = weight_sweep.rank(await loop.run_in_executor(None, weight_sweep.evaluate, candidates), objective)
+        print(table.head(top).to_string(index=False, float_format=lambda value: f"{value:.3f}"))
+        analyzer.file_manager.export_table(table, 'sweep')
+    finally:
+        analyzer.close()
+    return table
+
+def serve(host: str = '127.0.0.1', port: int = 8080, unix_socket=None):
+    from src.query_api import QueryAPI
+    try:
+        asyncio.run(QueryAPI().serve(host, port, unix_socket))
+    except KeyboardInterrupt:
+        print("\nQuery API stopped by user")
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Crypto momentum analyzer")
+    parser.add_argument('--once', action='store_true', help="run a single cycle and exit instead of every interval")
+    parser.add_argument('--live', metavar='FEED_URL', help="stream scores from a WebSocket feed instead of polling")
+    parser.add_argument('--backtest', type=float, metavar='DAYS',
+                        help="replay the score over the last DAYS of stored 15-minute candles and report forward returns")
+    parser.add_argument('--backfill', action='store_true', help="fetch the candles a backtest needs before replaying")
+    parser.add_argument('--sweep', type=float, metavar='DAYS',
+                        help="rank scoring weight and threshold configurations over the last DAYS of stored candles")
+    parser.add_argument('--serve', action='store_true',
+                        help="serve the latest score snapshot over HTTP instead of analyzing")
+    parser.add_argument('--host', default='127.0.0.1', help="query API address")
+    parser.add_argument('--port', type=int, default=8080, help="query API port")
+    parser.add_argument('--socket', metavar='PATH', help="serve the query API on a Unix socket instead of a port")
+    parser.add_argument('--search', choices=['grid', 'random'], default='grid', help="sweep search strategy")
+    parser.add_argument('--configs', type=int, default=2000, help="configurations drawn by a random sweep")
+    parser.add_argument('--objective', default='excess_4h_pct', help="sweep ranking metric")
+    parser.add_argument('--workers', type=int, help="backtest and sweep worker processes (default: up to 8 CPUs)")
+    parser.add_argument('--outputs', default='report,history,charts,snapshot',
+                        help=f"comma-separated outputs to write, any of {', '.join(CLI_OUTPUTS)}")
+    parser.add_argument('--chart-preset', choices=sorted(RENDER_PRESETS), default='full',
+                        help="chart resolution and format")
+    parser.add_argument('--compact-after', type=float, metavar='DAYS',
+                        help="zip report, chart and export files older than DAYS into archive/ (off by default)")
+    parser.add_argument('--retention-days', type=float, default=30.0,
+                        help="delete archives created more than this many days ago; 0 keeps them forever")
+    parser.add_argument('--metrics-dir', metavar='DIR',
+                        help="record per-cycle stage timings and request stats in DIR (off by default)")
+    parser.add_argument('--interval', type=int, default=15, help="minutes between cycles")
+    parser.add_argument('--max-concurrent', type=int, default=15)
+    parser.add_argument('--shards', type=int, default=1, help="worker processes to split the universe across")
+    args = parser.parse_args(argv)
     
-    while True:
-        try:
-            results = asyncio.run(main())
-            
-            current_time = datetime.now()
-            next_run = current_time.replace(second=0, microsecond=0)
-            
-            minute = next_run.minute
-            next_minute = ((minute // 15) + 1) * 15
-            if next_minute >= 60:
-                next_run = next_run.replace(hour=next_run.hour + 1, minute=0)
-            else:
-                next_run = next_run.replace(minute=next_minute)
-            
-            sleep_seconds = (next_run - current_time).total_seconds()
-            print(f"Next analysis at {next_run.strftime('%H:%M:%S')} (sleeping for {sleep_seconds:.0f} seconds)")
-            time.sleep(max(sleep_seconds, 0))
-            
-        except KeyboardInterrupt:
-            print("\nAnalysis stopped by user")
-            break
-        except Exception as e:
-            print(f"Error in scheduler: {str(e)}")
-            time.sleep(60)
+    if args.retention_days <= 0:
+        args.retention_days = None
+    args.outputs = [name.strip() for name in args.outputs.split(',') if name.strip()]
+    unknown = set(args.outputs) - set(CLI_OUTPUTS)
+    if unknown:
+        parser.error(f"unknown outputs: {', '.join(sorted(unknown))}")
+    return args
 
 if __name__ == "__main__":
-    run_scheduler()
\ No newline at end of file
+    args = parse_args()
+    options = analyzer_options(args.outputs, args.chart_preset, args.compact_after, args.retention_days,
+                               args.metrics_dir)
+    if args.serve:
+        serve(args.host, args.port, args.socket)
+    elif args.live:
+        run_live(args.live, args.max_concurrent)
+    elif args.backtest:
+        asyncio.run(backtest(args.backtest, args.backfill, args.workers, args.max_concurrent))
+    elif args.sweep:
+        asyncio.run(sweep(args.sweep, args.search, args.configs, args.objective, args.workers, args.max_concurrent))
+    elif args.once:
+        asyncio.run(main(args.max_concurrent, args.shards, **options))
+    else:
+        run_scheduler(args.interval, args.max_concurrent, args.shards, **options)
\ No newline at end of file
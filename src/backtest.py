@@ -0,0 +1,241 @@
+import asyncio
+import aiohttp
+import multiprocessing
+import numpy as np
+import pandas as pd
+import time
+from concurrent.futures import ProcessPoolExecutor
+from numpy.lib.stride_tricks import sliding_window_view
+from typing import Dict, List, Optional, Tuple
+from .candle_store import CandleStore
+from .indicator_engine import BatchIndicatorEngine
+from .resampler import BASE_INTERVAL_MS, BASE_RESOLUTION
+from .results_table import indicator_column, presence_column
+from .scoring import BEARISH_BELOW, BUY_ABOVE, STRONG_BUY_ABOVE, ScoringComponent, momentum_scores, signal_class
+
+# 15-minute bars in one bar of each resolution; daily bars are aligned to UTC midnight
+TIMEFRAME_FACTORS = {'15': 1, '30': 2, '60': 4, '240': 16, '1D': 96}
+# Labels of the report's signal classes, in scoring.SIGNAL_CLASSES order
+SCORE_BUCKETS = [
+    f'bearish (<{BEARISH_BELOW:.2f})',
+    f'neutral ({BEARISH_BELOW:.2f}-{BUY_ABOVE:.2f})',
+    f'buy (>{BUY_ABOVE:.2f}-{STRONG_BUY_ABOVE:.2f})',
+    f'strong buy (>{STRONG_BUY_ABOVE:.2f})'
+]
+# Forward return horizons in 15-minute bars
+HORIZONS = {'1h': 4, '4h': 16, '1d': 96}
+
+def _running(name: str, values: np.ndarray, bucket_index: np.ndarray) -> np.ndarray:
+    """Value of the forming bar at every 15-minute step: close is the latest close, the rest accumulate"""
+    if name == 'close':
+        return values
+    grouped = pd.Series(values).groupby(bucket_index)
+    if name == 'volume':
+        return grouped.cumsum().to_numpy()
+    if name == 'high':
+        return grouped.cummax().to_numpy()
+    if name == 'low':
+        return grouped.cummin().to_numpy()
+    raise ValueError(f"No aggregation for candle source '{name}'")
+
+def partial_bar_windows(base: Dict[str, np.ndarray], times: np.ndarray, factor: int,
+                        window: int) -> Tuple[Dict[str, np.ndarray], np.ndarray]:
+    """The `window` latest bars of a longer timeframe as they stood at every 15-minute step.
+
+    Row i holds up to `window - 1` completed bars followed by the bar still forming at step i,
+    right-aligned and NaN-padded like BatchIndicatorEngine.pack, plus each row's length. A
+    leading bucket that the history starts partway into is dropped, as in resample_ohlcv.
+    """
+    buckets = times // (BASE_INTERVAL_MS * factor)
+    opens = np.r_[True, buckets[1:] != buckets[:-1]]
+    bucket_index = np.cumsum(opens) - 1
+    ends = np.r_[np.flatnonzero(opens)[1:], len(times)] - 1
+    lead = 1 if times[0] % (BASE_INTERVAL_MS * factor) else 0
+
+    prior = np.minimum(bucket_index - lead, window - 1)
+    lengths = np.where(bucket_index >= lead, prior + 1, 0)
+
+    rows = {}
+    for name, values in base.items():
+        forming = _running(name, values, bucket_index)
+        completed = forming[ends].astype(float)
+        if lead:
+            completed[0] = np.nan
+        padded = np.r_[np.full(window - 1, np.nan), completed]
+        # Window k of the padded series is the window - 1 completed bars before bucket k
+        history = sliding_window_view(padded, window - 1)[bucket_index]
+        rows[name] = np.concatenate([history, forming[:, None]], axis=1)
+        rows[name][lengths == 0] = np.nan
+    return rows, lengths
+
+def forward_returns(times: np.ndarray, closes: np.ndarray, bars: int) -> np.ndarray:
+    """Return from each close to the close `bars` 15-minute bars later; NaN where that bar is missing"""
+    target = times + bars * BASE_INTERVAL_MS
+    index = np.minimum(np.searchsorted(times, target), len(times) - 1)
+    found = times[index] == target
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(found, closes[index] / closes - 1, np.nan)
+
+def indicator_history(candles: pd.DataFrame, engine: BatchIndicatorEngine, timeframes: Dict,
+                      window: int) -> Tuple[Dict[str, np.ndarray], np.ndarray]:
+    """Results-table columns with one row per 15-minute step of `candles`, and whether any timeframe was scorable"""
+    times = candles['time'].to_numpy(dtype=np.int64)
+    sources = engine.registry.required_sources() | {'close'}
+    base = {name: candles[name].to_numpy(dtype=float) for name in sources}
+
+    columns = {'pair': times}
+    scored = np.zeros(len(times), dtype=bool)
+    for tf, config in timeframes.items():
+        rows, lengths = partial_bar_windows(base, times, TIMEFRAME_FACTORS[config['resolution']], window)
+        valid = lengths >= engine.min_bars
+        indicators = engine.compute_packed({name: values[valid] for name, values in rows.items()},
+                                           lengths[valid]) if valid.any() else {}
+        for field in engine.fields:
+            values = np.full(len(times), np.nan)
+            if field in indicators:
+                values[valid] = indicators[field]
+            columns[indicator_column(field, tf)] = values
+        columns[presence_column(tf)] = valid.astype(float)
+        scored |= valid
+    return columns, scored
+
+def score_history(candles: pd.DataFrame, engine: BatchIndicatorEngine, timeframes: Dict,
+                  components: List[ScoringComponent], window: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Momentum score at every 15-minute step of `candles`, and whether any timeframe was scorable there"""
+    columns, scored = indicator_history(candles, engine, timeframes, window)
+    return momentum_scores(columns, timeframes, components), scored
+
+# Per-process state of a backtest worker, created once by the pool initializer
+_worker = {}
+
+def _init_worker(options: Dict):
+    _worker.update(options)
+    _worker['store'] = CandleStore(options['candle_db'])
+
+def _replay_pair(pair: str, load_from_ms: int, start_ms: int, end_ms: int) -> Optional[Dict[str, np.ndarray]]:
+    candles = _worker['store'].load_range(pair, BASE_RESOLUTION, load_from_ms, end_ms)
+    if len(candles) == 0:
+        return None
+
+    scores, scored = score_history(candles, _worker['engine'], _worker['timeframes'],
+                                   _worker['components'], _worker['window'])
+    times = candles['time'].to_numpy(dtype=np.int64)
+    closes = candles['close'].to_numpy(dtype=float)
+    keep = scored & (times >= start_ms)
+    observation = {'time': times[keep], 'score': scores[keep]}
+    for label, bars in _worker['horizons'].items():
+        observation[f'return_{label}'] = forward_returns(times, closes, bars)[keep]
+    return observation
+
+
+class Backtester:
+    """Replays the analyzer's momentum score over stored 15-minute candles and measures what followed.
+
+    Every timeframe is rebuilt from the 15-minute bars, with the latest bar of a longer timeframe
+    still forming, so each step sees the windows a live cycle at that moment would have fetched.
+    All steps of a pair go through the indicator engine as one batch of sliding windows.
+    """
+
+    def __init__(self, analyzer, days: float = 90, horizons: Optional[Dict[str, int]] = None,
+                 workers: Optional[int] = None):
+        if analyzer.candle_store is None:
+            raise ValueError("Backtesting needs the analyzer's candle store")
+        self.analyzer = analyzer
+        self.days = days
+        self.horizons = horizons or HORIZONS
+        self.workers = workers if workers is not None else min(8, multiprocessing.cpu_count())
+        self.window = analyzer.candle_periods
+        unsupported = [tf for tf, config in analyzer.timeframes.items() if config['resolution'] not in TIMEFRAME_FACTORS]
+        if unsupported:
+            raise ValueError(f"Timeframes {', '.join(unsupported)} cannot be rebuilt from 15-minute candles")
+
+    def warmup_ms(self) -> int:
+        """History needed before the first scored step so the longest timeframe has a full window"""
+        factor = max(TIMEFRAME_FACTORS[config['resolution']] for config in self.analyzer.timeframes.values())
+        return self.window * factor * BASE_INTERVAL_MS
+
+    async def backfill(self, session: aiohttp.ClientSession, pairs: Optional[List[str]] = None,
+                       end_time: Optional[int] = None) -> int:
+        """Fetch the 15-minute history the backtest needs, warm-up included, into the candle store"""
+        if pairs is None:
+            pairs = await self.analyzer.discover_instruments(session)
+        end_time = end_time or int(time.time())
+        start_time = end_time - int(self.days * 86400) - self.warmup_ms() // 1000
+
+        fetcher = self.analyzer.data_fetcher
+        fetcher.reset_stats()
+        started = time.time()
+        stored = sum(await asyncio.gather(*[
+            fetcher.fetch_history(session, pair, BASE_RESOLUTION, start_time, end_time) for pair in pairs
+        ]))
+        print(f"Backfilled {stored} 15-minute bars for {len(pairs)} pairs in {time.time() - started:.1f}s "
+              f"({fetcher.format_stats()})")
+        return stored
+
+    def _worker_options(self) -> Dict:
+        return {
+            'candle_db': self.analyzer.candle_store.db_path,
+            'engine': self.analyzer.indicator_engine,
+            'timeframes': self.analyzer.timeframes,
+            'components': self.analyzer.active_scoring_components(),
+            'window': self.window,
+            'horizons': self.horizons
+        }
+
+    def run(self, pairs: Optional[List[str]] = None, end_ms: Optional[int] = None) -> pd.DataFrame:
+        """One row per pair and scored 15-minute step: time, score and forward returns"""
+        if pairs is None:
+            pairs = self.analyzer.candle_store.stored_pairs(BASE_RESOLUTION)
+        end_ms = end_ms or int(time.time() * 1000)
+        start_ms = end_ms - int(self.days * 86400 * 1000)
+        jobs = [(pair, start_ms - self.warmup_ms(), start_ms, end_ms) for pair in pairs]
+
+        started = time.time()
+        if self.workers <= 1:
+            _init_worker(self._worker_options())
+            try:
+                observations = [_replay_pair(*job) for job in jobs]
+            finally:
+                _worker.pop('store').close()
+        else:
+            with ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context('spawn'),
+                                     initializer=_init_worker, initargs=(self._worker_options(),)) as pool:
+                observations = list(pool.map(_replay_pair, *zip(*jobs), chunksize=4)) if jobs else []
+
+        frames = []
+        for pair, observation in zip(pairs, observations):
+            if observation is not None and len(observation['time']):
+                frame = pd.DataFrame(observation)
+                frame.insert(0, 'pair', pair)
+                frames.append(frame)
+        columns = ['pair', 'time', 'score'] + [f'return_{label}' for label in self.horizons]
+        table = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=columns)
+        print(f"Replayed {len(table)} scores for {len(frames)} pairs over {self.days:g} days "
+              f"in {time.time() - started:.1f}s")
+        return table[columns]
+
+    def bucket_report(self, observations: pd.DataFrame) -> pd.DataFrame:
+        """Forward returns by score bucket, in percent, also relative to the universe average at the same step"""
+        observations = observations.copy()
+        labels = SCORE_BUCKETS
+        classes = signal_class(observations['score'].to_numpy())
+        observations['bucket'] = pd.Categorical.from_codes(classes, categories=labels, ordered=True)
+
+        by_time = observations.groupby('time')
+        report = pd.DataFrame(index=pd.Index(labels, name='bucket'))
+        grouped = observations.groupby('bucket', observed=False)
+        report['observations'] = grouped.size()
+        report['mean_score'] = grouped['score'].mean()
+        for label in self.horizons:
+            column = f'return_{label}'
+            observations[f'excess_{label}'] = observations[column] - by_time[column].transform('mean')
+            grouped = observations.groupby('bucket', observed=False)
+            report[f'mean_{label}_pct'] = grouped[column].mean() * 100
+            report[f'median_{label}_pct'] = grouped[column].median() * 100
+            report[f'hit_rate_{label}'] = grouped[column].apply(lambda r: (r.dropna() > 0).mean())
+            report[f'excess_{label}_pct'] = grouped[f'excess_{label}'].mean() * 100
+        return report.reset_index()
+
+    @staticmethod
+    def format_report(report: pd.DataFrame) -> str:
+        return report.to_string(index=False, float_format=lambda value: f"{value:.3f}")
@@ -0,0 +1,116 @@
+import os
+import sqlite3
+import threading
+import pandas as pd
+from typing import List, Optional, Tuple
+
+CANDLE_COLUMNS = ['open', 'high', 'low', 'close', 'volume', 'time']
+
+class CandleStore:
+    """Persistent candle cache keyed by (pair, resolution), stored in SQLite.
+
+    The database is opened on first use, so constructing a store creates no files.
+    """
+
+    def __init__(self, db_path: str = os.path.join("data", "candles.db")):
+        self.db_path = db_path
+        # Used from the fetcher's worker threads, so every access takes the lock
+        self.lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        """The open connection; callers hold the lock"""
+        if self._conn is None:
+            self._ensure_directory_exists()
+            conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS candles (
+                    pair TEXT NOT NULL,
+                    resolution TEXT NOT NULL,
+                    time INTEGER NOT NULL,
+                    open REAL,
+                    high REAL,
+                    low REAL,
+                    close REAL,
+                    volume REAL,
+                    PRIMARY KEY (pair, resolution, time)
+                ) WITHOUT ROWID
+            """)
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def _ensure_directory_exists(self):
+        directory = os.path.dirname(self.db_path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+
+    def bar_range(self, pair: str, resolution: str) -> Optional[Tuple[int, int]]:
+        """Open times of the first and last stored bars"""
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT MIN(time), MAX(time) FROM candles WHERE pair = ? AND resolution = ?",
+                (pair, resolution)
+            ).fetchone()
+        return (row[0], row[1]) if row and row[0] is not None else None
+
+    def upsert(self, pair: str, resolution: str, df: pd.DataFrame):
+        """Insert new bars and overwrite bars that were still forming when last stored"""
+        if df is None or len(df) == 0:
+            return
+
+        rows = [
+            (pair, resolution, int(r.time), r.open, r.high, r.low, r.close, r.volume)
+            for r in df[CANDLE_COLUMNS].itertuples(index=False)
+        ]
+        with self.lock:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO candles (pair, resolution, time, open, high, low, close, volume) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                rows
+            )
+            self.conn.commit()
+
+    def load_window(self, pair: str, resolution: str, start_ms: int) -> pd.DataFrame:
+        with self.lock:
+            return pd.read_sql_query(
+                "SELECT open, high, low, close, volume, time FROM candles "
+                "WHERE pair = ? AND resolution = ? AND time >= ? ORDER BY time",
+                self.conn,
+                params=(pair, resolution, start_ms)
+            )
+
+    def load_range(self, pair: str, resolution: str, start_ms: int, end_ms: Optional[int] = None) -> pd.DataFrame:
+        """Bars opened in [start_ms, end_ms), oldest first"""
+        if end_ms is None:
+            return self.load_window(pair, resolution, start_ms)
+        with self.lock:
+            return pd.read_sql_query(
+                "SELECT open, high, low, close, volume, time FROM candles "
+                "WHERE pair = ? AND resolution = ? AND time >= ? AND time < ? ORDER BY time",
+                self.conn,
+                params=(pair, resolution, start_ms, end_ms)
+            )
+
+    def stored_pairs(self, resolution: str) -> List[str]:
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT DISTINCT pair FROM candles WHERE resolution = ? ORDER BY pair", (resolution,)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def evict(self, pair: str) -> int:
+        """Drop every stored bar of a pair, e.g. once it is delisted"""
+        with self.lock:
+            deleted = self.conn.execute("DELETE FROM candles WHERE pair = ?", (pair,)).rowcount
+            self.conn.commit()
+        return deleted
+
+    def close(self):
+        with self.lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
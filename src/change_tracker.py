@@ -0,0 +1,189 @@
+import json
+import os
+import time
+import pandas as pd
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Union
+from .scoring import BEARISH_BELOW, BUY_ABOVE, SIGNAL_BANDS
+from .snapshot import SnapshotReader
+
+def signal_band(score: float) -> Optional[str]:
+    for band, cutoff in SIGNAL_BANDS:
+        if score > cutoff:
+            return band
+    return None
+
+class CycleState:
+    """What a cycle's artifacts are drawn from: the ranked pairs, their scores and signal bands"""
+
+    def __init__(self, pairs: List[str], scores: List[float]):
+        self.pairs = pairs
+        self.scores = dict(zip(pairs, scores))
+        self.ranks = {pair: rank for rank, pair in enumerate(pairs, 1)}
+        self.bands = {pair: signal_band(score) for pair, score in self.scores.items()}
+        # Bullish/neutral/bearish counts with the report's cutoffs
+        self.sentiment = (sum(score > BUY_ABOVE for score in scores),
+                          sum(BEARISH_BELOW <= score <= BUY_ABOVE for score in scores),
+                          sum(score < BEARISH_BELOW for score in scores))
+
+    @classmethod
+    def from_results(cls, results: pd.DataFrame) -> 'CycleState':
+        return cls(results['pair'].tolist(), results['momentum_score'].tolist())
+
+
+class ChangeTracker:
+    """Diffs each cycle against the previous one and decides which artifacts are worth regenerating.
+
+    `observe` appends one JSON line per change to `alerts_path`: pairs entering or leaving a signal
+    band, rank changes within the top `top_n`, score moves of at least `score_threshold`, and pairs
+    that appeared or disappeared. `stale` compares the current cycle with the one an artifact was
+    last written from, so small moves do not add up unnoticed across skipped cycles. With a
+    `state_path`, those written-from states are saved there and loaded back on startup, so one-shot
+    runs skip unchanged artifacts too.
+    """
+
+    def __init__(self, alerts_path: Optional[str] = os.path.join("data", "alerts.jsonl"), top_n: int = 10,
+                 score_threshold: float = 0.05, max_age: float = 4 * 3600, seed_snapshot: Optional[str] = None,
+                 state_path: Optional[str] = None):
+        self.alerts_path = alerts_path
+        self.top_n = top_n
+        self.score_threshold = score_threshold
+        # Artifacts are regenerated at least this often (seconds) even when nothing moved
+        self.max_age = max_age
+        self.previous: Optional[CycleState] = None
+        self.current: Optional[CycleState] = None
+        self._written: Dict[str, CycleState] = {}
+        self._written_at: Dict[str, float] = {}
+        self.state_path = state_path
+        if seed_snapshot and os.path.exists(seed_snapshot):
+            self.previous = self._load_snapshot(seed_snapshot)
+        if state_path and os.path.exists(state_path):
+            self._load_state()
+
+    @staticmethod
+    def _load_snapshot(path: str) -> Optional[CycleState]:
+        """The last published cycle, so the first diff after a restart is against it"""
+        reader = SnapshotReader(path)
+        try:
+            reader.refresh()
+            return CycleState(list(reader.pairs), reader.values[:, 0].tolist())
+        except (OSError, ValueError) as e:
+            print(f"Could not read the previous snapshot '{path}': {str(e)}")
+            return None
+        finally:
+            reader.close()
+
+    def _moved(self, old: CycleState, new: CycleState, pairs) -> bool:
+        return any(abs(new.scores[pair] - old.scores[pair]) >= self.score_threshold
+                   for pair in pairs if pair in old.scores and pair in new.scores)
+
+    def changes(self, old: CycleState, new: CycleState) -> List[Dict]:
+        events = []
+        for pair in new.pairs:
+            if pair not in old.scores:
+                events.append({'type': 'added', 'pair': pair, 'rank': new.ranks[pair], 'score': new.scores[pair]})
+        for pair in old.pairs:
+            if pair not in new.scores:
+                events.append({'type': 'removed', 'pair': pair, 'rank': old.ranks[pair], 'score': old.scores[pair]})
+
+        common = [pair for pair in new.pairs if pair in old.scores]
+        for pair in common:
+            if old.bands[pair] != new.bands[pair]:
+                events.append({'type': 'band', 'pair': pair, 'from': old.bands[pair], 'to': new.bands[pair],
+                               'score': new.scores[pair]})
+        leaders = set(old.pairs[:self.top_n]) | set(new.pairs[:self.top_n])
+        for pair in common:
+            if pair in leaders and old.ranks[pair] != new.ranks[pair]:
+                events.append({'type': 'rank', 'pair': pair, 'from': old.ranks[pair], 'to': new.ranks[pair],
+                               'score': new.scores[pair]})
+        for pair in common:
+            delta = new.scores[pair] - old.scores[pair]
+            if abs(delta) >= self.score_threshold:
+                events.append({'type': 'score', 'pair': pair, 'from': old.scores[pair], 'to': new.scores[pair],
+                               'delta': delta})
+        return events
+
+    def observe(self, results: pd.DataFrame, timestamp: Optional[datetime] = None) -> List[Dict]:
+        """Make `results` the current cycle and record what changed since the previous one"""
+        self.previous, self.current = self.current or self.previous, CycleState.from_results(results)
+        if self.previous is None:
+            return []
+
+        events = self.changes(self.previous, self.current)
+        if events and self.alerts_path:
+            directory = os.path.dirname(self.alerts_path)
+            if directory and not os.path.exists(directory):
+                os.makedirs(directory)
+            stamp = (timestamp or datetime.now()).isoformat(timespec='seconds')
+            with open(self.alerts_path, 'a') as f:
+                f.writelines(json.dumps({'time': stamp, **event}) + "\n" for event in events)
+
+        counts = {}
+        for event in events:
+            counts[event['type']] = counts.get(event['type'], 0) + 1
+        breakdown = ", ".join(f"{count} {kind}" for kind, count in counts.items()) or "none"
+        print(f"Changes since the previous cycle: {breakdown}")
+        return events
+
+    def stale(self, artifact: str, inputs: Union[str, int] = 'table') -> bool:
+        """Whether `artifact` should be regenerated for the current cycle.
+
+        `inputs` is what the artifact is drawn from: 'table' for the whole ranked table, 'sentiment'
+        for the bullish/neutral/bearish counts, or a number n for the top n pairs.
+        """
+        written = self._written.get(artifact)
+        if written is None or self.current is None:
+            return True
+        if time.time() - self._written_at[artifact] >= self.max_age:
+            return True
+
+        current = self.current
+        if inputs == 'sentiment':
+            return written.sentiment != current.sentiment
+        if isinstance(inputs, int):
+            return written.pairs[:inputs] != current.pairs[:inputs] or \
+                self._moved(written, current, current.pairs[:inputs])
+        return written.scores.keys() != current.scores.keys() or written.bands != current.bands or \
+            written.pairs[:self.top_n] != current.pairs[:self.top_n] or \
+            self._moved(written, current, current.pairs)
+
+    def written(self, artifacts: Iterable[str], state: Optional[CycleState] = None):
+        """Record that `artifacts` were regenerated from `state`, by default the current cycle"""
+        state = state or self.current
+        if state is None:
+            return
+        for artifact in artifacts:
+            self._written[artifact] = state
+            self._written_at[artifact] = time.time()
+        if self.state_path:
+            self._save_state()
+
+    def _save_state(self):
+        # Artifacts written from the same cycle share one stored state
+        states, index = [], {}
+        artifacts = {}
+        for artifact, state in self._written.items():
+            if id(state) not in index:
+                index[id(state)] = len(states)
+                states.append({'pairs': state.pairs, 'scores': [state.scores[pair] for pair in state.pairs]})
+            artifacts[artifact] = {'state': index[id(state)], 'written_at': self._written_at[artifact]}
+
+        directory = os.path.dirname(self.state_path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        with open(self.state_path + ".tmp", 'w') as f:
+            json.dump({'states': states, 'artifacts': artifacts}, f)
+        os.replace(self.state_path + ".tmp", self.state_path)
+
+    def _load_state(self):
+        try:
+            with open(self.state_path) as f:
+                saved = json.load(f)
+            states = [CycleState(state['pairs'], state['scores']) for state in saved['states']]
+            for artifact, entry in saved['artifacts'].items():
+                self._written[artifact] = states[entry['state']]
+                self._written_at[artifact] = entry['written_at']
+        except (OSError, ValueError, KeyError, IndexError) as e:
+            print(f"Ignoring unreadable artifact state '{self.state_path}': {str(e)}")
+            self._written.clear()
+            self._written_at.clear()
@@ -1,26 +1,87 @@
 import asyncio
 import aiohttp
+import os
 import pandas as pd
 import numpy as np
-import ta
 import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
 from datetime import datetime
-from typing import Dict, List, Optional
+from typing import Dict, Iterable, List, Optional
 import warnings
-from tqdm import tqdm
+from .candle_store import CandleStore
+from .change_tracker import ChangeTracker
 from .data_fetcher import DataFetcher
-from .report_generator import ReportGenerator
-from .visualizer import Visualizer
-from .utils.file_manager import FileManager
+from .instrument_registry import InstrumentRegistry
+from .indicator_engine import BatchIndicatorEngine, CandleSeries, IndicatorRegistry
+from .resampler import BASE_RESOLUTION, RESAMPLED_RESOLUTIONS, compare_bars, resample_ohlcv
+from .results_table import build_results_table, indicator_column, rank_results
+from .render_presets import check_preset
+from .scoring import ScoringComponent, default_scoring_components, momentum_scores
+from .sharding import ShardPool
+from .snapshot import write_snapshot
+from .streaming_summary import MomentumSummary
+from .utils.metrics import CycleMetrics, MetricsRecorder
+from .utils.retention import ArtifactRetention
 
 warnings.filterwarnings('ignore')
 
+# What a cycle writes once it is scored; 'json' is a scores-only file next to the other exports and
+# 'snapshot' the memory-mapped file behind the query API
+OUTPUTS = ('report', 'export', 'charts', 'json', 'snapshot')
+DEFAULT_OUTPUTS = ('report', 'export', 'charts', 'snapshot')
+
 class CryptoMomentumAnalyzer:
-    def __init__(self, max_concurrent=15):
-        self.data_fetcher = DataFetcher(max_concurrent)
-        self.report_generator = ReportGenerator()
-        self.visualizer = Visualizer()
-        self.file_manager = FileManager()
+    def __init__(self, max_concurrent=15, candle_db: Optional[str] = "data/candles.db", keep_candles: bool = False,
+                 chart_preset: str = 'full', metrics_dir: Optional[str] = None,
+                 profile: bool = False, trace_memory: bool = False, export_format: str = 'history',
+                 provisional_report_at: Optional[float] = 0.9, resample_from_15: bool = False, shards: int = 1,
+                 instruments_cache: Optional[str] = "data/instruments.json", instruments_ttl: float = 3600.0,
+                 indicator_registry: Optional[IndicatorRegistry] = None,
+                 scoring_components: Optional[List[ScoringComponent]] = None,
+                 outputs: Iterable[str] = DEFAULT_OUTPUTS, snapshot_path: str = os.path.join("data", "scores.snapshot"),
+                 alerts_path: Optional[str] = os.path.join("data", "alerts.jsonl"), skip_unchanged: bool = True,
+                 artifact_max_age: float = 4 * 3600, compact_after_days: Optional[float] = None,
+                 retention_days: Optional[float] = 30.0):
+        self.outputs = set(outputs)
+        unknown = self.outputs - set(OUTPUTS)
+        if unknown:
+            raise ValueError(f"Unknown outputs {', '.join(sorted(unknown))}, expected any of {', '.join(OUTPUTS)}")
+        self.candle_store = CandleStore(candle_db) if candle_db else None
+        # Parsing and indicator work is handed to this pool so the event loop stays free for network I/O
+        self.executor = ThreadPoolExecutor(max_workers=min(8, os.cpu_count() or 1), thread_name_prefix="analysis")
+        self.data_fetcher = DataFetcher(max_concurrent, candle_store=self.candle_store, executor=self.executor)
+        self.indicator_engine = BatchIndicatorEngine(registry=indicator_registry)
+        # Report, chart and export modules (and matplotlib with them) are imported on first use
+        self.chart_preset = check_preset(chart_preset)
+        self.export_format = export_format
+        self.snapshot_path = snapshot_path
+        # Diffs each cycle against the last one for the alert stream and to skip artifacts whose inputs did not move
+        self.skip_unchanged = skip_unchanged
+        # What each artifact was last written from is kept next to the snapshot, so one-shot runs skip too
+        self.change_tracker = ChangeTracker(
+            alerts_path, max_age=artifact_max_age,
+            seed_snapshot=snapshot_path if 'snapshot' in self.outputs else None,
+            state_path=os.path.join(os.path.dirname(snapshot_path), "artifact_state.json") if skip_unchanged else None
+        ) if self.outputs else None
+        # Opt-in: timestamped artifacts older than `compact_after_days` are zipped per day; None keeps every file as written
+        self.retention = ArtifactRetention(compact_after_days=compact_after_days, keep_days=retention_days) \
+            if self.outputs and compact_after_days is not None else None
+        self._report_generator = None
+        self._visualizer = None
+        self._file_manager = None
+        if 'export' in self.outputs:
+            self.file_manager  # validates export_format up front
+        # Cached instrument list refreshed off the critical path; None refetches it at the start of every cycle
+        self.instrument_registry = InstrumentRegistry(self.data_fetcher, instruments_cache, instruments_ttl) \
+            if instruments_cache else None
+        if self.instrument_registry is not None:
+            self.instrument_registry.add_listener(self._on_instruments_changed)
+        # Opt-in: every cycle appends a line to `<metrics_dir>/cycle_metrics.jsonl`, which is never rotated
+        if (profile or trace_memory) and not metrics_dir:
+            raise ValueError("profile and trace_memory need a metrics_dir to write to")
+        self.metrics = MetricsRecorder(metrics_dir, profile=profile, trace_memory=trace_memory) if metrics_dir else None
+        self.cycle_metrics: Optional[CycleMetrics] = None
         
         self.timeframes = {
             '15': {'weight': 0.35, 'resolution': '15'},
@@ -36,133 +97,440 @@ class CryptoMomentumAnalyzer:
             'volume': 0.25,
             'price_change': 0.15
         }
+        # Custom score terms over registered indicators; None scores with the built-in terms and scoring_weights
+        self.scoring_components = scoring_components
+        if scoring_components is not None:
+            missing = {c.indicator for c in scoring_components if c.indicator} - set(self.indicator_engine.fields)
+            if missing:
+                raise ValueError(f"Scoring components use unregistered indicators: {', '.join(sorted(missing))}")
+        
+        # Derive 30/60/240 bars from one deeper 15-minute fetch instead of requesting each resolution
+        self.resample_from_15 = resample_from_15
+        self.candle_periods = 100
+        # Completed pairs are scored this many at a time, so indicator work is batched but still overlaps the fetches
+        self.score_batch = 64
         
-        self.results = {}
+        # Large universes can be split across worker processes; the global request budget is shared among them
+        self.shard_pool = ShardPool(shards, max_concurrent, candle_db) if shards > 1 else None
+        
+        self.results = None
+        # Live leaderboard and statistics of the cycle in progress, updated as each pair is scored
+        self.summary: Optional[MomentumSummary] = None
+        # Fraction of pairs after which a provisional report is written; None disables it
+        self.provisional_report_at = provisional_report_at
+        self.render_task: Optional[asyncio.Task] = None
+        self._metrics_handed_off = False
+        # Raw candle frames are only retained for debugging; the results table holds indicator floats only
+        self.keep_candles = keep_candles
+        self.candles = {}
         self.pbar = None
         
-    def calculate_technical_indicators(self, df: pd.DataFrame) -> Dict:
-        if len(df) < 30:
-            return None
-            
-        try:
-            rsi = ta.momentum.RSIIndicator(df['close'], window=14).rsi()
-            current_rsi = rsi.iloc[-1] if not pd.isna(rsi.iloc[-1]) else 50
-            
-            recent_volume = df['volume'].iloc[-5:].mean()
-            avg_volume = df['volume'].mean()
-            volume_ratio = recent_volume / avg_volume if avg_volume > 0 else 1
-            
-            price_change = ((df['close'].iloc[-1] - df['close'].iloc[-20]) / df['close'].iloc[-20]) * 100 if len(df) >= 20 else 0
-            
-            return {
-                'rsi': current_rsi,
-                'volume_ratio': volume_ratio,
-                'price_change': price_change,
-                'current_price': df['close'].iloc[-1],
-                'volume': recent_volume
-            }
-            
-        except Exception as e:
-            print(f"Error calculating indicators: {str(e)}")
-            return None
-    
-    def calculate_momentum_score(self, timeframe_data: Dict) -> float:
-        total_score = 0
-        total_weight = 0
-        
-        for tf, data in timeframe_data.items():
-            if data and data.get('indicators'):
-                indicators = data['indicators']
-                weight = self.timeframes[tf]['weight']
-                
-                base_score = 0.5
-                
-                rsi = indicators.get('rsi', 50)
-                if 50 <= rsi <= 70:
-                    rsi_score = 0.8
-                elif 70 < rsi <= 80:
-                    rsi_score = 0.6
-                elif rsi > 80:
-                    rsi_score = 0.3
-                elif 40 <= rsi < 50:
-                    rsi_score = 0.4
-                else:
-                    rsi_score = 0.2
-                
-                volume_ratio = indicators.get('volume_ratio', 1)
-                volume_score = min(volume_ratio / 1.5, 1.0) if volume_ratio >= 1.5 else volume_ratio / 1.5
-                
-                price_change = indicators.get('price_change', 0)
-                price_score = min(max(price_change / 10 + 0.5, 0), 1)
-                
-                tf_score = (base_score * self.scoring_weights['base_bullish'] +
-                           rsi_score * self.scoring_weights['rsi'] +
-                           volume_score * self.scoring_weights['volume'] +
-                           price_score * self.scoring_weights['price_change'])
-                
-                total_score += tf_score * weight
-                total_weight += weight
-        
-        return total_score / total_weight if total_weight > 0 else 0
-    
-    async def analyze_pair(self, session: aiohttp.ClientSession, pair: str) -> Dict:
-        """Analyze a single trading pair across all timeframes"""
-        pair_data = {}
-        
-        for tf_key, tf_config in self.timeframes.items():
-            df = await self.data_fetcher.fetch_candlestick_data(session, pair, tf_config['resolution'])
+    @property
+    def report_generator(self):
+        if self._report_generator is None:
+            from .report_generator import ReportGenerator
+            self._report_generator = ReportGenerator()
+        return self._report_generator
+    
+    @property
+    def visualizer(self):
+        if self._visualizer is None:
+            from .visualizer import Visualizer
+            self._visualizer = Visualizer(preset=self.chart_preset)
+        return self._visualizer
+    
+    @property
+    def file_manager(self):
+        if self._file_manager is None:
+            from .utils.file_manager import FileManager
+            self._file_manager = FileManager(self.export_format)
+        return self._file_manager
+    
+    def active_scoring_components(self) -> List[ScoringComponent]:
+        if self.scoring_components is not None:
+            return self.scoring_components
+        return default_scoring_components(self.scoring_weights)
+    
+    def calculate_momentum_scores(self, table) -> np.ndarray:
+        """Momentum scores of a results table or a mapping of its columns, one per row"""
+        return momentum_scores(table, self.timeframes, self.active_scoring_components())
+    
+    def _resampled_tf_keys(self) -> List[str]:
+        if not self.resample_from_15:
+            return []
+        return [tf for tf, config in self.timeframes.items()
+                if config['resolution'] == BASE_RESOLUTION or config['resolution'] in RESAMPLED_RESOLUTIONS]
+    
+    def derive_frames(self, base_df: Optional[pd.DataFrame], tf_keys: List[str],
+                      now: Optional[float] = None) -> Dict[str, Optional[pd.DataFrame]]:
+        """Resample deep 15-minute history into the window each timeframe would have been fetched with"""
+        now = now if now is not None else time.time()
+        frames = {}
+        for tf_key in tf_keys:
+            resolution = self.timeframes[tf_key]['resolution']
+            df = base_df if resolution == BASE_RESOLUTION else \
+                resample_ohlcv(base_df, RESAMPLED_RESOLUTIONS[resolution])
+            if df is not None:
+                start_ms = int(now - self.candle_periods * self.data_fetcher.timeframe_seconds(resolution)) * 1000
+                df = df[df['time'] >= start_ms].reset_index(drop=True)
+            frames[tf_key] = df if df is not None and len(df) > 0 else None
+        return frames
+    
+    async def _fetch_frames(self, session: aiohttp.ClientSession, pair: str) -> Dict[str, Optional[pd.DataFrame]]:
+        resampled = self._resampled_tf_keys()
+        direct = [tf for tf in self.timeframes if tf not in resampled]
+        fetches = [self.data_fetcher.fetch_candlestick_data(session, pair, self.timeframes[tf]['resolution'])
+                   for tf in direct]
+        if resampled:
+            # Deep enough for the longest derived window plus one partial leading bucket
+            depth = max(RESAMPLED_RESOLUTIONS.get(self.timeframes[tf]['resolution'], 1) for tf in resampled)
+            fetches.append(self.data_fetcher.fetch_candlestick_data(
+                session, pair, BASE_RESOLUTION, periods=(self.candle_periods + 1) * depth))
+        
+        results = await asyncio.gather(*fetches)
+        frames = dict(zip(direct, results))
+        if resampled:
+            derived = await asyncio.get_running_loop().run_in_executor(
+                self.executor, self.derive_frames, results[-1], resampled)
+            frames.update(derived)
+        return {tf: frames[tf] for tf in self.timeframes}
+    
+    async def check_resampling(self, session: Optional[aiohttp.ClientSession] = None,
+                               pairs: Optional[List[str]] = None, sample: int = 20) -> pd.DataFrame:
+        """Compare resampled 30/60/240 bars with the exchange's own for a sample of pairs before switching over"""
+        if session is None:
+            async with aiohttp.ClientSession() as own_session:
+                return await self.check_resampling(own_session, pairs, sample)
+        
+        if pairs is None:
+            pairs = (await self.data_fetcher.get_active_instruments(session))[:sample]
+        tf_keys = [tf for tf, config in self.timeframes.items() if config['resolution'] in RESAMPLED_RESOLUTIONS]
+        depth = max(RESAMPLED_RESOLUTIONS[self.timeframes[tf]['resolution']] for tf in tf_keys)
+        
+        async def check_pair(pair: str) -> List[Dict]:
+            base, *served = await asyncio.gather(
+                self.data_fetcher.fetch_candlestick_data(session, pair, BASE_RESOLUTION,
+                                                         periods=(self.candle_periods + 1) * depth),
+                *[self.data_fetcher.fetch_candlestick_data(session, pair, self.timeframes[tf]['resolution'])
+                  for tf in tf_keys]
+            )
+            derived = self.derive_frames(base, tf_keys)
+            return [dict(pair=pair, timeframe=tf, **compare_bars(derived[tf], served_df))
+                    for tf, served_df in zip(tf_keys, served)]
+        
+        rows = [row for rows in await asyncio.gather(*[check_pair(pair) for pair in pairs]) for row in rows]
+        report = pd.DataFrame(rows, columns=['pair', 'timeframe', 'compared', 'mismatched', 'missing_local',
+                                             'missing_served', 'max_rel_diff'])
+        
+        print(f"Resampling check over {len(pairs)} pairs:")
+        for tf, group in report.groupby('timeframe', sort=False):
+            print(f"  {tf:>4}: {group['compared'].sum()} bars compared, {group['mismatched'].sum()} mismatched, "
+                  f"{group['missing_local'].sum()} missing locally, {group['missing_served'].sum()} missing on exchange, "
+                  f"max relative difference {group['max_rel_diff'].max():.2e}")
+        return report
+    
+    async def fetch_pair_data(self, session: aiohttp.ClientSession, pair: str) -> Dict[str, CandleSeries]:
+        """Fetch candles for a single trading pair across all timeframes concurrently"""
+        frames = await self._fetch_frames(session, pair)
+        
+        pair_series = {}
+        for tf_key, df in frames.items():
             if df is not None and len(df) > 0:
-                indicators = self.calculate_technical_indicators(df)
-                pair_data[tf_key] = {
-                    'data': df,
-                    'indicators': indicators
-                }
+                pair_series[tf_key] = CandleSeries.from_frame(df, include_range=self.indicator_engine.needs_range)
+                if self.keep_candles:
+                    self.candles.setdefault(pair, {})[tf_key] = df
         
+        return pair_series
+    
+    def _compute_indicators(self, series: List[CandleSeries]) -> Dict[str, np.ndarray]:
+        if self.indicator_engine.needs_range:
+            return self.indicator_engine.compute([s.close for s in series], [s.volume for s in series],
+                                                 [s.high for s in series], [s.low for s in series])
+        return self.indicator_engine.compute([s.close for s in series], [s.volume for s in series])
+    
+    def score_pairs(self, pairs: List[str], pair_series: List[Dict[str, CandleSeries]]) -> pd.DataFrame:
+        """Compute indicators for a batch of pairs one timeframe at a time and score them as one table, unranked"""
+        indicators = {}
+        
+        with self._stage('indicators'):
+            for tf_key in self.timeframes:
+                rows = [i for i, series in enumerate(pair_series) if tf_key in series]
+                if not rows:
+                    continue
+                batch = self._compute_indicators([pair_series[i][tf_key] for i in rows])
+                indicators[tf_key] = {}
+                for field in self.indicator_engine.fields:
+                    values = np.full(len(pairs), np.nan)
+                    values[rows] = batch[field]
+                    indicators[tf_key][field] = values
+                valid = np.zeros(len(pairs), dtype=bool)
+                valid[rows] = batch['valid']
+                indicators[tf_key]['valid'] = valid
+        
+        table = build_results_table(pairs, indicators, self.timeframes, self.indicator_engine.fields)
+        with self._stage('scoring'):
+            table['momentum_score'] = self.calculate_momentum_scores(table)
+        return table
+    
+    def analyze_pairs(self, pairs: List[str], pair_series: List[Dict[str, CandleSeries]]) -> pd.DataFrame:
+        """Compute indicators for the whole universe one timeframe at a time and score it as one table"""
+        return rank_results(self.score_pairs(pairs, pair_series))
+    
+    async def _fetch_indexed(self, session: aiohttp.ClientSession, index: int, pair: str):
+        try:
+            pair_series = await self.fetch_pair_data(session, pair)
+        except Exception:
+            pair_series = None
         if self.pbar:
             self.pbar.update(1)
+        return index, pair_series
+    
+    async def _stream_batches(self, session: aiohttp.ClientSession, instruments: List[str]) -> pd.DataFrame:
+        """Fetch pairs concurrently and score them in batches of `score_batch` as they complete.
+
+        Each batch feeds the live summary behind the provisional report; the batches come back as one
+        unranked table in instrument order.
+        """
+        loop = asyncio.get_running_loop()
+        price_column = indicator_column('current_price', '15')
+        provisional_after = None
+        if self.provisional_report_at is not None and 'report' in self.outputs:
+            provisional_after = max(1, int(len(instruments) * self.provisional_report_at))
+            if provisional_after >= len(instruments):
+                provisional_after = None
+        tables, pending = [], []
         
-        if pair_data:
-            momentum_score = self.calculate_momentum_score(pair_data)
-            return {
-                'pair': pair,
-                'momentum_score': momentum_score,
-                'timeframe_data': pair_data
-            }
+        async def score_pending():
+            indices = [index for index, _ in pending]
+            series = [pair_series for _, pair_series in pending]
+            pending.clear()
+            table = await loop.run_in_executor(self.executor, self.score_pairs,
+                                               [instruments[i] for i in indices], series)
+            table.index = indices
+            tables.append(table)
+            prices = table[price_column].tolist()
+            for index, pair, score, price in zip(indices, table['pair'], table['momentum_score'].tolist(), prices):
+                self.summary.add(index, pair, score, price)
+        
+        tasks = [asyncio.ensure_future(self._fetch_indexed(session, i, pair)) for i, pair in enumerate(instruments)]
+        try:
+            for completed in asyncio.as_completed(tasks):
+                index, pair_series = await completed
+                if pair_series:
+                    pending.append((index, pair_series))
+                reached = provisional_after is not None and self.summary.count + len(pending) >= provisional_after
+                if len(pending) >= self.score_batch or (reached and pending):
+                    await score_pending()
+                if reached and self.summary.count >= provisional_after:
+                    self.report_generator.write_report(self.summary, self.timeframes, provisional=True)
+                    provisional_after = None
+            if pending:
+                await score_pending()
+        finally:
+            for task in tasks:
+                task.cancel()
         
-        return None
+        if not tables:
+            return build_results_table([], {}, self.timeframes, self.indicator_engine.fields)
+        return pd.concat(tables).sort_index()
+    
+    async def discover_instruments(self, session: aiohttp.ClientSession) -> List[str]:
+        if self.instrument_registry is not None:
+            return await self.instrument_registry.get(session)
+        return await self.data_fetcher.get_active_instruments(session)
+    
+    async def _on_instruments_changed(self, session: aiohttp.ClientSession, added: List[str], delisted: List[str]):
+        """Backfill the candle cache for new listings and evict delisted pairs from it"""
+        if self.candle_store is None:
+            return
+        loop = asyncio.get_running_loop()
+        for pair in delisted:
+            await loop.run_in_executor(self.executor, self.candle_store.evict, pair)
+        if added:
+            await asyncio.gather(*[self._fetch_frames(session, pair) for pair in added])
+            print(f"Backfilled candle history for {len(added)} new instruments")
+    
+    def _stage(self, name: str):
+        return self.cycle_metrics.stage(name) if self.cycle_metrics is not None else nullcontext()
+    
+    def _finish_metrics(self, cycle: Optional[CycleMetrics]):
+        if cycle is None:
+            return
+        snapshot = self.metrics.finish_cycle(cycle)
+        stages = ", ".join(f"{name} {stage['wall_seconds']:.2f}s" for name, stage in snapshot['stages'].items())
+        print(f"Cycle metrics ({snapshot['total_wall_seconds']:.1f}s): {stages}")
+    
+    async def _render(self, results: pd.DataFrame, cycle: Optional[CycleMetrics], charts: Optional[List[str]] = None,
+                      state=None):
+        try:
+            with cycle.stage('visualization') if cycle is not None else nullcontext():
+                saved = await self.visualizer.create_visualizations_async(results, self.timeframes, charts)
+            # Only charts that actually made it to disk count as written, from the cycle they were drawn from
+            self._written(*[f'chart:{name}' for name in saved], state=state)
+        finally:
+            self._finish_metrics(cycle)
+    
+    def _start_rendering(self, results: pd.DataFrame, cycle: Optional[CycleMetrics] = None,
+                         charts: Optional[List[str]] = None) -> bool:
+        """Render charts in the background once the report and CSV are published"""
+        if self.render_task is not None and not self.render_task.done():
+            print("Previous visualizations are still rendering, skipping charts for this cycle")
+            return False
+        state = self.change_tracker.current if self.change_tracker is not None else None
+        self.render_task = asyncio.create_task(self._render(results, cycle, charts, state))
+        return True
+    
+    def _changed(self, artifact: str, inputs='table') -> bool:
+        """Whether `artifact` has to be regenerated this cycle, see ChangeTracker.stale"""
+        return self.change_tracker is None or not self.skip_unchanged or self.change_tracker.stale(artifact, inputs)
+    
+    def _written(self, *artifacts: str, state=None):
+        if self.change_tracker is not None and artifacts:
+            self.change_tracker.written(artifacts, state)
+    
+    async def wait_for_outputs(self):
+        if self.render_task is not None:
+            await self.render_task
     
-    async def run_analysis(self):
+    def close(self):
+        if self.shard_pool is not None:
+            self.shard_pool.close()
+        if self._visualizer is not None:
+            self._visualizer.close()
+        self.executor.shutdown(wait=True)
+        if self._file_manager is not None:
+            self._file_manager.close()
+        if self.candle_store is not None:
+            self.candle_store.close()
+    
+    async def run_analysis(self, session: Optional[aiohttp.ClientSession] = None):
+        if session is None:
+            async with aiohttp.ClientSession() as own_session:
+                try:
+                    return await self.run_analysis(own_session)
+                finally:
+                    # A background instrument refresh needs the session it was started with
+                    if self.instrument_registry is not None:
+                        await self.instrument_registry.wait_for_refresh()
+        
+        cycle = self.metrics.start_cycle() if self.metrics is not None else None
+        self.cycle_metrics = cycle
+        self.data_fetcher.metrics = cycle
+        # The background render task writes the metrics snapshot once the charts are done
+        self._metrics_handed_off = False
+        try:
+            return await self._run_cycle(session)
+        finally:
+            self.cycle_metrics = None
+            self.data_fetcher.metrics = None
+            if not self._metrics_handed_off:
+                self._finish_metrics(cycle)
+    
+    async def _analyze_sharded(self, instruments: List[str]) -> pd.DataFrame:
+        """Fetch and score the universe in the shard workers, then rank the merged table here"""
+        print(f"Splitting the universe across {self.shard_pool.shards} worker processes...")
+        with self._stage('fetch'):
+            table, reports = await self.shard_pool.analyze(self, instruments)
+        
+        stats = {key: sum(report['stats'][key] for report in reports) for key in self.data_fetcher.stats}
+        print(f"Fetch stats: {self.data_fetcher.format_stats(stats)}")
+        if self.cycle_metrics is not None:
+            self.cycle_metrics.counters.update(stats)
+            for report in reports:
+                self.cycle_metrics.merge(report['metrics'])
+        
+        with self._stage('ranking'):
+            valid_results = rank_results(table)
+            self.summary = self.report_generator.summarize(valid_results) if 'report' in self.outputs else None
+        return valid_results
+    
+    async def _run_cycle(self, session: aiohttp.ClientSession):
         print("Starting Crypto Momentum Analysis System")
         print("=" * 60)
         
-        instruments = await self.data_fetcher.get_active_instruments()
+        self.data_fetcher.reset_stats()
+        with self._stage('discovery'):
+            instruments = await self.discover_instruments(session)
         if not instruments:
             print("No instruments found. Exiting.")
             return
         
         print(f"Analyzing {len(instruments)} instruments across 5 timeframes...")
         
-        self.pbar = tqdm(total=len(instruments), desc="Analyzing pairs", unit="pair")
-        
-        async with aiohttp.ClientSession() as session:
-            tasks = [self.analyze_pair(session, pair) for pair in instruments]
-            results = await asyncio.gather(*tasks, return_exceptions=True)
-        
-        self.pbar.close()
-        
-        valid_results = [r for r in results if r and not isinstance(r, Exception)]
+        self.candles = {}
+        if self.shard_pool is not None:
+            valid_results = await self._analyze_sharded(instruments)
+        else:
+            from tqdm import tqdm
+            self.pbar = tqdm(total=len(instruments), desc="Analyzing pairs", unit="pair")
+            
+            self.summary = MomentumSummary(expected=len(instruments))
+            with self._stage('fetch'):
+                table = await self._stream_batches(session, instruments)
+            
+            self.pbar.close()
+            print(f"Fetch stats: {self.data_fetcher.format_stats()}")
+            if self.cycle_metrics is not None:
+                self.cycle_metrics.counters.update(self.data_fetcher.stats)
+            
+            # Batches were scored on their own; the final table is scored once, so every score sees the whole universe
+            with self._stage('scoring'):
+                table['momentum_score'] = self.calculate_momentum_scores(table)
+            with self._stage('ranking'):
+                valid_results = rank_results(table.reset_index(drop=True))
+                self.summary = self.report_generator.summarize(valid_results) if 'report' in self.outputs else None
         
-        if not valid_results:
+        if len(valid_results) == 0:
             print("No valid results obtained. Exiting.")
             return
         
-        valid_results.sort(key=lambda x: x['momentum_score'], reverse=True)
         self.results = valid_results
         
         print(f"Analysis complete! Processed {len(valid_results)} pairs successfully")
         
-        self.report_generator.generate_insights_report(self.results, self.timeframes)
-        self.visualizer.create_visualizations(self.results, self.timeframes)
-        self.file_manager.export_to_csv(self.results, self.timeframes)
+        timestamp = datetime.now()
+        if 'snapshot' in self.outputs:
+            # Published first: it is what query API readers poll for
+            with self._stage('snapshot'):
+                write_snapshot(self.snapshot_path, self.results, self.timeframes, self.indicator_engine.fields, timestamp)
+        if self.change_tracker is not None:
+            self.change_tracker.observe(self.results, timestamp)
+        
+        unchanged = []
+        if 'report' in self.outputs:
+            if self._changed('report'):
+                with self._stage('report'):
+                    self.report_generator.write_report(self.summary, self.timeframes)
+                self._written('report')
+            else:
+                self.report_generator.discard_provisional()
+                unchanged.append('report')
+        if 'export' in self.outputs or 'json' in self.outputs:
+            with self._stage('export'):
+                if 'export' in self.outputs:
+                    # The history store is the time series, so every cycle is appended to it
+                    write_csv = self.export_format in ('csv', 'both') and self._changed('csv')
+                    self.file_manager.export_results(self.results, self.timeframes, timestamp, write_csv=write_csv)
+                    if write_csv:
+                        self._written('csv')
+                    elif self.export_format in ('csv', 'both'):
+                        unchanged.append('csv')
+                if 'json' in self.outputs:
+                    if self._changed('json'):
+                        self.file_manager.export_scores_json(self.results, timestamp)
+                        self._written('json')
+                    else:
+                        unchanged.append('json')
+        if 'charts' in self.outputs:
+            from .visualizer import CHARTS, CHART_INPUTS
+            charts = [name for name, _ in CHARTS if self._changed(f'chart:{name}', CHART_INPUTS.get(name, 'table'))]
+            unchanged += [name for name, _ in CHARTS if name not in charts]
+            if charts:
+                self._metrics_handed_off = self._start_rendering(self.results, self.cycle_metrics, charts)
+        if unchanged:
+            print(f"Inputs unchanged since last written, kept: {', '.join(unchanged)}")
+        
+        if self.retention is not None:
+            await asyncio.get_running_loop().run_in_executor(self.executor, self.retention.run)
         
         return valid_results
\ No newline at end of file
@@ -1,65 +1,292 @@
 import asyncio
 import aiohttp
+import json
 import pandas as pd
+import random
 import time
-from typing import List, Optional
+from concurrent.futures import Executor
+from contextlib import nullcontext
+from typing import Any, Dict, List, Optional
+from .candle_store import CandleStore
+from .rate_limiter import AdaptiveConcurrencyLimiter, TokenBucket
+from .utils.metrics import CycleMetrics
+
+try:
+    import orjson
+    json_loads = orjson.loads
+except ImportError:
+    json_loads = json.loads
+
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
 
 class DataFetcher:
-    def __init__(self, max_concurrent=15):
+    def __init__(self, max_concurrent=15, candle_store: Optional[CandleStore] = None,
+                 requests_per_second: float = 100, max_retries: int = 3,
+                 backoff_base: float = 0.5, backoff_cap: float = 10.0,
+                 executor: Optional[Executor] = None):
         self.base_url = "https://public.coindcx.com/market_data/candlesticks"
         self.active_instruments_url = "https://api.coindcx.com/exchange/v1/derivatives/futures/data/active_instruments?margin_currency_short_name[]=USDT"
-        self.semaphore = asyncio.Semaphore(max_concurrent)
+        self.limiter = AdaptiveConcurrencyLimiter(initial=max_concurrent, maximum=max(max_concurrent * 4, 4))
+        self.rate_limiter = TokenBucket(requests_per_second)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.candle_store = candle_store
+        # Decoding, DataFrame construction and store merges run here so they never hold a request slot
+        self.executor = executor
+        # Slow frames are served from the store until the bar that was forming at the last fetch has closed
+        self.skip_unclosed_timeframes = {'240', '1D'}
+        self.stats = {}
+        self.reset_stats()
+        # Set by the analyzer for the duration of a cycle
+        self.metrics: Optional[CycleMetrics] = None
+    
+    def reset_stats(self):
+        self.stats = {
+            'requests': 0,
+            'succeeded': 0,
+            'failed': 0,
+            'retries': 0,
+            'throttled': 0,
+            'cache_hits': 0
+        }
+    
+    def format_stats(self, stats: Optional[Dict] = None) -> str:
+        """One-line summary of this fetcher's stats, or of `stats` summed from several fetchers"""
+        summary = stats if stats is not None else self.stats
+        line = (f"{summary['requests']} requests, {summary['succeeded']} succeeded, "
+                f"{summary['failed']} failed, {summary['retries']} retries, "
+                f"{summary['throttled']} throttled, {summary['cache_hits']} served from cache")
+        if stats is None:
+            line += f", concurrency limit {self.limiter.current_limit}"
+        return line
+    
+    @staticmethod
+    def _retry_after(response: aiohttp.ClientResponse) -> Optional[float]:
+        value = response.headers.get('Retry-After')
+        if value is None:
+            return None
+        try:
+            return max(float(value), 0.0)
+        except ValueError:
+            return None
+    
+    def _backoff_delay(self, attempt: int) -> float:
+        """Full-jitter exponential backoff"""
+        return random.uniform(0, min(self.backoff_cap, self.backoff_base * 2 ** attempt))
+    
+    def _stage(self, name: str):
+        return self.metrics.stage(name) if self.metrics is not None else nullcontext()
+    
+    def _observe(self, started: float, nbytes: int, status: str):
+        if self.metrics is not None:
+            self.metrics.observe_request(time.perf_counter() - started, nbytes, status)
+    
+    async def _run_blocking(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+    
+    async def _request(self, session: aiohttp.ClientSession, url: str,
+                       params: Optional[Dict] = None, description: str = "",
+                       headers: Optional[Dict] = None, response_info: Optional[Dict] = None) -> Optional[bytes]:
+        """GET a raw response body, retrying throttled, 5xx and connection failures with jittered backoff.
+        
+        A 304 answer to a conditional request returns an empty body; `response_info` receives the
+        status and headers of the successful response.
+        """
+        for attempt in range(self.max_retries + 1):
+            retry_after = None
+            
+            await self.rate_limiter.acquire()
+            async with self.limiter.slot():
+                self.stats['requests'] += 1
+                started = time.perf_counter()
+                try:
+                    async with session.get(url, params=params, headers=headers) as response:
+                        if response.status in (200, 304):
+                            body = await response.read() if response.status == 200 else b""
+                            self._observe(started, len(body), str(response.status))
+                            self.stats['succeeded'] += 1
+                            self.limiter.on_success()
+                            if response_info is not None:
+                                response_info.update(status=response.status, headers=response.headers)
+                            return body
+                        
+                        self._observe(started, 0, str(response.status))
+                        if response.status not in RETRYABLE_STATUSES:
+                            print(f"Request for {description} failed: {response.status}")
+                            self.stats['failed'] += 1
+                            return None
+                        
+                        if response.status == 429:
+                            self.stats['throttled'] += 1
+                        retry_after = self._retry_after(response)
+                        if retry_after is not None:
+                            self.rate_limiter.pause(retry_after)
+                except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    self._observe(started, 0, 'error')
+                    if attempt == self.max_retries:
+                        print(f"Error fetching {description}: {str(e)}")
+            
+            self.limiter.on_failure()
+            if attempt < self.max_retries:
+                self.stats['retries'] += 1
+                await asyncio.sleep(max(self._backoff_delay(attempt), retry_after or 0))
+        
+        self.stats['failed'] += 1
+        return None
+    
+    async def _request_json(self, session: aiohttp.ClientSession, url: str,
+                            params: Optional[Dict] = None, description: str = "") -> Optional[Any]:
+        body = await self._request(session, url, params, description)
+        return json_loads(body) if body is not None else None
+        
+    async def fetch_instrument_list(self, session: aiohttp.ClientSession, etag: Optional[str] = None,
+                                    last_modified: Optional[str] = None) -> Optional[Dict]:
+        """Conditionally fetch the active USDT instruments.
+        
+        Returns None on failure, otherwise `instruments` (None when unchanged since `etag`/`last_modified`)
+        plus the validators to send next time.
+        """
+        headers = {}
+        if etag:
+            headers['If-None-Match'] = etag
+        if last_modified:
+            headers['If-Modified-Since'] = last_modified
+        
+        info = {}
+        body = await self._request(session, self.active_instruments_url, description="instruments",
+                                   headers=headers, response_info=info)
+        if body is None:
+            return None
+        
+        result = {
+            'instruments': None,
+            'etag': info['headers'].get('ETag', etag),
+            'last_modified': info['headers'].get('Last-Modified', last_modified)
+        }
+        if info['status'] == 200:
+            data = json_loads(body)
+            result['instruments'] = [item for item in data if isinstance(item, str) and 'USDT' in item]
+        return result
+    
+    async def get_active_instruments(self, session: Optional[aiohttp.ClientSession] = None) -> List[str]:
+        if session is None:
+            async with aiohttp.ClientSession() as own_session:
+                return await self.get_active_instruments(own_session)
         
-    async def get_active_instruments(self) -> List[str]:
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(self.active_instruments_url) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        instruments = [item for item in data if isinstance(item, str) and 'USDT' in item]
-                        print(f"Found {len(instruments)} active USDT instruments")                
-                        return instruments
-                    else:
-                        print(f"Failed to fetch instruments: {response.status}")
-                        return []
+            result = await self.fetch_instrument_list(session)
+            if result is not None:
+                instruments = result['instruments']
+                print(f"Found {len(instruments)} active USDT instruments")                
+                return instruments
+            else:
+                print("Failed to fetch instruments")
+                return []
         except Exception as e:
             print(f"Error fetching instruments: {str(e)}")
             return []
     
+    @staticmethod
+    def timeframe_seconds(timeframe: str) -> int:
+        if timeframe == '1D':
+            return 24 * 60 * 60
+        elif timeframe in ['15', '30', '60', '240']:
+            return int(timeframe) * 60
+        return 60 * 60
+    
+    def _cached_window(self, pair: str, timeframe: str, start_time: int) -> Optional[pd.DataFrame]:
+        with self._stage('cache_load'):
+            df = self.candle_store.load_window(pair, timeframe, start_time * 1000)
+        if len(df) == 0:
+            return None
+        df['timestamp'] = pd.to_datetime(df['time'], unit='ms')
+        return df
+    
+    def _parse_candles(self, body: bytes, pair: str, timeframe: str, start_time: int) -> Optional[pd.DataFrame]:
+        # parse, cache_store and cache_load are timed side by side rather than nested, so none is counted twice
+        with self._stage('parse'):
+            data = json_loads(body)
+            if not isinstance(data, dict) or data.get('s') != 'ok':
+                return None
+            
+            if self.candle_store is None:
+                if data.get('data'):
+                    df = pd.DataFrame(data['data'])
+                    df['timestamp'] = pd.to_datetime(df['time'], unit='ms')
+                    df = df.sort_values('timestamp')
+                    return df
+                return None
+        
+        if data.get('data'):
+            with self._stage('cache_store'):
+                self.candle_store.upsert(pair, timeframe, pd.DataFrame(data['data']))
+        return self._cached_window(pair, timeframe, start_time)
+    
+    async def fetch_history(self, session: aiohttp.ClientSession, pair: str, timeframe: str,
+                            start_time: int, end_time: Optional[int] = None, chunk_bars: int = 1000) -> int:
+        """Fill the candle store with bars opened between `start_time` and `end_time` (seconds), in chunks.
+        
+        Returns the number of bars stored; chunks that fail are skipped and can be refetched later.
+        """
+        if self.candle_store is None:
+            raise ValueError("Fetching history needs a candle store")
+        
+        end_time = end_time or int(time.time())
+        interval = self.timeframe_seconds(timeframe)
+        chunks = [(from_time, min(from_time + chunk_bars * interval, end_time))
+                  for from_time in range(start_time, end_time, chunk_bars * interval)]
+        
+        async def fetch_chunk(from_time: int, to_time: int) -> int:
+            params = {'pair': pair, 'from': from_time, 'to': to_time, 'resolution': timeframe, 'pcode': 'f'}
+            body = await self._request(session, self.base_url, params, description=f"{pair} {timeframe} history")
+            if body is None:
+                return 0
+            return await self._run_blocking(self._store_history, body, pair, timeframe)
+        
+        return sum(await asyncio.gather(*[fetch_chunk(*chunk) for chunk in chunks]))
+    
+    def _store_history(self, body: bytes, pair: str, timeframe: str) -> int:
+        data = json_loads(body)
+        if not isinstance(data, dict) or data.get('s') != 'ok' or not data.get('data'):
+            return 0
+        self.candle_store.upsert(pair, timeframe, pd.DataFrame(data['data']))
+        return len(data['data'])
+    
     async def fetch_candlestick_data(self, session: aiohttp.ClientSession, 
                                    pair: str, timeframe: str, periods: int = 100) -> Optional[pd.DataFrame]:
-        async with self.semaphore:
-            try:
-                end_time = int(time.time())
-                
-                if timeframe == '1D':
-                    start_time = end_time - (periods * 24 * 60 * 60)
-                elif timeframe in ['15', '30', '60', '240']:
-                    minutes = int(timeframe)
-                    start_time = end_time - (periods * minutes * 60)
-                else:
-                    start_time = end_time - (periods * 60 * 60)
-                
-                params = {
-                    'pair': pair,
-                    'from': start_time,
-                    'to': end_time,
-                    'resolution': timeframe,
-                    'pcode': 'f'
-                }
+        try:
+            end_time = int(time.time())
+            interval = self.timeframe_seconds(timeframe)
+            start_time = end_time - (periods * interval)
+            from_time = start_time
+            
+            if self.candle_store is not None:
+                # A store lookup waits on the lock that parse threads hold while committing, so it stays off the loop
+                stored = await self._run_blocking(self.candle_store.bar_range, pair, timeframe)
+                # Fetching only the new bars is enough when the store also reaches back to the window start;
+                # otherwise (say, a deeper window than before) the whole window is fetched to backfill the gap
+                if stored is not None and stored[1] // 1000 >= start_time and stored[0] // 1000 <= start_time + interval:
+                    last_time = stored[1] // 1000
+                    if timeframe in self.skip_unclosed_timeframes and end_time < last_time + interval:
+                        self.stats['cache_hits'] += 1
+                        return await self._run_blocking(self._cached_window, pair, timeframe, start_time)
+                    # Re-fetch the last stored bar as well, it may have been stored while still forming
+                    from_time = last_time
+            
+            params = {
+                'pair': pair,
+                'from': from_time,
+                'to': end_time,
+                'resolution': timeframe,
+                'pcode': 'f'
+            }
+            
+            body = await self._request(session, self.base_url, params, description=f"{pair} {timeframe}")
+            if body is None:
+                return None
+            return await self._run_blocking(self._parse_candles, body, pair, timeframe, start_time)
                 
-                async with session.get(self.base_url, params=params) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        if data.get('s') == 'ok' and data.get('data'):
-                            df = pd.DataFrame(data['data'])
-                            df['timestamp'] = pd.to_datetime(df['time'], unit='ms')
-                            df = df.sort_values('timestamp')
-                            return df
-                    
-                    await asyncio.sleep(0.1)
-                    return None
-                    
-            except Exception as e:
-                print(f"Error fetching {pair} {timeframe}: {str(e)}")
-                return None
\ No newline at end of file
+        except Exception as e:
+            print(f"Error fetching {pair} {timeframe}: {str(e)}")
+            return None
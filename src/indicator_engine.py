@@ -0,0 +1,436 @@
+import numpy as np
+from collections import deque
+from functools import partial
+import pandas as pd
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+class CandleSeries:
+    """Close and volume arrays of one candle frame, plus high/low when a registered indicator reads them"""
+
+    __slots__ = ('close', 'volume', 'high', 'low')
+
+    def __init__(self, close: np.ndarray, volume: np.ndarray,
+                 high: Optional[np.ndarray] = None, low: Optional[np.ndarray] = None):
+        self.close = close
+        self.volume = volume
+        self.high = high
+        self.low = low
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, include_range: bool = False) -> 'CandleSeries':
+        if include_range:
+            return cls(df['close'].to_numpy(dtype=float), df['volume'].to_numpy(dtype=float),
+                       df['high'].to_numpy(dtype=float), df['low'].to_numpy(dtype=float))
+        return cls(df['close'].to_numpy(dtype=float), df['volume'].to_numpy(dtype=float))
+
+    def __len__(self) -> int:
+        return len(self.close)
+
+def pack(series: List[Optional[np.ndarray]]) -> Tuple[np.ndarray, np.ndarray]:
+    """Right-align series into a NaN-padded (n_series, max_len) array; missing series get length 0"""
+    lengths = np.array([len(s) if s is not None else 0 for s in series], dtype=np.int64)
+    width = int(lengths.max()) if len(lengths) else 0
+    packed = np.full((len(series), width), np.nan)
+    for i, s in enumerate(series):
+        if lengths[i]:
+            packed[i, width - lengths[i]:] = s
+    return packed, lengths
+
+class IndicatorBatch:
+    """One evaluation of a registry over packed series; every node is computed at most once"""
+
+    def __init__(self, registry: 'IndicatorRegistry', sources: Dict[str, np.ndarray], lengths: np.ndarray):
+        self.registry = registry
+        self.values: Dict[str, np.ndarray] = dict(sources)
+        self.lengths = lengths
+        self.width = next(iter(sources.values())).shape[1]
+        # Column of each row's first real value
+        self.starts = self.width - lengths
+
+    def get(self, name: str) -> np.ndarray:
+        if name not in self.values:
+            inputs, func = self.registry.nodes[name]
+            self.values[name] = func(self, *[self.get(dependency) for dependency in inputs])
+        return self.values[name]
+
+    def indicator(self, name: str) -> np.ndarray:
+        inputs, func = self.registry.outputs[name]
+        return func(self, *[self.get(dependency) for dependency in inputs])
+
+class IndicatorRegistry:
+    """Indicators and the intermediates they share, declared as a dependency graph over packed arrays.
+
+    Sources ('close', 'volume', 'high', 'low') are (n_series, width) arrays, right-aligned and
+    NaN-padded. Intermediates are keyed by name, so two indicators that declare the same input,
+    such as close diffs or an EMA of close, share one computation per batch. Indicators reduce
+    their inputs to one value per series and become `<name>_<timeframe>` result columns; they live
+    in their own namespace, so an indicator may share a source's name (the default 'volume').
+    """
+
+    SOURCES = ('close', 'volume', 'high', 'low')
+
+    def __init__(self):
+        self.nodes: Dict[str, Tuple[List[str], Callable]] = {}
+        self.outputs: Dict[str, Tuple[List[str], Callable]] = {}
+
+    def intermediate(self, name: str, inputs: List[str], func: Callable) -> str:
+        """Register `func(batch, *inputs)`; re-registering a name keeps the first definition"""
+        self.nodes.setdefault(name, (list(inputs), func))
+        return name
+
+    def indicator(self, name: str, inputs: List[str], func: Callable) -> str:
+        """Register `func(batch, *inputs)` returning one value per series"""
+        if name in self.outputs:
+            raise ValueError(f"Indicator '{name}' is already registered")
+        self.outputs[name] = (list(inputs), func)
+        return name
+
+    @property
+    def indicators(self) -> List[str]:
+        return list(self.outputs)
+
+    def required_sources(self) -> Set[str]:
+        required, pending = set(), [name for inputs, _ in self.outputs.values() for name in inputs]
+        while pending:
+            name = pending.pop()
+            if name in self.SOURCES:
+                required.add(name)
+            elif name in self.nodes:
+                pending.extend(self.nodes[name][0])
+        return required
+
+    def diff(self, source: str = 'close') -> str:
+        return self.intermediate(f"diff({source})", [source], _diff)
+
+    def ewm(self, source: str, alpha: float) -> str:
+        """Exponentially weighted mean of every prefix, matching pandas ewm(alpha, adjust=False)"""
+        return self.intermediate(f"ewm({source},{alpha!r})", [source], partial(_ewm, alpha=alpha))
+
+    def wilder_gain_loss(self, window: int) -> Tuple[str, str]:
+        gain = self.intermediate("gain(close)", [self.diff('close')], _gain)
+        loss = self.intermediate("loss(close)", [self.diff('close')], _loss)
+        return self.ewm(gain, 1.0 / window), self.ewm(loss, 1.0 / window)
+
+    def recent_mean(self, source: str, window: int) -> str:
+        return self.intermediate(f"recent_mean({source},{window})", [source], partial(_recent_mean, window=window))
+
+    @classmethod
+    def default(cls, rsi_window: int = 14, volume_window: int = 5,
+                price_change_period: int = 20) -> 'IndicatorRegistry':
+        """The analyzer's indicators: RSI, volume ratio, price change, current price and recent volume"""
+        registry = cls()
+        registry.indicator('rsi', list(registry.wilder_gain_loss(rsi_window)), partial(_rsi, window=rsi_window))
+        recent_volume = registry.recent_mean('volume', volume_window)
+        registry.indicator('volume_ratio', [recent_volume, 'volume'], _volume_ratio)
+        registry.indicator('price_change', ['close'], partial(_price_change, period=price_change_period))
+        registry.indicator('current_price', ['close'], _last)
+        registry.indicator('volume', [recent_volume], _identity)
+        return registry
+
+    def add_ema(self, span: int) -> str:
+        """EMA of close as a percentage distance from the current price"""
+        return self.indicator(f"ema_{span}_gap", [self.ewm('close', 2.0 / (span + 1)), 'close'], _ema_gap)
+
+    def add_macd(self, fast: int = 12, slow: int = 26, signal: int = 9) -> List[str]:
+        """MACD line, signal and histogram, in percent of the current price so pairs are comparable"""
+        line = self.intermediate(f"macd({fast},{slow})",
+                                 [self.ewm('close', 2.0 / (fast + 1)), self.ewm('close', 2.0 / (slow + 1))], _subtract)
+        signal_line = self.ewm(line, 2.0 / (signal + 1))
+        return [
+            self.indicator('macd', [line, 'close'], _percent_of_price),
+            self.indicator('macd_signal', [signal_line, 'close'], _percent_of_price),
+            self.indicator('macd_hist', [self.intermediate(f"macd_hist({fast},{slow},{signal})", [line, signal_line],
+                                                           _subtract), 'close'], _percent_of_price)
+        ]
+
+    def add_atr(self, window: int = 14) -> str:
+        """Wilder average true range in percent of the current price"""
+        true_range = self.intermediate("true_range", ['high', 'low', 'close'], _true_range)
+        return self.indicator(f"atr_{window}", [self.ewm(true_range, 1.0 / window), 'close'], _percent_of_price)
+
+
+def _diff(batch: IndicatorBatch, values: np.ndarray) -> np.ndarray:
+    diff = np.full(values.shape, np.nan)
+    diff[:, 1:] = values[:, 1:] - values[:, :-1]
+    return diff
+
+def _gain(batch: IndicatorBatch, diff: np.ndarray) -> np.ndarray:
+    return np.where(diff > 0, diff, 0.0)
+
+def _loss(batch: IndicatorBatch, diff: np.ndarray) -> np.ndarray:
+    return np.where(diff < 0, -diff, 0.0)
+
+def _ewm(batch: IndicatorBatch, values: np.ndarray, alpha: float) -> np.ndarray:
+    decay = 1.0 - alpha
+    n_rows, width = values.shape
+    if width == 0:
+        return np.full(values.shape, np.nan)
+    # Walked column by column, so work on the transpose to keep each column contiguous
+    columns = np.ascontiguousarray(values.T)
+    out = np.full((width, n_rows), np.nan)
+    starts = batch.starts
+    rows = np.arange(n_rows)
+    first = np.minimum(starts, width - 1)
+    average = columns[first, rows]
+    out[first, rows] = average
+    # Past the latest start every row is active and the mask can be dropped
+    all_active = int(starts.max()) + 1
+    for j in range(int(starts.min()) + 1, width):
+        current = columns[j]
+        update = average != current
+        if j < all_active:
+            active = starts < j
+            update &= active
+            # pandas skips the update when the value equals the running average
+            average = np.where(update, (decay * average + alpha * current) / (decay + alpha), average)
+            out[j] = np.where(active, average, out[j])
+        else:
+            average = np.where(update, (decay * average + alpha * current) / (decay + alpha), average)
+            out[j] = average
+    return out.T
+
+def _recent_mean(batch: IndicatorBatch, values: np.ndarray, window: int) -> np.ndarray:
+    return np.ascontiguousarray(values[:, -window:]).sum(axis=1) / window
+
+def _row_means(values: np.ndarray, lengths: np.ndarray) -> np.ndarray:
+    # Summed per length group so NumPy's pairwise summation sees the same rows pandas would
+    means = np.full(len(values), np.nan)
+    width = values.shape[1]
+    for length in np.unique(lengths[lengths > 0]):
+        rows = np.flatnonzero(lengths == length)
+        block = np.ascontiguousarray(values[rows, width - length:])
+        means[rows] = block.sum(axis=1) / length
+    return means
+
+def _rsi(batch: IndicatorBatch, avg_gain: np.ndarray, avg_loss: np.ndarray, window: int) -> np.ndarray:
+    avg_gain, avg_loss = avg_gain[:, -1], avg_loss[:, -1]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rsi = np.where(avg_loss == 0, 100.0, 100 - (100 / (1 + avg_gain / avg_loss)))
+    rsi[batch.lengths < window] = np.nan
+    return np.where(np.isnan(rsi), 50, rsi)
+
+def _volume_ratio(batch: IndicatorBatch, recent_volume: np.ndarray, volume: np.ndarray) -> np.ndarray:
+    avg_volume = _row_means(volume, batch.lengths)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(avg_volume > 0, recent_volume / avg_volume, 1)
+
+def _price_change(batch: IndicatorBatch, close: np.ndarray, period: int) -> np.ndarray:
+    current_price = close[:, -1]
+    base_price = close[:, -period]
+    return ((current_price - base_price) / base_price) * 100
+
+def _last(batch: IndicatorBatch, values: np.ndarray) -> np.ndarray:
+    return values[:, -1]
+
+def _identity(batch: IndicatorBatch, values: np.ndarray) -> np.ndarray:
+    return values
+
+def _subtract(batch: IndicatorBatch, a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    return a - b
+
+def _percent_of_price(batch: IndicatorBatch, values: np.ndarray, close: np.ndarray) -> np.ndarray:
+    return values[:, -1] / close[:, -1] * 100
+
+def _ema_gap(batch: IndicatorBatch, ema: np.ndarray, close: np.ndarray) -> np.ndarray:
+    return (close[:, -1] - ema[:, -1]) / ema[:, -1] * 100
+
+def _true_range(batch: IndicatorBatch, high: np.ndarray, low: np.ndarray, close: np.ndarray) -> np.ndarray:
+    previous_close = np.full(close.shape, np.nan)
+    previous_close[:, 1:] = close[:, :-1]
+    # fmax ignores the missing previous close of each row's first bar
+    return np.fmax(high - low, np.fmax(np.abs(high - previous_close), np.abs(low - previous_close)))
+
+
+class BatchIndicatorEngine:
+    """Computes the registered indicators for many candle series at once on padded 2-D arrays.
+
+    With the default registry the results match the per-pair `ta` code in benchmarks/reference.py
+    bit for bit: the Wilder recurrence reproduces the pandas adjust=False EWM used by ta, and
+    whole-series means are summed per length group as pandas would.
+    """
+
+    def __init__(self, rsi_window: int = 14, min_bars: int = 30, volume_window: int = 5,
+                 price_change_period: int = 20, registry: Optional[IndicatorRegistry] = None):
+        self.min_bars = min_bars
+        self.registry = registry or IndicatorRegistry.default(rsi_window, volume_window, price_change_period)
+
+    @property
+    def fields(self) -> List[str]:
+        return self.registry.indicators
+
+    @property
+    def needs_range(self) -> bool:
+        return bool({'high', 'low'} & self.registry.required_sources())
+
+    pack = staticmethod(pack)
+
+    def compute(self, closes: List[Optional[np.ndarray]], volumes: List[Optional[np.ndarray]],
+                highs: Optional[List[Optional[np.ndarray]]] = None,
+                lows: Optional[List[Optional[np.ndarray]]] = None) -> Dict[str, np.ndarray]:
+        """Indicators for every series; rows that are missing or too short are NaN with valid=False"""
+        close_arr, lengths = pack(closes)
+        n_rows = len(lengths)
+        valid = lengths >= self.min_bars
+
+        output = {'valid': valid}
+        if not valid.any():
+            for name in self.fields:
+                output[name] = np.full(n_rows, np.nan)
+            return output
+
+        # Only the sources some registered indicator reads are packed
+        required = self.registry.required_sources()
+        sources = {'close': close_arr[valid]}
+        for name, series in (('volume', volumes), ('high', highs), ('low', lows)):
+            if name in required:
+                if series is None:
+                    raise ValueError(f"A registered indicator needs '{name}' candles")
+                sources[name] = pack(series)[0][valid]
+
+        for name, values in self.compute_packed(sources, lengths[valid]).items():
+            full = np.full(n_rows, np.nan)
+            full[valid] = values
+            output[name] = full
+        return output
+
+    def compute_packed(self, sources: Dict[str, np.ndarray], lengths: np.ndarray) -> Dict[str, np.ndarray]:
+        """Indicators of rows that are already packed (right-aligned, NaN before each row's start) and long enough"""
+        batch = IndicatorBatch(self.registry, sources, lengths)
+        return {name: batch.indicator(name) for name in self.fields}
+
+class IncrementalIndicators:
+    """Indicators of one pair x timeframe kept up to date bar by bar in O(1) per update.
+
+    Closed bars fold into Wilder-smoothed gain/loss, running volume sums and a ring buffer
+    of recent closes; the forming bar is applied on top when indicators are read, so every
+    trade or candle update can be re-scored immediately. After seeding with a candle window
+    the values equal BatchIndicatorEngine's on that window. RSI then keeps smoothing over
+    the full streamed history, while volume averages cover the last `max_bars` bars.
+    """
+
+    def __init__(self, interval_ms: int, rsi_window: int = 14, min_bars: int = 30,
+                 volume_window: int = 5, price_change_period: int = 20, max_bars: int = 101):
+        self.interval_ms = interval_ms
+        self.rsi_window = rsi_window
+        self.min_bars = min_bars
+        self.volume_window = volume_window
+        self.alpha = 1.0 / rsi_window
+        self.decay = 1.0 - self.alpha
+
+        # Forming bar
+        self.bar_time: Optional[int] = None
+        self.close = np.nan
+        self.volume = 0.0
+
+        # Closed bars
+        self.closed_bars = 0
+        self.prev_close: Optional[float] = None
+        self.avg_gain = 0.0
+        self.avg_loss = 0.0
+        self.closes = deque(maxlen=price_change_period - 1)
+        # Closed-bar window, for indicators that have no incremental form
+        self.window_closes = deque(maxlen=max_bars - 1)
+        self.volumes = deque(maxlen=max_bars - 1)
+        self.volume_sum = 0.0
+        self.recent_volumes = deque(maxlen=volume_window - 1)
+        self.recent_volume_sum = 0.0
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, interval_ms: int, **kwargs) -> 'IncrementalIndicators':
+        """Seed from a candle window whose last row is the forming bar"""
+        state = cls(interval_ms, max_bars=max(len(df), 2), **kwargs)
+        for bar_time, close, volume in zip(df['time'].tolist(), df['close'].tolist(), df['volume'].tolist()):
+            state.update_candle(int(bar_time), close, volume)
+        return state
+
+    def _smooth(self, average: float, value: float) -> float:
+        # Same recurrence as the pandas adjust=False EWM, including skipping equal values
+        if average == value:
+            return average
+        return (self.decay * average + self.alpha * value) / (self.decay + self.alpha)
+
+    @staticmethod
+    def _push(ring: deque, total: float, value: float) -> float:
+        if len(ring) == ring.maxlen:
+            total -= ring[0]
+        ring.append(value)
+        return total + value
+
+    def _commit(self):
+        """Fold the forming bar into the closed-bar state"""
+        if self.prev_close is not None:
+            diff = self.close - self.prev_close
+            self.avg_gain = self._smooth(self.avg_gain, diff if diff > 0 else 0.0)
+            self.avg_loss = self._smooth(self.avg_loss, -diff if diff < 0 else 0.0)
+        self.prev_close = self.close
+        self.closed_bars += 1
+        self.closes.append(self.close)
+        self.window_closes.append(self.close)
+        self.volume_sum = self._push(self.volumes, self.volume_sum, self.volume)
+        self.recent_volume_sum = self._push(self.recent_volumes, self.recent_volume_sum, self.volume)
+        # Re-sum once per full window so subtraction error cannot accumulate
+        if self.closed_bars % self.volumes.maxlen == 0:
+            self.volume_sum = sum(self.volumes)
+            self.recent_volume_sum = sum(self.recent_volumes)
+
+    def _open_bar(self, bar_time: int) -> bool:
+        """Make `bar_time` the forming bar; False for updates to bars that already closed"""
+        if self.bar_time is None or bar_time > self.bar_time:
+            if self.bar_time is not None:
+                self._commit()
+            self.bar_time = bar_time
+            self.volume = 0.0
+            return True
+        return bar_time == self.bar_time
+
+    def update_candle(self, bar_time: int, close: float, volume: float) -> bool:
+        """Apply a candle snapshot (open time in ms); returns False if it was stale"""
+        if not self._open_bar(bar_time):
+            return False
+        self.close = close
+        self.volume = volume
+        return True
+
+    def add_trade(self, time_ms: int, price: float, quantity: float) -> bool:
+        """Aggregate one trade into the bar it falls in; returns False if it was stale"""
+        if not self._open_bar(time_ms - time_ms % self.interval_ms):
+            return False
+        self.close = price
+        self.volume += quantity
+        return True
+
+    def window(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Closes and volumes of the last `max_bars` bars, the forming one last"""
+        if self.bar_time is None:
+            return np.empty(0), np.empty(0)
+        return np.array([*self.window_closes, self.close]), np.array([*self.volumes, self.volume])
+
+    def indicators(self) -> Optional[Dict[str, float]]:
+        """Current values including the forming bar, None until `min_bars` bars have been seen"""
+        n_bars = self.closed_bars + 1
+        if self.bar_time is None or n_bars < self.min_bars:
+            return None
+
+        rsi = 50.0
+        if n_bars >= self.rsi_window:
+            avg_gain, avg_loss = self.avg_gain, self.avg_loss
+            if self.prev_close is not None:
+                diff = self.close - self.prev_close
+                avg_gain = self._smooth(avg_gain, diff if diff > 0 else 0.0)
+                avg_loss = self._smooth(avg_loss, -diff if diff < 0 else 0.0)
+            rsi = 100.0 if avg_loss == 0 else 100 - (100 / (1 + avg_gain / avg_loss))
+
+        recent_volume = (self.recent_volume_sum + self.volume) / self.volume_window
+        avg_volume = (self.volume_sum + self.volume) / (len(self.volumes) + 1)
+        volume_ratio = recent_volume / avg_volume if avg_volume > 0 else 1
+
+        base_price = self.closes[0] if len(self.closes) == self.closes.maxlen else np.nan
+        price_change = ((self.close - base_price) / base_price) * 100
+
+        return {
+            'rsi': rsi,
+            'volume_ratio': volume_ratio,
+            'price_change': price_change,
+            'current_price': self.close,
+            'volume': recent_volume
+        }
@@ -0,0 +1,115 @@
+import asyncio
+import aiohttp
+import json
+import os
+import time
+from typing import Awaitable, Callable, List, Optional
+from .data_fetcher import DataFetcher
+
+class InstrumentRegistry:
+    """TTL cache of the active instrument list, persisted so a failed refresh never empties a cycle.
+
+    A stale list is still served while a conditional (ETag / If-Modified-Since) refresh runs in
+    the background; listeners receive the added and delisted pairs whenever the list changes.
+    """
+
+    def __init__(self, data_fetcher: DataFetcher, path: str = os.path.join("data", "instruments.json"),
+                 ttl: float = 3600.0):
+        self.data_fetcher = data_fetcher
+        self.path = path
+        self.ttl = ttl
+        self.instruments: List[str] = []
+        self.etag: Optional[str] = None
+        self.last_modified: Optional[str] = None
+        self.fetched_at = 0.0
+        self.listeners: List[Callable[[aiohttp.ClientSession, List[str], List[str]], Awaitable[None]]] = []
+        self.refresh_task: Optional[asyncio.Task] = None
+        self._load()
+
+    def _ensure_directory_exists(self):
+        directory = os.path.dirname(self.path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path) as f:
+                state = json.load(f)
+            self.instruments = state['instruments']
+            self.etag = state.get('etag')
+            self.last_modified = state.get('last_modified')
+            self.fetched_at = state.get('fetched_at', 0.0)
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Ignoring unreadable instrument cache '{self.path}': {str(e)}")
+
+    def _save(self):
+        state = {
+            'instruments': self.instruments,
+            'etag': self.etag,
+            'last_modified': self.last_modified,
+            'fetched_at': self.fetched_at
+        }
+        self._ensure_directory_exists()
+        with open(self.path + ".tmp", 'w') as f:
+            json.dump(state, f)
+        os.replace(self.path + ".tmp", self.path)
+
+    def add_listener(self, listener: Callable[[aiohttp.ClientSession, List[str], List[str]], Awaitable[None]]):
+        """`await listener(session, added, delisted)` runs after every refresh that changes the list"""
+        self.listeners.append(listener)
+
+    @property
+    def is_fresh(self) -> bool:
+        return time.time() - self.fetched_at < self.ttl
+
+    async def refresh(self, session: aiohttp.ClientSession) -> bool:
+        """Conditionally refetch the list; False (keeping the last good list) if the request failed"""
+        try:
+            result = await self.data_fetcher.fetch_instrument_list(session, self.etag, self.last_modified)
+        except Exception as e:
+            print(f"Error refreshing instruments: {str(e)}")
+            return False
+        if result is None or (result['instruments'] is not None and not result['instruments']):
+            print("Instrument refresh failed, keeping the last good list")
+            return False
+
+        self.fetched_at = time.time()
+        self.etag = result['etag']
+        self.last_modified = result['last_modified']
+        added, delisted = [], []
+        if result['instruments'] is not None:
+            previous = set(self.instruments)
+            current = set(result['instruments'])
+            # The very first list is a baseline, not a batch of new listings
+            if previous:
+                added = [pair for pair in result['instruments'] if pair not in previous]
+                delisted = [pair for pair in self.instruments if pair not in current]
+            self.instruments = result['instruments']
+        self._save()
+
+        if added or delisted:
+            print(f"Instruments changed: {len(added)} added, {len(delisted)} delisted")
+            for listener in self.listeners:
+                try:
+                    await listener(session, added, delisted)
+                except Exception as e:
+                    print(f"Error handling instrument changes: {str(e)}")
+        return True
+
+    async def get(self, session: aiohttp.ClientSession) -> List[str]:
+        """Current instruments; only blocks on the network when no list has ever been fetched"""
+        if not self.instruments:
+            await self.refresh(session)
+        elif not self.is_fresh and (self.refresh_task is None or self.refresh_task.done()):
+            self.refresh_task = asyncio.ensure_future(self.refresh(session))
+
+        if self.instruments:
+            age = time.time() - self.fetched_at
+            print(f"Found {len(self.instruments)} active USDT instruments (list age {age / 60:.0f} min)")
+        return list(self.instruments)
+
+    async def wait_for_refresh(self):
+        if self.refresh_task is not None:
+            await self.refresh_task
@@ -0,0 +1,166 @@
+import asyncio
+import aiohttp
+import numpy as np
+import time
+from typing import Callable, Dict, List, Optional
+from .crypto_analyzer import CryptoMomentumAnalyzer
+from .data_fetcher import json_loads
+from .indicator_engine import IncrementalIndicators
+from .results_table import indicator_column, presence_column
+from .scoring import momentum_scores
+
+# What IncrementalIndicators keeps up to date; other registered indicators are recomputed from its bar window
+INCREMENTAL_FIELDS = ('rsi', 'volume_ratio', 'price_change', 'current_price', 'volume')
+
+class LiveMomentumStream:
+    """Streaming mode: seeds incremental indicator state over REST, then re-scores pairs on every live update.
+
+    The feed is a WebSocket that accepts `{"type": "subscribe", "pairs": [...]}` and sends trade
+    (`{"type": "trade", "pair", "price", "quantity", "time"}`) or candle (`{"type": "candle", "pair",
+    "resolution", "time", "close", "volume"}`) messages, one object or a list per frame, with times
+    in milliseconds. Trades are aggregated into the forming bar of every timeframe.
+    Pairs are scored with the analyzer's indicator registry and scoring components, like a cycle.
+    """
+
+    def __init__(self, analyzer: CryptoMomentumAnalyzer, feed_url: str,
+                 on_update: Optional[Callable[[str, float, Dict], None]] = None,
+                 report_interval: float = 10.0, max_reconnect_delay: float = 60.0):
+        self.analyzer = analyzer
+        self.feed_url = feed_url
+        self.on_update = on_update
+        self.report_interval = report_interval
+        self.max_reconnect_delay = max_reconnect_delay
+        self.engine = analyzer.indicator_engine
+        self.components = analyzer.active_scoring_components()
+        self.windowed_fields = [field for field in self.engine.fields if field not in INCREMENTAL_FIELDS]
+        if self.windowed_fields and self.engine.needs_range:
+            raise ValueError("Live mode cannot compute indicators that need high/low candles")
+        # states[pair][timeframe] -> incremental indicators of that pair x timeframe
+        self.states: Dict[str, Dict[str, IncrementalIndicators]] = {}
+        self.scores: Dict[str, float] = {}
+        self.updates = 0
+        self.stale_updates = 0
+
+    async def _seed_pair(self, session: aiohttp.ClientSession, pair: str):
+        fetcher = self.analyzer.data_fetcher
+        frames = await asyncio.gather(*[
+            fetcher.fetch_candlestick_data(session, pair, tf) for tf in self.analyzer.timeframes
+        ])
+        states = {}
+        for tf, df in zip(self.analyzer.timeframes, frames):
+            if df is not None and len(df) > 0:
+                states[tf] = IncrementalIndicators.from_frame(df, fetcher.timeframe_seconds(tf) * 1000)
+        if states:
+            self.states[pair] = states
+            self._rescore(pair)
+
+    async def seed(self, session: aiohttp.ClientSession, pairs: List[str]):
+        """Load the recent candle window of every pair and timeframe into fresh incremental state"""
+        started = time.time()
+        self.analyzer.data_fetcher.reset_stats()
+        await asyncio.gather(*[self._seed_pair(session, pair) for pair in pairs])
+        print(f"Seeded {len(self.states)} pairs in {time.time() - started:.1f}s "
+              f"({self.analyzer.data_fetcher.format_stats()})")
+
+    def _indicators(self, pair: str) -> Dict[str, Optional[Dict[str, float]]]:
+        states = self.states[pair]
+        indicators = {tf: state.indicators() for tf, state in states.items()}
+        if self.windowed_fields:
+            timeframes = [tf for tf, values in indicators.items() if values is not None]
+            windows = [states[tf].window() for tf in timeframes]
+            computed = self.engine.compute([closes for closes, _ in windows], [volumes for _, volumes in windows])
+            for row, tf in enumerate(timeframes):
+                indicators[tf].update((field, float(computed[field][row])) for field in self.windowed_fields)
+        return indicators
+
+    def _rescore(self, pair: str) -> float:
+        indicators = self._indicators(pair)
+        # A one-row results table, so the score is the one a cycle would give
+        table = {'pair': [pair]}
+        for tf in self.analyzer.timeframes:
+            values = indicators.get(tf) or {}
+            for field in self.engine.fields:
+                table[indicator_column(field, tf)] = np.array([values.get(field, np.nan)], dtype=float)
+            table[presence_column(tf)] = np.array([1.0 if values else 0.0])
+        score = float(momentum_scores(table, self.analyzer.timeframes, self.components)[0])
+        timeframe_data = {tf: {'indicators': values} for tf, values in indicators.items()}
+        self.scores[pair] = score
+        self.updates += 1
+        if self.on_update is not None:
+            self.on_update(pair, score, timeframe_data)
+        return score
+
+    def handle_event(self, event: Dict):
+        states = self.states.get(event.get('pair'))
+        if states is None:
+            return
+
+        kind = event.get('type')
+        if kind == 'trade':
+            # Every timeframe takes the trade, so no short-circuiting here
+            applied = any([state.add_trade(int(event['time']), float(event['price']), float(event['quantity']))
+                           for state in states.values()])
+        elif kind == 'candle' and event.get('resolution') in states:
+            applied = states[event['resolution']].update_candle(
+                int(event['time']), float(event['close']), float(event['volume']))
+        else:
+            return
+
+        if applied:
+            self._rescore(event['pair'])
+        else:
+            self.stale_updates += 1
+
+    def handle_message(self, data):
+        events = json_loads(data)
+        for event in events if isinstance(events, list) else [events]:
+            self.handle_event(event)
+
+    def top(self, n: int = 5) -> List:
+        return sorted(self.scores.items(), key=lambda item: item[1], reverse=True)[:n]
+
+    async def _report(self):
+        last_updates = self.updates
+        while True:
+            await asyncio.sleep(self.report_interval)
+            rate = (self.updates - last_updates) / self.report_interval
+            last_updates = self.updates
+            leaders = ", ".join(f"{pair} {score:.3f}" for pair, score in self.top())
+            print(f"Live: {rate:.1f} score updates/s, top: {leaders}")
+
+    async def _consume(self, session: aiohttp.ClientSession, pairs: List[str]):
+        async with session.ws_connect(self.feed_url, heartbeat=30) as ws:
+            await ws.send_json({'type': 'subscribe', 'pairs': pairs})
+            print(f"Subscribed to {len(pairs)} pairs on {self.feed_url}")
+            async for message in ws:
+                if message.type in (aiohttp.WSMsgType.TEXT, aiohttp.WSMsgType.BINARY):
+                    self.handle_message(message.data)
+                elif message.type == aiohttp.WSMsgType.ERROR:
+                    raise ws.exception()
+
+    async def run(self, session: aiohttp.ClientSession, pairs: Optional[List[str]] = None):
+        """Seed, subscribe and keep scores current until cancelled; reconnects re-seed to cover the gap"""
+        if pairs is None:
+            pairs = await self.analyzer.discover_instruments(session)
+        if not pairs:
+            print("No instruments found. Exiting.")
+            return
+
+        reporter = asyncio.ensure_future(self._report()) if self.report_interval else None
+        failures = 0
+        try:
+            while True:
+                await self.seed(session, pairs)
+                try:
+                    await self._consume(session, list(self.states))
+                    failures = 0
+                    delay = 1
+                    print(f"Live feed closed, reconnecting in {delay}s")
+                except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    failures += 1
+                    delay = min(2 ** failures, self.max_reconnect_delay)
+                    print(f"Live feed error: {str(e)}, reconnecting in {delay}s")
+                await asyncio.sleep(delay)
+        finally:
+            if reporter is not None:
+                reporter.cancel()
@@ -0,0 +1,93 @@
+import asyncio
+import json
+import math
+import os
+import time
+from aiohttp import web
+from typing import Optional
+from .snapshot import SnapshotReader
+
+def _json(payload, status: int = 200) -> web.Response:
+    return web.Response(text=json.dumps(payload), status=status, content_type='application/json')
+
+def _float(request: web.Request, name: str, default: float) -> float:
+    try:
+        return float(request.query.get(name, default))
+    except ValueError:
+        raise web.HTTPBadRequest(text=f"'{name}' must be a number")
+
+def _int(request: web.Request, name: str, default: int) -> int:
+    try:
+        return max(0, int(request.query.get(name, default)))
+    except ValueError:
+        raise web.HTTPBadRequest(text=f"'{name}' must be an integer")
+
+
+class QueryAPI:
+    """Read-only HTTP API over the latest score snapshot, on a TCP port or a Unix socket.
+
+    Every request first checks whether the analyzer has swapped in a new snapshot (one stat call)
+    and then answers from the mapped file, so it never parses exports or touches the analyzer.
+    """
+
+    def __init__(self, snapshot_path: str = os.path.join("data", "scores.snapshot")):
+        self.reader = SnapshotReader(snapshot_path)
+
+    def _snapshot(self) -> SnapshotReader:
+        if not self.reader.refresh():
+            raise web.HTTPServiceUnavailable(text="No snapshot has been published yet")
+        return self.reader
+
+    def _envelope(self, reader: SnapshotReader, rows) -> dict:
+        return {'timestamp_ms': reader.timestamp_ms, 'count': len(rows), 'results': rows}
+
+    async def health(self, request: web.Request) -> web.Response:
+        reader = self._snapshot()
+        return _json({'timestamp_ms': reader.timestamp_ms, 'pairs': len(reader),
+                      'age_seconds': round(time.time() - reader.timestamp_ms / 1000, 3)})
+
+    async def top(self, request: web.Request) -> web.Response:
+        reader = self._snapshot()
+        return _json(self._envelope(reader, reader.top(_int(request, 'k', 10))))
+
+    async def pair(self, request: web.Request) -> web.Response:
+        reader = self._snapshot()
+        record = reader.lookup(request.match_info['pair'])
+        if record is None:
+            raise web.HTTPNotFound(text=f"No scores for {request.match_info['pair']}")
+        return _json({'timestamp_ms': reader.timestamp_ms, 'result': record})
+
+    async def score_range(self, request: web.Request) -> web.Response:
+        reader = self._snapshot()
+        limit = _int(request, 'limit', 0) or None
+        rows = reader.score_range(_float(request, 'min', -math.inf), _float(request, 'max', math.inf), limit)
+        return _json(self._envelope(reader, rows))
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get('/health', self.health)
+        app.router.add_get('/top', self.top)
+        app.router.add_get('/pairs/{pair:.+}', self.pair)
+        app.router.add_get('/scores', self.score_range)
+        app.on_cleanup.append(self._close)
+        return app
+
+    async def _close(self, app: web.Application):
+        self.reader.close()
+
+    async def serve(self, host: str = '127.0.0.1', port: int = 8080, unix_socket: Optional[str] = None):
+        """Serve until cancelled"""
+        runner = web.AppRunner(self.app(), access_log=None)
+        await runner.setup()
+        if unix_socket:
+            site = web.UnixSite(runner, unix_socket)
+            where = unix_socket
+        else:
+            site = web.TCPSite(runner, host, port)
+            where = f"http://{host}:{port}"
+        await site.start()
+        print(f"Serving scores from {self.reader.path} on {where}")
+        try:
+            await asyncio.Event().wait()
+        finally:
+            await runner.cleanup()
@@ -0,0 +1,13 @@
+# Chart output settings by preset name; kept apart from the visualizer so the CLI and analyzer
+# can check a preset without importing matplotlib
+RENDER_PRESETS = {
+    'full': {'dpi': 300, 'format': 'png', 'bbox_inches': 'tight'},
+    'fast': {'dpi': 120, 'format': 'png', 'bbox_inches': 'tight'},
+    'preview': {'dpi': 60, 'format': 'png', 'bbox_inches': None},
+    'vector': {'dpi': 100, 'format': 'svg', 'bbox_inches': 'tight'}
+}
+
+def check_preset(preset: str) -> str:
+    if preset not in RENDER_PRESETS:
+        raise ValueError(f"Unknown chart preset '{preset}'; expected one of {', '.join(sorted(RENDER_PRESETS))}")
+    return preset
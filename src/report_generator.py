@@ -1,94 +1,125 @@
 import numpy as np
+import pandas as pd
 import os
 from datetime import datetime
-from typing import List, Dict
+from typing import Dict
+from .results_table import indicator_column
+from .streaming_summary import MomentumSummary
 
 class ReportGenerator:
     def __init__(self):
         self.reports_dir = "reports"
-        self._ensure_directory_exists()
     
     def _ensure_directory_exists(self):
         if not os.path.exists(self.reports_dir):
             os.makedirs(self.reports_dir)
     
-    def generate_insights_report(self, results: List[Dict], timeframes: Dict):
-        if not results:
+    @staticmethod
+    def display_pair(pair: str) -> str:
+        return pair.replace('B-', '').replace('_USDT', '/USDT')
+    
+    @staticmethod
+    def summarize(results: pd.DataFrame) -> MomentumSummary:
+        """Summary of a ranked results table, as if its rows had been streamed in order"""
+        summary = MomentumSummary(expected=len(results))
+        price_column = indicator_column('current_price', '15')
+        prices = results[price_column].tolist() if price_column in results else [np.nan] * len(results)
+        for index, (pair, score, price) in enumerate(zip(results['pair'], results['momentum_score'].tolist(), prices)):
+            summary.add(index, pair, score, price)
+        return summary
+    
+    def generate_insights_report(self, results: pd.DataFrame, timeframes: Dict):
+        if results is None or len(results) == 0:
+            return
+        self.write_report(self.summarize(results), timeframes)
+    
+    def write_report(self, summary: MomentumSummary, timeframes: Dict, provisional: bool = False):
+        """Write the report from a streaming summary; a provisional one overwrites a fixed file in place"""
+        if summary.count == 0:
             return
         
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        filename = os.path.join(self.reports_dir, f"crypto_momentum_insights_{timestamp}.txt")
+        self._ensure_directory_exists()
+        if provisional:
+            filename = os.path.join(self.reports_dir, "crypto_momentum_insights_provisional.txt")
+        else:
+            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+            filename = os.path.join(self.reports_dir, f"crypto_momentum_insights_{timestamp}.txt")
         
-        with open(filename, 'w') as f:
-            f.write("=" * 80 + "\n")
-            f.write("CRYPTO MOMENTUM ANALYSIS REPORT\n")
-            f.write("=" * 80 + "\n")
-            f.write(f"Analysis Time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S UTC')}\n")
-            f.write(f"Total Pairs Analyzed: {len(results)}\n")
-            f.write("\n")
-            
-            f.write("TOP 10 MOMENTUM PERFORMERS\n")
-            f.write("-" * 50 + "\n")
-            for i, result in enumerate(results[:10], 1):
-                pair = result['pair'].replace('B-', '').replace('_USDT', '/USDT')
-                score = result['momentum_score']
-                
-                current_price = "N/A"
-                if '15' in result['timeframe_data'] and result['timeframe_data']['15']['indicators']:
-                    current_price = f"${result['timeframe_data']['15']['indicators']['current_price']:.4f}"
-                
-                f.write(f"{i:2d}. {pair:15} | Score: {score:.3f} | Price: {current_price}\n")
-            
-            scores = [r['momentum_score'] for r in results]
-            f.write(f"\nMARKET STATISTICS\n")
-            f.write("-" * 30 + "\n")
-            f.write(f"Average Momentum Score: {np.mean(scores):.3f}\n")
-            f.write(f"Median Momentum Score:  {np.median(scores):.3f}\n")
-            f.write(f"Highest Score:          {max(scores):.3f}\n")
-            f.write(f"Lowest Score:           {min(scores):.3f}\n")
-            f.write(f"Standard Deviation:     {np.std(scores):.3f}\n")
-            
-            bullish_count = sum(1 for score in scores if score > 0.6)
-            neutral_count = sum(1 for score in scores if 0.4 <= score <= 0.6)
-            bearish_count = sum(1 for score in scores if score < 0.4)
-            
-            f.write(f"\nMARKET SENTIMENT BREAKDOWN\n")
-            f.write("-" * 35 + "\n")
-            f.write(f"Strongly Bullish (>0.60): {bullish_count:3d} pairs ({bullish_count/len(scores)*100:.1f}%)\n")
-            f.write(f"Neutral (0.40-0.60):      {neutral_count:3d} pairs ({neutral_count/len(scores)*100:.1f}%)\n")
-            f.write(f"Bearish (<0.40):          {bearish_count:3d} pairs ({bearish_count/len(scores)*100:.1f}%)\n")
-            
-            f.write(f"\nTIMEFRAME ANALYSIS\n")
-            f.write("-" * 25 + "\n")
-            for tf, config in timeframes.items():
-                tf_name = f"{tf}min" if tf != '1D' else "1Day"
-                f.write(f"{tf_name:6} Weight: {config['weight']*100:4.1f}%\n")
-            
-            f.write(f"\nACTIONABLE TRADING SIGNALS\n")
-            f.write("-" * 40 + "\n")
-            
-            strong_buy = [r for r in results if r['momentum_score'] > 0.7]
-            buy = [r for r in results if 0.6 < r['momentum_score'] <= 0.7]
-            
-            if strong_buy:
-                f.write("STRONG BUY SIGNALS:\n")
-                for result in strong_buy[:5]:
-                    pair = result['pair'].replace('B-', '').replace('_USDT', '/USDT')
-                    score = result['momentum_score']
-                    f.write(f"   • {pair} (Score: {score:.3f})\n")
-            
-            if buy:
-                f.write("BUY SIGNALS:\n")
-                for result in buy[:5]:
-                    pair = result['pair'].replace('B-', '').replace('_USDT', '/USDT')
-                    score = result['momentum_score']
-                    f.write(f"   • {pair} (Score: {score:.3f})\n")
-            
-            if not strong_buy and not buy:
-                f.write("No strong buy signals detected in current market conditions\n")
+        with open(filename + ".tmp", 'w') as f:
+            f.write(self.render_report(summary, timeframes, provisional))
+        os.replace(filename + ".tmp", filename)
+        
+        if not provisional:
+            # The cycle is complete, so drop the provisional report it superseded
+            self.discard_provisional()
+            print(f"Insights report saved to '{filename}'")
+        return filename
+    
+    def discard_provisional(self):
+        provisional_path = os.path.join(self.reports_dir, "crypto_momentum_insights_provisional.txt")
+        if os.path.exists(provisional_path):
+            os.remove(provisional_path)
+    
+    def render_report(self, summary: MomentumSummary, timeframes: Dict, provisional: bool = False) -> str:
+        stats = summary.stats
+        lines = []
+        
+        lines.append("=" * 80 + "\n")
+        lines.append("CRYPTO MOMENTUM ANALYSIS REPORT\n")
+        lines.append("=" * 80 + "\n")
+        if provisional:
+            lines.append(f"PROVISIONAL: {summary.count} of {summary.expected} pairs scored\n")
+        lines.append(f"Analysis Time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S UTC')}\n")
+        lines.append(f"Total Pairs Analyzed: {summary.count}\n")
+        lines.append("\n")
+        
+        lines.append("TOP 10 MOMENTUM PERFORMERS\n")
+        lines.append("-" * 50 + "\n")
+        for i, (pair, score, price) in enumerate(summary.top.items(), 1):
+            current_price = "N/A"
+            if not np.isnan(price):
+                current_price = f"${price:.4f}"
             
-            f.write("\n" + "=" * 80 + "\n")
-            f.write("Report generated successfully!\n")
-            f.write("=" * 80 + "\n")
+            lines.append(f"{i:2d}. {self.display_pair(pair):15} | Score: {score:.3f} | Price: {current_price}\n")
+        
+        lines.append(f"\nMARKET STATISTICS\n")
+        lines.append("-" * 30 + "\n")
+        lines.append(f"Average Momentum Score: {stats.mean:.3f}\n")
+        lines.append(f"Median Momentum Score:  {stats.exact_median:.3f}\n")
+        lines.append(f"Highest Score:          {stats.max:.3f}\n")
+        lines.append(f"Lowest Score:           {stats.min:.3f}\n")
+        lines.append(f"Standard Deviation:     {stats.std:.3f}\n")
+        
+        total = summary.count
+        lines.append(f"\nMARKET SENTIMENT BREAKDOWN\n")
+        lines.append("-" * 35 + "\n")
+        lines.append(f"Strongly Bullish (>0.60): {summary.bullish:3d} pairs ({summary.bullish/total*100:.1f}%)\n")
+        lines.append(f"Neutral (0.40-0.60):      {summary.neutral:3d} pairs ({summary.neutral/total*100:.1f}%)\n")
+        lines.append(f"Bearish (<0.40):          {summary.bearish:3d} pairs ({summary.bearish/total*100:.1f}%)\n")
+        
+        lines.append(f"\nTIMEFRAME ANALYSIS\n")
+        lines.append("-" * 25 + "\n")
+        for tf, config in timeframes.items():
+            tf_name = f"{tf}min" if tf != '1D' else "1Day"
+            lines.append(f"{tf_name:6} Weight: {config['weight']*100:4.1f}%\n")
+        
+        lines.append(f"\nACTIONABLE TRADING SIGNALS\n")
+        lines.append("-" * 40 + "\n")
+        
+        if len(summary.strong_buy):
+            lines.append("STRONG BUY SIGNALS:\n")
+            for pair, score in summary.strong_buy.items():
+                lines.append(f"   • {self.display_pair(pair)} (Score: {score:.3f})\n")
+        
+        if len(summary.buy):
+            lines.append("BUY SIGNALS:\n")
+            for pair, score in summary.buy.items():
+                lines.append(f"   • {self.display_pair(pair)} (Score: {score:.3f})\n")
+        
+        if not len(summary.strong_buy) and not len(summary.buy):
+            lines.append("No strong buy signals detected in current market conditions\n")
         
-        print(f"Insights report saved to '{filename}'")
\ No newline at end of file
+        lines.append("\n" + "=" * 80 + "\n")
+        lines.append("Report generated successfully!\n")
+        lines.append("=" * 80 + "\n")
+        return "".join(lines)
\ No newline at end of file
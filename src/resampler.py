@@ -0,0 +1,83 @@
+import numpy as np
+import pandas as pd
+from typing import Dict, Optional
+
+# Resolutions that are exact aggregations of 15-minute bars, and how many 15-minute bars each holds
+RESAMPLED_RESOLUTIONS = {'30': 2, '60': 4, '240': 16}
+BASE_RESOLUTION = '15'
+BASE_INTERVAL_MS = 15 * 60 * 1000
+
+def resample_ohlcv(df: pd.DataFrame, factor: int) -> Optional[pd.DataFrame]:
+    """Aggregate epoch-aligned 15-minute bars into bars `factor` times longer.
+
+    The leading bucket is dropped when the history starts partway through it; the latest
+    bucket is kept even if incomplete, matching the exchange's forming bar.
+    """
+    if df is None or len(df) == 0:
+        return None
+
+    df = df.sort_values('time')
+    times = df['time'].to_numpy(dtype=np.int64)
+    interval_ms = BASE_INTERVAL_MS * factor
+    buckets = times - times % interval_ms
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+
+    # A leading bucket that does not open on its first 15-minute bar is missing history
+    first = 1 if buckets[0] != times[0] else 0
+    if first >= len(starts):
+        return None
+    starts_kept = starts[first:]
+    begin = starts_kept[0]
+
+    opens = df['open'].to_numpy(dtype=float)[begin:]
+    highs = df['high'].to_numpy(dtype=float)[begin:]
+    lows = df['low'].to_numpy(dtype=float)[begin:]
+    closes = df['close'].to_numpy(dtype=float)[begin:]
+    volumes = df['volume'].to_numpy(dtype=float)[begin:]
+    offsets = starts_kept - begin
+    ends = np.r_[offsets[1:], len(closes)] - 1
+
+    resampled = pd.DataFrame({
+        'open': opens[offsets],
+        'high': np.maximum.reduceat(highs, offsets),
+        'low': np.minimum.reduceat(lows, offsets),
+        'close': closes[ends],
+        'volume': np.add.reduceat(volumes, offsets),
+        'time': buckets[starts_kept]
+    })
+    resampled['timestamp'] = pd.to_datetime(resampled['time'], unit='ms')
+    return resampled
+
+def compare_bars(resampled: Optional[pd.DataFrame], served: Optional[pd.DataFrame],
+                 rtol: float = 1e-9, volume_rtol: float = 1e-6) -> Dict:
+    """Compare locally resampled bars with exchange-served ones on the closed bars both sides have"""
+    report = {'compared': 0, 'mismatched': 0, 'missing_local': 0, 'missing_served': 0, 'max_rel_diff': 0.0}
+    if resampled is None or served is None or len(resampled) == 0 or len(served) == 0:
+        return report
+
+    # Both latest bars may still be forming, and the two fetches happen at slightly different moments
+    latest = min(resampled['time'].max(), served['time'].max())
+    local = resampled[resampled['time'] < latest].set_index('time')
+    remote = served[served['time'] < latest].set_index('time')
+    since = max(local.index.min(), remote.index.min()) if len(local) and len(remote) else latest
+    local = local[local.index >= since]
+    remote = remote[remote.index >= since]
+
+    common = local.index.intersection(remote.index)
+    report['compared'] = len(common)
+    report['missing_local'] = len(remote.index.difference(local.index))
+    report['missing_served'] = len(local.index.difference(remote.index))
+    if len(common) == 0:
+        return report
+
+    mismatched = np.zeros(len(common), dtype=bool)
+    for column in ('open', 'high', 'low', 'close', 'volume'):
+        a = local.loc[common, column].to_numpy(dtype=float)
+        b = remote.loc[common, column].to_numpy(dtype=float)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rel = np.abs(a - b) / np.maximum(np.abs(b), 1e-12)
+        rel = np.nan_to_num(rel)
+        mismatched |= rel > (volume_rtol if column == 'volume' else rtol)
+        report['max_rel_diff'] = max(report['max_rel_diff'], float(rel.max()))
+    report['mismatched'] = int(mismatched.sum())
+    return report
@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+from typing import Dict, Iterable, List
+
+INDICATOR_FIELDS = ['rsi', 'volume_ratio', 'price_change', 'current_price', 'volume']
+# 1.0 where the engine computed a timeframe (its `valid` mask), 0.0 where it was missing or too short;
+# an indicator can be NaN on a computed timeframe, so presence is never read off indicator values
+PRESENCE_FIELD = 'present'
+
+def indicator_column(field: str, timeframe: str) -> str:
+    return f"{field}_{timeframe}"
+
+def presence_column(timeframe: str) -> str:
+    return indicator_column(PRESENCE_FIELD, timeframe)
+
+def table_columns(timeframes: Iterable[str], fields: List[str] = INDICATOR_FIELDS) -> List[str]:
+    timeframes = list(timeframes)
+    columns = ['pair', 'momentum_score']
+    for tf in timeframes:
+        columns.extend(indicator_column(field, tf) for field in fields)
+    columns.extend(presence_column(tf) for tf in timeframes)
+    return columns
+
+def build_results_table(pairs: List[str], indicators: Dict[str, Dict[str, np.ndarray]],
+                        timeframes: Iterable[str], fields: List[str] = INDICATOR_FIELDS) -> pd.DataFrame:
+    """One row per pair with a `<field>_<timeframe>` column per indicator and a presence column per timeframe.
+
+    `indicators[tf][field]` holds one value per pair, in the same order as `pairs`, and
+    `indicators[tf]['valid']` the engine's mask of the pairs that have the timeframe.
+    Missing timeframes are NaN and not present.
+    """
+    timeframes = list(timeframes)
+    columns = {'pair': list(pairs), 'momentum_score': np.zeros(len(pairs))}
+    for tf in timeframes:
+        tf_indicators = indicators.get(tf, {})
+        for field in fields:
+            columns[indicator_column(field, tf)] = tf_indicators.get(field, np.full(len(pairs), np.nan))
+    for tf in timeframes:
+        columns[presence_column(tf)] = np.asarray(indicators.get(tf, {}).get('valid', np.zeros(len(pairs))), dtype=float)
+    return pd.DataFrame(columns)
+
+def timeframe_present(table, timeframe: str) -> np.ndarray:
+    """Rows of a results table (or a mapping of its columns) that have `timeframe`"""
+    column = presence_column(timeframe)
+    if column not in table:
+        return np.zeros(len(np.asarray(table['pair'])), dtype=bool)
+    return np.asarray(table[column], dtype=float) > 0
+
+def rank_results(table: pd.DataFrame) -> pd.DataFrame:
+    """Sort by momentum score, best first, keeping input order for ties"""
+    return table.sort_values('momentum_score', ascending=False, kind='stable').reset_index(drop=True)
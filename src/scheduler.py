@@ -0,0 +1,81 @@
+import asyncio
+import aiohttp
+import math
+import time
+from datetime import datetime
+from typing import Optional
+from .crypto_analyzer import CryptoMomentumAnalyzer
+
+class MomentumService:
+    """Long-lived analysis service: one event loop, one pooled session and a warm analyzer across cycles"""
+
+    def __init__(self, interval_minutes: int = 15, max_concurrent: int = 15,
+                 close_delay: float = 5.0, max_retry_delay: float = 120.0, shards: int = 1, **analyzer_options):
+        self.analyzer = CryptoMomentumAnalyzer(max_concurrent, shards=shards, **analyzer_options)
+        self.interval = interval_minutes * 60
+        self.max_concurrent = max_concurrent
+        # Seconds to wait after a bar boundary so the exchange has closed the bar
+        self.close_delay = close_delay
+        self.max_retry_delay = max_retry_delay
+        self.session: Optional[aiohttp.ClientSession] = None
+        self.cycles = 0
+        self.failures = 0
+
+    def _create_session(self) -> aiohttp.ClientSession:
+        connector = aiohttp.TCPConnector(
+            limit=self.max_concurrent * 2,
+            ttl_dns_cache=300,
+            keepalive_timeout=60
+        )
+        return aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=30))
+
+    def next_boundary(self, now: float) -> float:
+        """Next bar-close boundary strictly after `now`, aligned to the epoch so sleeps never accumulate drift"""
+        boundary = math.floor((now - self.close_delay) / self.interval) * self.interval + self.close_delay
+        return boundary + self.interval
+
+    async def run_cycle(self):
+        started = time.time()
+        results = await self.analyzer.run_analysis(self.session)
+        self.cycles += 1
+        print(f"Cycle {self.cycles} finished in {time.time() - started:.1f}s")
+        return results
+
+    async def run_forever(self):
+        print(f"Starting crypto momentum service (every {self.interval // 60} minutes)")
+        self.session = self._create_session()
+        consecutive_failures = 0
+
+        try:
+            while True:
+                cycle_start = time.time()
+                try:
+                    await self.run_cycle()
+                    consecutive_failures = 0
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    self.failures += 1
+                    consecutive_failures += 1
+                    print(f"Error in analysis cycle: {str(e)}")
+
+                now = time.time()
+                next_run = self.next_boundary(now)
+
+                # A cycle that overran skips the boundaries it missed instead of queueing behind them
+                skipped = int((next_run - self.next_boundary(cycle_start)) // self.interval)
+                if skipped > 0:
+                    print(f"Cycle overran its slot, skipping {skipped} boundary(ies)")
+
+                if consecutive_failures:
+                    retry_delay = min(15 * 2 ** (consecutive_failures - 1), self.max_retry_delay)
+                    next_run = min(next_run, now + retry_delay)
+
+                sleep_seconds = max(next_run - time.time(), 0)
+                print(f"Next analysis at {datetime.fromtimestamp(next_run).strftime('%H:%M:%S')} "
+                      f"(sleeping for {sleep_seconds:.0f} seconds)")
+                await asyncio.sleep(sleep_seconds)
+        finally:
+            await self.session.close()
+            self.session = None
+            self.analyzer.close()
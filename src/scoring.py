@@ -0,0 +1,84 @@
+import numpy as np
+from typing import Callable, Dict, List, Optional
+from .results_table import indicator_column, timeframe_present
+
+# Signal cutoffs of the report, the change alerts and the backtest buckets: a band holds the scores
+# strictly above its cutoff, scores below BEARISH_BELOW are bearish and the rest, both ends included, neutral
+STRONG_BUY_ABOVE = 0.7
+BUY_ABOVE = 0.6
+BEARISH_BELOW = 0.4
+SIGNAL_BANDS = (('strong_buy', STRONG_BUY_ABOVE), ('buy', BUY_ABOVE))
+# Signal classes from weakest to strongest, as indexed by signal_class
+SIGNAL_CLASSES = ('bearish', 'neutral', 'buy', 'strong_buy')
+
+def signal_class(scores: np.ndarray) -> np.ndarray:
+    """Index into SIGNAL_CLASSES of each score"""
+    return np.select([scores > STRONG_BUY_ABOVE, scores > BUY_ABOVE, scores >= BEARISH_BELOW], [3, 2, 1], default=0)
+
+class ScoringComponent:
+    """One weighted term of a timeframe's momentum score.
+
+    `score_func` maps the values of `indicator` across pairs (an array) to per-pair scores in
+    [0, 1]; components without an indicator are called with None and return a constant.
+    """
+
+    def __init__(self, name: str, weight: float, score_func: Callable, indicator: Optional[str] = None):
+        self.name = name
+        self.weight = weight
+        self.score_func = score_func
+        self.indicator = indicator
+
+    def score(self, values: Optional[np.ndarray]):
+        return self.score_func(values) * self.weight
+
+def base_score(values: None) -> float:
+    return 0.5
+
+def rsi_zone_score(rsi: np.ndarray) -> np.ndarray:
+    """Favours RSI in the 50-70 momentum zone over overbought and weak readings"""
+    return np.select(
+        [(rsi >= 50) & (rsi <= 70), (rsi > 70) & (rsi <= 80), rsi > 80, (rsi >= 40) & (rsi < 50)],
+        [0.8, 0.6, 0.3, 0.4],
+        default=0.2
+    )
+
+def volume_score(volume_ratio: np.ndarray) -> np.ndarray:
+    return np.minimum(volume_ratio / 1.5, 1.0)
+
+def price_change_score(price_change: np.ndarray) -> np.ndarray:
+    return np.clip(price_change / 10 + 0.5, 0, 1)
+
+def default_scoring_components(weights: Dict[str, float]) -> List[ScoringComponent]:
+    """The analyzer's built-in score, weighted by its `scoring_weights`"""
+    return [
+        ScoringComponent('base_bullish', weights['base_bullish'], base_score),
+        ScoringComponent('rsi', weights['rsi'], rsi_zone_score, 'rsi'),
+        ScoringComponent('volume', weights['volume'], volume_score, 'volume_ratio'),
+        ScoringComponent('price_change', weights['price_change'], price_change_score, 'price_change')
+    ]
+
+def momentum_scores(table, timeframes: Dict, components: List[ScoringComponent]) -> np.ndarray:
+    """Timeframe-weighted mean of the component scores over the timeframes each row has.
+
+    `table` is a results table or any mapping of its `<field>_<timeframe>` and `present_<timeframe>`
+    columns plus 'pair'.
+    """
+    n_rows = len(np.asarray(table['pair']))
+    total_score = np.zeros(n_rows)
+    total_weight = np.zeros(n_rows)
+
+    for tf, config in timeframes.items():
+        present = timeframe_present(table, tf)
+
+        tf_score = 0
+        for component in components:
+            values = None
+            if component.indicator is not None:
+                values = np.asarray(table[indicator_column(component.indicator, tf)], dtype=float)
+            tf_score = tf_score + component.score(values)
+
+        total_score = np.where(present, total_score + tf_score * config['weight'], total_score)
+        total_weight = np.where(present, total_weight + config['weight'], total_weight)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(total_weight > 0, total_score / total_weight, 0)
@@ -0,0 +1,156 @@
+import asyncio
+import aiohttp
+import math
+import multiprocessing
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Dict, List, Optional, Tuple
+from .results_table import table_columns
+
+# Per-process state of a shard worker, created once by the pool initializer
+_worker = {}
+
+def _init_worker(options: Dict):
+    from .crypto_analyzer import CryptoMomentumAnalyzer
+
+    analyzer = CryptoMomentumAnalyzer(
+        max_concurrent=options['max_concurrent'],
+        candle_db=options['candle_db'],
+        metrics_dir=None,
+        outputs=(),
+        provisional_report_at=None,
+        instruments_cache=None,
+        resample_from_15=options['resample_from_15'],
+        indicator_registry=options['indicator_registry'],
+        scoring_components=options['scoring_components']
+    )
+    analyzer.timeframes = options['timeframes']
+    analyzer.scoring_weights = options['scoring_weights']
+    analyzer.data_fetcher.base_url = options['base_url']
+    analyzer.data_fetcher.rate_limiter.rate = options['requests_per_second']
+    analyzer.data_fetcher.rate_limiter.capacity = options['requests_per_second']
+
+    # One event loop and one pooled session for the life of the worker
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+
+    async def create_session() -> aiohttp.ClientSession:
+        connector = aiohttp.TCPConnector(limit=options['max_concurrent'] * 2, ttl_dns_cache=300, keepalive_timeout=60)
+        return aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=30))
+
+    _worker.update(analyzer=analyzer, loop=loop, session=loop.run_until_complete(create_session()))
+
+async def _analyze_shard_async(shm_name: str, shape: Tuple[int, int], shard: List[Tuple[int, str]]) -> Dict:
+    from .utils.metrics import CycleMetrics
+
+    analyzer = _worker['analyzer']
+    fetcher = analyzer.data_fetcher
+    cycle = CycleMetrics()
+    fetcher.reset_stats()
+    analyzer.cycle_metrics = cycle
+    fetcher.metrics = cycle
+    try:
+        pairs = [pair for _, pair in shard]
+        series = await asyncio.gather(*[analyzer.fetch_pair_data(_worker['session'], pair) for pair in pairs])
+        keep = [i for i, pair_series in enumerate(series) if pair_series]
+        if keep:
+            # Timed as the 'indicators' and 'scoring' stages inside
+            table = analyzer.analyze_pairs([pairs[i] for i in keep], [series[i] for i in keep])
+
+            # Spawned workers share the parent's resource tracker, so attaching does not take ownership
+            shm = shared_memory.SharedMemory(name=shm_name)
+            try:
+                out = np.ndarray(shape, dtype=np.float64, buffer=shm.buf)
+                row_of = {pair: row for row, pair in shard}
+                rows = table['pair'].map(row_of).to_numpy()
+                out[rows] = table[table_columns(analyzer.timeframes, analyzer.indicator_engine.fields)[1:]].to_numpy(dtype=np.float64)
+                del out
+            finally:
+                shm.close()
+    finally:
+        analyzer.cycle_metrics = None
+        fetcher.metrics = None
+
+    return {'stats': dict(fetcher.stats), 'metrics': cycle.to_dict()}
+
+def _analyze_shard(shm_name: str, shape: Tuple[int, int], shard: List[Tuple[int, str]]) -> Dict:
+    return _worker['loop'].run_until_complete(_analyze_shard_async(shm_name, shape, shard))
+
+
+class ShardPool:
+    """Analyzes a universe split across worker processes that each run their own event loop and session.
+
+    Workers share the global request rate and concurrency budget evenly and write their indicator and
+    score rows into one shared-memory float64 table, indexed by the pair's position in the instrument list.
+    """
+
+    def __init__(self, shards: int, max_concurrent: int, candle_db: Optional[str]):
+        self.shards = shards
+        self.max_concurrent = max_concurrent
+        self.candle_db = candle_db
+        self.pool: Optional[ProcessPoolExecutor] = None
+
+    def worker_options(self, analyzer) -> Dict:
+        """Worker configuration, taken from the parent analyzer when the pool starts"""
+        rate = analyzer.data_fetcher.rate_limiter.rate
+        return {
+            'max_concurrent': max(1, math.ceil(self.max_concurrent / self.shards)),
+            'requests_per_second': rate / self.shards,
+            'candle_db': self.candle_db,
+            'base_url': analyzer.data_fetcher.base_url,
+            'resample_from_15': analyzer.resample_from_15,
+            'timeframes': analyzer.timeframes,
+            'scoring_weights': analyzer.scoring_weights,
+            # Registry nodes and score functions are module-level or partials, so both pickle to the workers
+            'indicator_registry': analyzer.indicator_engine.registry,
+            'scoring_components': analyzer.scoring_components
+        }
+
+    def _get_pool(self, analyzer) -> ProcessPoolExecutor:
+        if self.pool is None:
+            self.pool = ProcessPoolExecutor(
+                max_workers=self.shards,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_worker,
+                initargs=(self.worker_options(analyzer),)
+            )
+        return self.pool
+
+    def partition(self, instruments: List[str]) -> List[List[Tuple[int, str]]]:
+        """Interleave instruments so every shard gets a similar mix of the list"""
+        indexed = list(enumerate(instruments))
+        return [shard for shard in (indexed[i::self.shards] for i in range(self.shards)) if shard]
+
+    async def analyze(self, analyzer, instruments: List[str]) -> Tuple[pd.DataFrame, List[Dict]]:
+        """Unranked results table in instrument order (pairs without data dropped) and per-shard reports"""
+        columns = table_columns(analyzer.timeframes, analyzer.indicator_engine.fields)
+        shape = (len(instruments), len(columns) - 1)
+        shm = shared_memory.SharedMemory(create=True, size=max(shape[0] * shape[1] * 8, 1))
+        try:
+            values = np.ndarray(shape, dtype=np.float64, buffer=shm.buf)
+            values.fill(np.nan)
+
+            loop = asyncio.get_running_loop()
+            pool = self._get_pool(analyzer)
+            reports = await asyncio.gather(*[
+                loop.run_in_executor(pool, _analyze_shard, shm.name, shape, shard)
+                for shard in self.partition(instruments)
+            ])
+
+            table = pd.DataFrame(values.copy(), columns=columns[1:])
+            del values
+        finally:
+            shm.close()
+            shm.unlink()
+
+        table.insert(0, 'pair', instruments)
+        # Rows no shard wrote belong to pairs without any candles
+        table = table[table['momentum_score'].notna()].reset_index(drop=True)
+        return table[columns], reports
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown(wait=True)
+            self.pool = None
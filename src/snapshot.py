@@ -0,0 +1,152 @@
+import math
+import mmap
+import os
+import struct
+import numpy as np
+import pandas as pd
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from .results_table import indicator_column
+
+MAGIC = b'CMSNAP\x00\x01'
+# magic, n_rows, n_columns, pair_width, column_width, timestamp_ms, columns_offset, pairs_offset, values_offset
+HEADER = struct.Struct('<8sIIIIqQQQ')
+PAIR_WIDTH = 32
+COLUMN_WIDTH = 32
+
+def _align(offset: int, boundary: int = 8) -> int:
+    return (offset + boundary - 1) // boundary * boundary
+
+def snapshot_columns(timeframes, fields: List[str]) -> List[str]:
+    return ['momentum_score'] + [indicator_column(field, tf) for tf in timeframes for field in fields]
+
+def write_snapshot(path: str, results: pd.DataFrame, timeframes, fields: List[str],
+                   timestamp: Optional[datetime] = None) -> str:
+    """Write a ranked results table as a fixed-layout snapshot and swap it in atomically.
+
+    Layout (little-endian): HEADER, then `n_columns` NUL-padded column names, `n_rows` NUL-padded
+    pair names in rank order, and an 8-byte aligned row-major float64 matrix of `n_rows` x `n_columns`
+    whose first column is the momentum score. Readers map the file and never see a partial write,
+    because the new snapshot replaces the old one with a single rename.
+    """
+    columns = snapshot_columns(timeframes, fields)
+    values = results.reindex(columns=columns).to_numpy(dtype='<f8')
+    pairs = results['pair'].tolist()
+    encoded_pairs = [pair.encode() for pair in pairs]
+    too_long = [pair for pair in encoded_pairs if len(pair) > PAIR_WIDTH]
+    if too_long or any(len(column.encode()) > COLUMN_WIDTH for column in columns):
+        raise ValueError(f"Pair or column names longer than {PAIR_WIDTH} bytes cannot be stored")
+
+    columns_offset = HEADER.size
+    pairs_offset = columns_offset + len(columns) * COLUMN_WIDTH
+    values_offset = _align(pairs_offset + len(pairs) * PAIR_WIDTH)
+    timestamp_ms = int((timestamp or datetime.now()).timestamp() * 1000)
+
+    directory = os.path.dirname(path)
+    if directory and not os.path.exists(directory):
+        os.makedirs(directory)
+    with open(path + ".tmp", 'wb') as f:
+        f.write(HEADER.pack(MAGIC, len(pairs), len(columns), PAIR_WIDTH, COLUMN_WIDTH, timestamp_ms,
+                            columns_offset, pairs_offset, values_offset))
+        f.write(np.array([column.encode() for column in columns], dtype=f'S{COLUMN_WIDTH}').tobytes())
+        f.write(np.array(encoded_pairs, dtype=f'S{PAIR_WIDTH}').tobytes())
+        f.write(b'\x00' * (values_offset - pairs_offset - len(pairs) * PAIR_WIDTH))
+        f.write(np.ascontiguousarray(values).tobytes())
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(path + ".tmp", path)
+    return path
+
+
+class SnapshotReader:
+    """Memory-mapped view of the latest snapshot; `refresh()` remaps it once a new cycle has been swapped in.
+
+    The mapped file stays valid after it is replaced, so a reader always serves one complete cycle.
+    Rows are in rank order, so top-K is a slice and score ranges are two binary searches.
+    """
+
+    def __init__(self, path: str = os.path.join("data", "scores.snapshot")):
+        self.path = path
+        self._identity: Optional[Tuple[int, int]] = None
+        self._mmap: Optional[mmap.mmap] = None
+        self.timestamp_ms = 0
+        self.columns: List[str] = []
+        self.pairs: List[str] = []
+        self.values = np.empty((0, 0))
+        self.rows: Dict[str, int] = {}
+        self._descending = np.empty(0)
+
+    def refresh(self) -> bool:
+        """Map the current snapshot if it changed; returns whether one is available"""
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return self._mmap is not None
+        identity = (stat.st_ino, stat.st_mtime_ns)
+        if identity == self._identity:
+            return True
+
+        with open(self.path, 'rb') as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, n_rows, n_columns, pair_width, column_width, timestamp_ms, columns_offset, pairs_offset, \
+            values_offset = HEADER.unpack_from(mapped)
+        if magic != MAGIC:
+            mapped.close()
+            raise ValueError(f"'{self.path}' is not a momentum snapshot")
+
+        columns = np.frombuffer(mapped, dtype=f'S{column_width}', count=n_columns, offset=columns_offset)
+        pairs = np.frombuffer(mapped, dtype=f'S{pair_width}', count=n_rows, offset=pairs_offset)
+        self.values = np.frombuffer(mapped, dtype='<f8', count=n_rows * n_columns,
+                                    offset=values_offset).reshape(n_rows, n_columns)
+        self.columns = [column.decode() for column in columns]
+        self.pairs = [pair.decode() for pair in pairs]
+        self.rows = {pair: row for row, pair in enumerate(self.pairs)}
+        # Also accept display names such as BTC/USDT
+        for row, pair in enumerate(self.pairs):
+            self.rows.setdefault(pair.replace('B-', '').replace('_USDT', '/USDT'), row)
+        # Negated scores ascend, which is what searchsorted needs
+        self._descending = -self.values[:, 0]
+        self.timestamp_ms = timestamp_ms
+
+        previous = self._mmap
+        self._mmap = mapped
+        self._identity = identity
+        if previous is not None:
+            try:
+                previous.close()
+            except BufferError:
+                # An older view is still referenced somewhere; the map is released when it goes
+                pass
+        return True
+
+    def __len__(self) -> int:
+        return len(self.pairs)
+
+    def record(self, row: int) -> Dict:
+        values = self.values[row].tolist()
+        record = {'rank': row + 1, 'pair': self.pairs[row]}
+        record.update((column, None if math.isnan(value) else value) for column, value in zip(self.columns, values))
+        return record
+
+    def top(self, k: int = 10) -> List[Dict]:
+        return [self.record(row) for row in range(min(k, len(self.pairs)))]
+
+    def lookup(self, pair: str) -> Optional[Dict]:
+        row = self.rows.get(pair)
+        return self.record(row) if row is not None else None
+
+    def score_range(self, low: float = -math.inf, high: float = math.inf, limit: Optional[int] = None) -> List[Dict]:
+        """Pairs with low <= momentum_score <= high, best first"""
+        first = int(np.searchsorted(self._descending, -high, side='left'))
+        last = int(np.searchsorted(self._descending, -low, side='right'))
+        if limit is not None:
+            last = min(last, first + limit)
+        return [self.record(row) for row in range(first, last)]
+
+    def close(self):
+        self.values = np.empty((0, 0))
+        self._descending = np.empty(0)
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+            self._identity = None
@@ -0,0 +1,107 @@
+import bisect
+import heapq
+import math
+from typing import List, Optional, Tuple
+from .scoring import BEARISH_BELOW, BUY_ABOVE, STRONG_BUY_ABOVE
+
+class TopK:
+    """Best `k` entries by score seen so far; ties go to the entry with the lower index, like a stable sort"""
+
+    def __init__(self, k: int):
+        self.k = k
+        # Min-heap of (score, -index, item): the root is the entry that drops out first
+        self.heap: List[Tuple[float, int, object]] = []
+
+    def push(self, score: float, index: int, item):
+        entry = (score, -index, item)
+        if len(self.heap) < self.k:
+            heapq.heappush(self.heap, entry)
+        elif entry[:2] > self.heap[0][:2]:
+            heapq.heapreplace(self.heap, entry)
+
+    def items(self) -> List:
+        """Entries best first"""
+        return [item for _, _, item in sorted(self.heap, key=lambda entry: entry[:2], reverse=True)]
+
+    def __len__(self):
+        return len(self.heap)
+
+class RunningStats:
+    """Welford mean/variance, min and max in O(1) memory, plus exact quantiles.
+
+    The quantiles are not a sketch: every value is kept in a sorted list (`bisect.insort`), which
+    costs O(n) memory and O(n) per insert. That is cheap at one value per pair and cycle, and keeps
+    the reported median identical to np.median.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+        self._sample: List[float] = []
+
+    def add(self, value: float):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (value - self.mean)
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+        bisect.insort(self._sample, value)
+
+    @property
+    def std(self) -> float:
+        """Population standard deviation, like np.std"""
+        return math.sqrt(self._m2 / self.count) if self.count else math.nan
+
+    def exact_quantile(self, q: float) -> float:
+        """Linearly interpolated quantile of every value seen, like np.quantile"""
+        if not self.count:
+            return math.nan
+        position = (self.count - 1) * q
+        lower = math.floor(position)
+        upper = min(lower + 1, self.count - 1)
+        a, b = self._sample[lower], self._sample[upper]
+        if position - lower == 0.5:
+            return (a + b) / 2
+        return a + (b - a) * (position - lower)
+
+    @property
+    def exact_median(self) -> float:
+        return self.exact_quantile(0.5)
+
+class MomentumSummary:
+    """Everything the insights report needs, maintained one scored pair at a time"""
+
+    def __init__(self, top_n: int = 10, signals_n: int = 5, expected: Optional[int] = None):
+        self.expected = expected
+        self.stats = RunningStats()
+        self.top = TopK(top_n)
+        self.strong_buy = TopK(signals_n)
+        self.buy = TopK(signals_n)
+        self.bullish = 0
+        self.neutral = 0
+        self.bearish = 0
+
+    @property
+    def count(self) -> int:
+        return self.stats.count
+
+    def add(self, index: int, pair: str, score: float, price: float):
+        """`index` is the pair's position in the instrument list and breaks score ties"""
+        self.stats.add(score)
+        self.top.push(score, index, (pair, score, price))
+
+        if score > STRONG_BUY_ABOVE:
+            self.strong_buy.push(score, index, (pair, score))
+        elif score > BUY_ABOVE:
+            self.buy.push(score, index, (pair, score))
+
+        if score > BUY_ABOVE:
+            self.bullish += 1
+        elif score >= BEARISH_BELOW:
+            self.neutral += 1
+        else:
+            self.bearish += 1
@@ -0,0 +1,289 @@
+import itertools
+import multiprocessing
+import numpy as np
+import pandas as pd
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Dict, List, Optional, Tuple
+from .backtest import Backtester, forward_returns, indicator_history
+from .candle_store import CandleStore
+from .resampler import BASE_RESOLUTION
+from .results_table import indicator_column, presence_column
+
+# Default grid: scoring weights around the analyzer's own (the base weight takes the remainder) and buy cutoffs
+DEFAULT_GRID = {
+    'rsi': [0.1, 0.2, 0.3],
+    'volume': [0.15, 0.25, 0.35],
+    'price_change': [0.05, 0.15, 0.25],
+    'threshold': [0.55, 0.6, 0.65, 0.7]
+}
+# Rows per block when scoring configurations, which bounds the (rows, configurations) intermediates
+ROW_BLOCK = 65536
+
+# Per-process state of a sweep worker, created once by the pool initializer
+_worker = {}
+
+def _pair_tensor(pair: str, load_from_ms: int, start_ms: int, end_ms: int) -> Optional[Dict[str, np.ndarray]]:
+    candles = _worker['store'].load_range(pair, BASE_RESOLUTION, load_from_ms, end_ms)
+    if len(candles) == 0:
+        return None
+
+    engine, timeframes, components = _worker['engine'], _worker['timeframes'], _worker['components']
+    columns, scored = indicator_history(candles, engine, timeframes, _worker['window'])
+    times = candles['time'].to_numpy(dtype=np.int64)
+    keep = scored & (times >= start_ms)
+    keep[keep] = (np.arange(keep.sum()) % _worker['step_bars']) == 0
+
+    # Unweighted component scores per timeframe; absent timeframes are zeroed and flagged in `present`
+    n = int(keep.sum())
+    component_scores = np.zeros((n, len(timeframes), len(components)), dtype=np.float32)
+    present = np.zeros((n, len(timeframes)), dtype=np.float32)
+    for t, tf in enumerate(timeframes):
+        tf_present = columns[presence_column(tf)][keep] > 0
+        present[:, t] = tf_present
+        for c, component in enumerate(components):
+            values = columns[indicator_column(component.indicator, tf)][keep] if component.indicator else None
+            component_scores[:, t, c] = np.where(tf_present, component.score_func(values), 0)
+
+    closes = candles['close'].to_numpy(dtype=float)
+    returns = np.column_stack([forward_returns(times, closes, bars)[keep] for bars in _worker['horizons'].values()])
+    return {'time': times[keep], 'components': component_scores, 'present': present, 'returns': returns}
+
+def _init_tensor_worker(options: Dict):
+    _worker.update(options)
+    _worker['store'] = CandleStore(options['candle_db'])
+
+def _init_eval_worker(shm_name: str, shape: Tuple[int, int], layout: Dict[str, Tuple[int, int]]):
+    # Spawned workers share the parent's resource tracker, so attaching does not take ownership
+    shm = shared_memory.SharedMemory(name=shm_name)
+    data = np.ndarray(shape, dtype=np.float32, buffer=shm.buf)
+    _worker.update(shm=shm, data=data, layout=layout)
+
+def _columns(name: str) -> np.ndarray:
+    start, stop = _worker['layout'][name]
+    return _worker['data'][:, start:stop]
+
+def evaluate_block(timeframe_weights: np.ndarray, component_weights: np.ndarray,
+                   thresholds: np.ndarray) -> Dict[str, np.ndarray]:
+    """Additive signal and correlation sums of many configurations over the whole tensor.
+
+    A configuration's score is sum_t(w_t * present_t * sum_c(cw_c * x_tc)) / sum_t(w_t * present_t),
+    which for all configurations at once is one matmul with the outer products w_t * cw_c and one
+    with the timeframe weights.
+    """
+    n_configs = len(thresholds)
+    joint = (timeframe_weights[:, :, None] * component_weights[:, None, :]).reshape(n_configs, -1).T
+    joint = joint.astype(np.float32)
+    tf_weights = timeframe_weights.T.astype(np.float32)
+    components, present = _columns('components'), _columns('present')
+    returns, excess, valid = _columns('returns'), _columns('excess'), _columns('valid')
+
+    n_horizons = returns.shape[1]
+    sums = {name: np.zeros((n_horizons, n_configs)) for name in
+            ('signals', 'signal_return', 'signal_hits', 'signal_excess', 'n', 's', 'ss', 'sr', 'r', 'rr')}
+    for start in range(0, len(components), ROW_BLOCK):
+        block = slice(start, start + ROW_BLOCK)
+        numerator = components[block] @ joint
+        denominator = present[block] @ tf_weights
+        with np.errstate(divide='ignore', invalid='ignore'):
+            scores = np.where(denominator > 0, numerator / denominator, 0)
+        signals = (scores > thresholds).astype(np.float32)
+
+        block_returns, block_excess, block_valid = returns[block], excess[block], valid[block]
+        for h in range(n_horizons):
+            r, v = block_returns[:, h], block_valid[:, h]
+            sums['signals'][h] += v @ signals
+            sums['signal_return'][h] += r @ signals
+            sums['signal_hits'][h] += (r > 0).astype(np.float32) @ signals
+            sums['signal_excess'][h] += block_excess[:, h] @ signals
+            # Pearson correlation terms between score and forward return, over rows with a return
+            sums['n'][h] += v.sum()
+            sums['s'][h] += v @ scores
+            sums['ss'][h] += v @ (scores * scores)
+            sums['sr'][h] += r @ scores
+            sums['r'][h] += r.sum(dtype=np.float64)
+            sums['rr'][h] += (r * r).sum(dtype=np.float64)
+    return sums
+
+
+class WeightSweep:
+    """Scores thousands of weight and threshold configurations against stored history in one pass.
+
+    The candles are replayed once (as in Backtester) into a step x timeframe x component tensor of
+    unweighted component scores. Every configuration is then a pair of matrix products over that
+    tensor, evaluated in blocks across worker processes, and ranked by its forward-return metrics.
+    Component weights are rescaled to sum to 1 so thresholds mean the same thing in every configuration.
+    """
+
+    def __init__(self, analyzer, days: float = 90, step_bars: int = 4, horizons: Optional[Dict[str, int]] = None,
+                 workers: Optional[int] = None, min_signals: int = 100):
+        self.backtester = Backtester(analyzer, days=days, horizons=horizons, workers=workers)
+        self.analyzer = analyzer
+        self.days = days
+        # Only every step_bars-th 15-minute step is kept, which bounds the tensor's size
+        self.step_bars = step_bars
+        self.horizons = self.backtester.horizons
+        self.workers = self.backtester.workers
+        self.min_signals = min_signals
+        self.components = analyzer.active_scoring_components()
+        self.timeframe_keys = list(analyzer.timeframes)
+        self.tensor: Optional[Dict[str, np.ndarray]] = None
+
+    def build_tensor(self, pairs: Optional[List[str]] = None, end_ms: Optional[int] = None) -> Dict[str, np.ndarray]:
+        if pairs is None:
+            pairs = self.analyzer.candle_store.stored_pairs(BASE_RESOLUTION)
+        end_ms = end_ms or int(time.time() * 1000)
+        start_ms = end_ms - int(self.days * 86400 * 1000)
+        jobs = [(pair, start_ms - self.backtester.warmup_ms(), start_ms, end_ms) for pair in pairs]
+        options = dict(self.backtester._worker_options(), step_bars=self.step_bars)
+
+        started = time.time()
+        if self.workers <= 1:
+            _init_tensor_worker(options)
+            try:
+                parts = [_pair_tensor(*job) for job in jobs]
+            finally:
+                _worker.pop('store').close()
+        else:
+            with ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context('spawn'),
+                                     initializer=_init_tensor_worker, initargs=(options,)) as pool:
+                parts = list(pool.map(_pair_tensor, *zip(*jobs), chunksize=4)) if jobs else []
+        parts = [part for part in parts if part is not None and len(part['time'])]
+        if not parts:
+            raise ValueError("No stored candles to sweep over")
+
+        tensor = {name: np.concatenate([part[name] for part in parts]) for name in parts[0]}
+        # Excess return over the universe average at the same step
+        returns = pd.DataFrame(tensor['returns'])
+        tensor['excess'] = (returns - returns.groupby(tensor['time']).transform('mean')).to_numpy()
+        self.tensor = tensor
+        print(f"Built a {tensor['components'].shape} component tensor from {len(parts)} pairs "
+              f"in {time.time() - started:.1f}s")
+        return tensor
+
+    def current_config(self) -> Dict[str, float]:
+        config = {f'tf_{tf}': self.analyzer.timeframes[tf]['weight'] for tf in self.timeframe_keys}
+        config.update({component.name: component.weight for component in self.components})
+        config['threshold'] = 0.6
+        return config
+
+    def grid(self, grid: Optional[Dict[str, List[float]]] = None) -> List[Dict[str, float]]:
+        """Every combination of `grid` values; unlisted timeframe weights and thresholds keep their current value.
+
+        Keys are component names, `tf_<timeframe>` and `threshold`. When the first component is
+        not listed it takes whatever weight the listed ones leave (e.g. base_bullish = 1 - rsi - ...).
+        """
+        grid = grid or DEFAULT_GRID
+        current = self.current_config()
+        names = list(grid)
+        configs = []
+        for values in itertools.product(*[grid[name] for name in names]):
+            config = dict(current, **dict(zip(names, values)))
+            remainder = self.components[0].name
+            if remainder not in grid:
+                config[remainder] = 1 - sum(config[c.name] for c in self.components[1:])
+                if config[remainder] < 0:
+                    continue
+            configs.append(config)
+        return configs
+
+    def random(self, count: int, seed: int = 0, threshold_range: Tuple[float, float] = (0.5, 0.75)) -> List[Dict[str, float]]:
+        """Weights drawn uniformly from the simplex (Dirichlet) and uniform thresholds"""
+        rng = np.random.default_rng(seed)
+        tf_weights = rng.dirichlet(np.ones(len(self.timeframe_keys)), count)
+        component_weights = rng.dirichlet(np.ones(len(self.components)), count)
+        thresholds = rng.uniform(*threshold_range, count)
+        return [
+            dict({f'tf_{tf}': w for tf, w in zip(self.timeframe_keys, tf_row)},
+                 **{c.name: w for c, w in zip(self.components, c_row)}, threshold=threshold)
+            for tf_row, c_row, threshold in zip(tf_weights, component_weights, thresholds)
+        ]
+
+    def _arrays(self, configs: List[Dict[str, float]]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        tf_weights = np.array([[config[f'tf_{tf}'] for tf in self.timeframe_keys] for config in configs], dtype=float)
+        component_weights = np.array([[config[c.name] for c in self.components] for config in configs], dtype=float)
+        component_weights /= component_weights.sum(axis=1, keepdims=True)
+        thresholds = np.array([config['threshold'] for config in configs], dtype=float)
+        return tf_weights, component_weights, thresholds
+
+    def _shared_tensor(self) -> Tuple[shared_memory.SharedMemory, Tuple[int, int], Dict[str, Tuple[int, int]]]:
+        """Pack the tensor into one float32 shared-memory matrix; NaN returns become 0 with a validity column"""
+        tensor = self.tensor
+        n = len(tensor['time'])
+        blocks = {
+            'components': tensor['components'].reshape(n, -1),
+            'present': tensor['present'],
+            'returns': np.nan_to_num(tensor['returns']),
+            'excess': np.nan_to_num(tensor['excess']),
+            'valid': ~np.isnan(tensor['returns'])
+        }
+        layout, offset = {}, 0
+        for name, block in blocks.items():
+            layout[name] = (offset, offset + block.shape[1])
+            offset += block.shape[1]
+
+        shape = (n, offset)
+        shm = shared_memory.SharedMemory(create=True, size=max(n * offset * 4, 1))
+        data = np.ndarray(shape, dtype=np.float32, buffer=shm.buf)
+        for name, block in blocks.items():
+            data[:, layout[name][0]:layout[name][1]] = block
+        del data
+        return shm, shape, layout
+
+    def evaluate(self, configs: List[Dict[str, float]], chunk: int = 256) -> pd.DataFrame:
+        """Ranked table of configurations, best first by `objective` of the ranking horizon"""
+        if self.tensor is None:
+            raise ValueError("Call build_tensor() before evaluating configurations")
+        configs = [self.current_config()] + configs
+        tf_weights, component_weights, thresholds = self._arrays(configs)
+        chunks = [slice(i, i + chunk) for i in range(0, len(configs), chunk)]
+
+        started = time.time()
+        shm, shape, layout = self._shared_tensor()
+        try:
+            if self.workers <= 1:
+                _init_eval_worker(shm.name, shape, layout)
+                try:
+                    results = [evaluate_block(tf_weights[c], component_weights[c], thresholds[c]) for c in chunks]
+                finally:
+                    _worker.pop('data')
+                    _worker.pop('shm').close()
+            else:
+                with ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context('spawn'),
+                                         initializer=_init_eval_worker, initargs=(shm.name, shape, layout)) as pool:
+                    results = list(pool.map(evaluate_block, [tf_weights[c] for c in chunks],
+                                            [component_weights[c] for c in chunks], [thresholds[c] for c in chunks]))
+        finally:
+            shm.close()
+            shm.unlink()
+
+        sums = {name: np.concatenate([result[name] for result in results], axis=1) for name in results[0]}
+        table = pd.DataFrame(configs)
+        for name, c in zip([c.name for c in self.components], component_weights.T):
+            table[name] = c
+        table.insert(0, 'current', [True] + [False] * (len(configs) - 1))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            for h, label in enumerate(self.horizons):
+                signals = sums['signals'][h]
+                table[f'signals_{label}'] = signals.astype(int)
+                table[f'signal_return_{label}_pct'] = sums['signal_return'][h] / signals * 100
+                table[f'hit_rate_{label}'] = sums['signal_hits'][h] / signals
+                table[f'excess_{label}_pct'] = sums['signal_excess'][h] / signals * 100
+                n = sums['n'][h]
+                covariance = sums['sr'][h] / n - (sums['s'][h] / n) * (sums['r'][h] / n)
+                variance_s = sums['ss'][h] / n - (sums['s'][h] / n) ** 2
+                variance_r = sums['rr'][h] / n - (sums['r'][h] / n) ** 2
+                table[f'ic_{label}'] = covariance / np.sqrt(variance_s * variance_r)
+        print(f"Evaluated {len(configs)} configurations in {time.time() - started:.1f}s")
+        return table
+
+    def rank(self, table: pd.DataFrame, objective: str = 'excess_4h_pct') -> pd.DataFrame:
+        """Best first by `objective`, any metric column; configurations with fewer than min_signals signals go last"""
+        if objective not in table:
+            raise ValueError(f"Unknown objective '{objective}'")
+        horizon = next((label for label in self.horizons if f'_{label}' in objective), None)
+        enough = table[f'signals_{horizon}'] >= self.min_signals if horizon else True
+        ranked = table.assign(_enough=enough).sort_values(['_enough', objective], ascending=False,
+                                                          kind='stable', na_position='last')
+        return ranked.drop(columns='_enough').reset_index(drop=True)
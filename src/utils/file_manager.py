@@ -1,49 +1,106 @@
+import json
 import pandas as pd
 import os
 from datetime import datetime
-from typing import List, Dict
+from typing import Dict, Optional
+from ..results_table import indicator_column, table_columns
+from .history_store import HistoryStore
+
+EXPORT_FORMATS = ('history', 'csv', 'both')
 
 class FileManager:
-    def __init__(self):
+    def __init__(self, export_format: str = 'history', history_db: str = os.path.join("data", "history.db")):
+        if export_format not in EXPORT_FORMATS:
+            raise ValueError(f"Unknown export format '{export_format}', expected one of {', '.join(EXPORT_FORMATS)}")
         self.exports_dir = "exports"
-        self._ensure_directory_exists()
+        self.export_format = export_format
+        self.history_db = history_db
+        # Opened on the first history export, so runs that only write JSON or CSV never touch the database
+        self.history: Optional[HistoryStore] = None
     
     def _ensure_directory_exists(self):
         if not os.path.exists(self.exports_dir):
             os.makedirs(self.exports_dir)
     
-    def export_to_csv(self, results: List[Dict], timeframes: Dict):
+    def export_results(self, results: pd.DataFrame, timeframes: Dict, timestamp: Optional[datetime] = None,
+                       write_csv: bool = True):
+        """Export results with the configured backend(s); `write_csv=False` only appends to the history"""
+        if results is None or len(results) == 0:
+            return
+        
+        timestamp = timestamp or datetime.now()
+        if self.export_format in ('history', 'both'):
+            if self.history is None:
+                self.history = HistoryStore(self.history_db)
+            self.history.append(results, timeframes, timestamp)
+            print(f"Results appended to history '{self.history.db_path}'")
+        if self.export_format in ('csv', 'both') and write_csv:
+            self.export_to_csv(results, timeframes, timestamp)
+    
+    def export_to_csv(self, results: pd.DataFrame, timeframes: Dict, timestamp: Optional[datetime] = None):
         """Export results to CSV file"""
-        if not results:
+        if results is None or len(results) == 0:
             return
         
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        export_data = []
-        
-        for result in results:
-            pair = result['pair'].replace('B-', '').replace('_USDT', '/USDT')
-            
-            row = {
-                'Pair': pair,
-                'Momentum_Score': result['momentum_score'],
-                'Rank': len(export_data) + 1
-            }
-            
-            for tf in timeframes.keys():
-                if tf in result['timeframe_data'] and result['timeframe_data'][tf]['indicators']:
-                    indicators = result['timeframe_data'][tf]['indicators']
-                    row[f'RSI_{tf}'] = indicators.get('rsi', None)
-                    row[f'Volume_Ratio_{tf}'] = indicators.get('volume_ratio', None)
-                    row[f'Price_Change_{tf}'] = indicators.get('price_change', None)
-                else:
-                    row[f'RSI_{tf}'] = None
-                    row[f'Volume_Ratio_{tf}'] = None
-                    row[f'Price_Change_{tf}'] = None
-            
-            export_data.append(row)
+        self._ensure_directory_exists()
+        timestamp = (timestamp or datetime.now()).strftime('%Y%m%d_%H%M%S')
+        
+        export_data = {
+            'Pair': results['pair'].str.replace('B-', '', regex=False).str.replace('_USDT', '/USDT', regex=False).to_numpy(),
+            'Momentum_Score': results['momentum_score'].to_numpy(),
+            'Rank': range(1, len(results) + 1)
+        }
+        
+        for tf in timeframes.keys():
+            for field, label in (('rsi', 'RSI'), ('volume_ratio', 'Volume_Ratio'), ('price_change', 'Price_Change')):
+                column = indicator_column(field, tf)
+                export_data[f'{label}_{tf}'] = results[column].to_numpy() if column in results else None
+        
+        # Indicators added through a custom registry follow under their table column names
+        built_in = set(table_columns(timeframes))
+        for column in results.columns:
+            if column not in built_in:
+                export_data[column] = results[column].to_numpy()
         
         df = pd.DataFrame(export_data)
         filename = os.path.join(self.exports_dir, f"crypto_momentum_analysis_{timestamp}.csv")
         df.to_csv(filename, index=False)
         
-        print(f"Data exported to '{filename}'")
\ No newline at end of file
+        print(f"Data exported to '{filename}'")
+    
+    def export_scores_json(self, results: pd.DataFrame, timestamp: Optional[datetime] = None) -> Optional[str]:
+        """Write just the ranked pairs and scores, the lightest machine-readable output"""
+        if results is None or len(results) == 0:
+            return None
+        
+        self._ensure_directory_exists()
+        timestamp = timestamp or datetime.now()
+        filename = os.path.join(self.exports_dir, f"crypto_momentum_scores_{timestamp.strftime('%Y%m%d_%H%M%S')}.json")
+        payload = {
+            'timestamp': timestamp.isoformat(timespec='seconds'),
+            'scores': [
+                {'rank': rank, 'pair': pair, 'momentum_score': score}
+                for rank, (pair, score) in enumerate(zip(results['pair'], results['momentum_score'].tolist()), 1)
+            ]
+        }
+        with open(filename + ".tmp", 'w') as f:
+            json.dump(payload, f)
+        os.replace(filename + ".tmp", filename)
+        
+        print(f"Scores exported to '{filename}'")
+        return filename
+    
+    def export_table(self, table: pd.DataFrame, kind: str, timestamp: Optional[datetime] = None) -> str:
+        """Save an evaluation table, such as a backtest or sweep report, as `crypto_momentum_<kind>_<timestamp>.csv`"""
+        self._ensure_directory_exists()
+        timestamp = (timestamp or datetime.now()).strftime('%Y%m%d_%H%M%S')
+        filename = os.path.join(self.exports_dir, f"crypto_momentum_{kind}_{timestamp}.csv")
+        table.to_csv(filename, index=False)
+        
+        print(f"{kind.capitalize()} report exported to '{filename}'")
+        return filename
+    
+    def close(self):
+        if self.history is not None:
+            self.history.close()
+            self.history = None
\ No newline at end of file
@@ -0,0 +1,133 @@
+import os
+import sqlite3
+import threading
+import time
+import pandas as pd
+from datetime import datetime
+from typing import Dict, Optional
+from ..results_table import INDICATOR_FIELDS, indicator_column, timeframe_present
+
+class HistoryStore:
+    """Append-only history of ranked results, one partition per cycle, stored in SQLite.
+
+    Pair names are dictionary-encoded into a `pairs` table; scores and per-timeframe
+    indicators are keyed by (pair_id, ts) so the history of one pair is a range scan.
+    """
+
+    def __init__(self, db_path: str = os.path.join("data", "history.db")):
+        self.db_path = db_path
+        self._ensure_directory_exists()
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(f"""
+            CREATE TABLE IF NOT EXISTS pairs (
+                pair_id INTEGER PRIMARY KEY,
+                pair TEXT NOT NULL UNIQUE
+            );
+            CREATE TABLE IF NOT EXISTS cycles (
+                ts INTEGER PRIMARY KEY,
+                pair_count INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS scores (
+                pair_id INTEGER NOT NULL,
+                ts INTEGER NOT NULL,
+                rank INTEGER NOT NULL,
+                momentum_score REAL,
+                PRIMARY KEY (pair_id, ts)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS indicators (
+                pair_id INTEGER NOT NULL,
+                ts INTEGER NOT NULL,
+                timeframe TEXT NOT NULL,
+                {', '.join(f'{field} REAL' for field in INDICATOR_FIELDS)},
+                PRIMARY KEY (pair_id, ts, timeframe)
+            ) WITHOUT ROWID;
+        """)
+        self.conn.commit()
+        self._pair_ids: Dict[str, int] = {
+            pair: pair_id for pair_id, pair in self.conn.execute("SELECT pair_id, pair FROM pairs")
+        }
+
+    def _ensure_directory_exists(self):
+        directory = os.path.dirname(self.db_path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+
+    def _pair_id(self, pair: str) -> int:
+        pair_id = self._pair_ids.get(pair)
+        if pair_id is None:
+            pair_id = self.conn.execute("INSERT INTO pairs (pair) VALUES (?)", (pair,)).lastrowid
+            self._pair_ids[pair] = pair_id
+        return pair_id
+
+    def append(self, results: pd.DataFrame, timeframes: Dict, timestamp: Optional[datetime] = None) -> int:
+        """Append one cycle's ranked results table; returns the partition timestamp in ms"""
+        ts = int((timestamp.timestamp() if timestamp else time.time()) * 1000)
+
+        with self.lock:
+            pair_ids = [self._pair_id(pair) for pair in results['pair']]
+            scores = results['momentum_score'].astype(float).tolist()
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO scores (pair_id, ts, rank, momentum_score) VALUES (?, ?, ?, ?)",
+                [(pair_id, ts, rank, score) for rank, (pair_id, score) in enumerate(zip(pair_ids, scores), 1)]
+            )
+
+            placeholders = ', '.join('?' * (3 + len(INDICATOR_FIELDS)))
+            for tf in timeframes:
+                present = timeframe_present(results, tf)
+                if not present.any():
+                    continue
+                columns = [indicator_column(field, tf) for field in INDICATOR_FIELDS]
+                # Indicators a custom registry does not compute are stored as NULL
+                values = results.reindex(columns=columns).astype(float)
+                rows = [
+                    (pair_id, ts, tf, *row)
+                    for pair_id, row, keep in zip(pair_ids, values.itertuples(index=False, name=None), present)
+                    if keep
+                ]
+                self.conn.executemany(
+                    f"INSERT OR REPLACE INTO indicators (pair_id, ts, timeframe, {', '.join(INDICATOR_FIELDS)}) "
+                    f"VALUES ({placeholders})",
+                    rows
+                )
+
+            self.conn.execute("INSERT OR REPLACE INTO cycles (ts, pair_count) VALUES (?, ?)", (ts, len(pair_ids)))
+            self.conn.commit()
+        return ts
+
+    def score_history(self, pair: str, days: float = 7, include_indicators: bool = False) -> pd.DataFrame:
+        """Scores of one pair over the last `days`, oldest first, optionally with `<field>_<tf>` indicator columns"""
+        since = int((time.time() - days * 24 * 60 * 60) * 1000)
+        with self.lock:
+            pair_id = self._pair_ids.get(pair)
+            if pair_id is None:
+                return pd.DataFrame(columns=['ts', 'rank', 'momentum_score'])
+            history = pd.read_sql_query(
+                "SELECT ts, rank, momentum_score FROM scores WHERE pair_id = ? AND ts >= ? ORDER BY ts",
+                self.conn, params=(pair_id, since)
+            )
+            if include_indicators:
+                indicators = pd.read_sql_query(
+                    f"SELECT ts, timeframe, {', '.join(INDICATOR_FIELDS)} FROM indicators "
+                    "WHERE pair_id = ? AND ts >= ?",
+                    self.conn, params=(pair_id, since)
+                )
+
+        if include_indicators and len(indicators) > 0:
+            wide = indicators.pivot(index='ts', columns='timeframe', values=INDICATOR_FIELDS)
+            wide.columns = [indicator_column(field, tf) for field, tf in wide.columns]
+            history = history.merge(wide, left_on='ts', right_index=True, how='left')
+        history['ts'] = pd.to_datetime(history['ts'], unit='ms')
+        return history
+
+    def cycle_timestamps(self, days: Optional[float] = None) -> pd.Series:
+        since = 0 if days is None else int((time.time() - days * 24 * 60 * 60) * 1000)
+        with self.lock:
+            rows = self.conn.execute("SELECT ts FROM cycles WHERE ts >= ? ORDER BY ts", (since,)).fetchall()
+        return pd.to_datetime(pd.Series([ts for ts, in rows], dtype='int64'), unit='ms')
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
@@ -0,0 +1,208 @@
+import bisect
+import cProfile
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, List, Optional
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+LATENCY_BUCKETS = [0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0]
+
+def peak_rss_bytes() -> Optional[int]:
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is reported in bytes on macOS and in kilobytes elsewhere
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+class CycleMetrics:
+    """Timings and request counters of one analysis cycle; safe to update from worker threads"""
+
+    def __init__(self):
+        self.started_at = datetime.now()
+        self.start_wall = time.perf_counter()
+        self.stages: Dict[str, Dict[str, float]] = {}
+        self.latency_counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.latency_sum = 0.0
+        self.requests = 0
+        self.bytes_received = 0
+        self.statuses: Dict[str, int] = {}
+        self.counters: Dict[str, float] = {}
+        self.profiler: Optional[cProfile.Profile] = None
+        self.lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name: str):
+        """Wall time and CPU time of the calling thread spent inside the block, summed over calls"""
+        wall = time.perf_counter()
+        cpu = time.thread_time()
+        try:
+            yield
+        finally:
+            self.add_stage_time(name, time.perf_counter() - wall, time.thread_time() - cpu)
+
+    def add_stage_time(self, name: str, wall: float, cpu: float = 0.0):
+        with self.lock:
+            stage = self.stages.setdefault(name, {'wall_seconds': 0.0, 'cpu_seconds': 0.0, 'calls': 0})
+            stage['wall_seconds'] += wall
+            stage['cpu_seconds'] += cpu
+            stage['calls'] += 1
+
+    def observe_request(self, latency: float, nbytes: int, status: str):
+        with self.lock:
+            self.requests += 1
+            self.bytes_received += nbytes
+            self.latency_sum += latency
+            self.latency_counts[bisect.bisect_left(LATENCY_BUCKETS, latency)] += 1
+            self.statuses[status] = self.statuses.get(status, 0) + 1
+
+    def merge(self, snapshot: Dict):
+        """Add the stage times and request counts of another cycle's `to_dict()`, e.g. from a shard worker"""
+        with self.lock:
+            for name, stage in snapshot['stages'].items():
+                total = self.stages.setdefault(name, {'wall_seconds': 0.0, 'cpu_seconds': 0.0, 'calls': 0})
+                for key in total:
+                    total[key] += stage[key]
+            requests = snapshot['requests']
+            self.requests += requests['count']
+            self.bytes_received += requests['bytes_received']
+            self.latency_sum += requests['latency_seconds_sum']
+            for status, count in requests['statuses'].items():
+                self.statuses[status] = self.statuses.get(status, 0) + count
+            previous = 0
+            for i, cumulative in enumerate(requests['latency_seconds_buckets'].values()):
+                self.latency_counts[i] += cumulative - previous
+                previous = cumulative
+
+    def to_dict(self) -> Dict:
+        cumulative = 0
+        buckets = {}
+        for bound, count in zip(LATENCY_BUCKETS + ['+Inf'], self.latency_counts):
+            cumulative += count
+            buckets[str(bound)] = cumulative
+
+        return {
+            'started_at': self.started_at.isoformat(),
+            'total_wall_seconds': time.perf_counter() - self.start_wall,
+            'stages': self.stages,
+            'requests': {
+                'count': self.requests,
+                'bytes_received': self.bytes_received,
+                'statuses': self.statuses,
+                'latency_seconds_sum': self.latency_sum,
+                'latency_seconds_buckets': buckets
+            },
+            'counters': self.counters,
+            'peak_rss_bytes': peak_rss_bytes()
+        }
+
+
+def to_prometheus(snapshot: Dict, prefix: str = "crypto_momentum") -> str:
+    lines = [
+        f"# HELP {prefix}_cycle_wall_seconds Wall time of the last analysis cycle",
+        f"# TYPE {prefix}_cycle_wall_seconds gauge",
+        f"{prefix}_cycle_wall_seconds {snapshot['total_wall_seconds']}",
+        f"# HELP {prefix}_stage_wall_seconds Wall time per stage in the last cycle",
+        f"# TYPE {prefix}_stage_wall_seconds gauge"
+    ]
+    for name, stage in snapshot['stages'].items():
+        lines.append(f'{prefix}_stage_wall_seconds{{stage="{name}"}} {stage["wall_seconds"]}')
+    lines.append(f"# HELP {prefix}_stage_cpu_seconds CPU time of the thread(s) running each stage in the last cycle")
+    lines.append(f"# TYPE {prefix}_stage_cpu_seconds gauge")
+    for name, stage in snapshot['stages'].items():
+        lines.append(f'{prefix}_stage_cpu_seconds{{stage="{name}"}} {stage["cpu_seconds"]}')
+
+    requests = snapshot['requests']
+    lines.append(f"# HELP {prefix}_fetch_latency_seconds Exchange request latency in the last cycle")
+    lines.append(f"# TYPE {prefix}_fetch_latency_seconds histogram")
+    for bound, count in requests['latency_seconds_buckets'].items():
+        lines.append(f'{prefix}_fetch_latency_seconds_bucket{{le="{bound}"}} {count}')
+    lines.append(f"{prefix}_fetch_latency_seconds_sum {requests['latency_seconds_sum']}")
+    lines.append(f"{prefix}_fetch_latency_seconds_count {requests['count']}")
+
+    lines.append(f"# HELP {prefix}_requests Exchange responses by status in the last cycle")
+    lines.append(f"# TYPE {prefix}_requests gauge")
+    for status, count in requests['statuses'].items():
+        lines.append(f'{prefix}_requests{{status="{status}"}} {count}')
+    lines.append(f"# TYPE {prefix}_bytes_received gauge")
+    lines.append(f"{prefix}_bytes_received {requests['bytes_received']}")
+
+    lines.append(f"# TYPE {prefix}_fetch_events gauge")
+    for name, value in snapshot['counters'].items():
+        lines.append(f'{prefix}_fetch_events{{event="{name}"}} {value}')
+
+    if snapshot['peak_rss_bytes'] is not None:
+        lines.append(f"# TYPE {prefix}_peak_rss_bytes gauge")
+        lines.append(f"{prefix}_peak_rss_bytes {snapshot['peak_rss_bytes']}")
+    if 'tracemalloc_peak_bytes' in snapshot:
+        lines.append(f"# TYPE {prefix}_tracemalloc_peak_bytes gauge")
+        lines.append(f"{prefix}_tracemalloc_peak_bytes {snapshot['tracemalloc_peak_bytes']}")
+    return "\n".join(lines) + "\n"
+
+
+class MetricsRecorder:
+    """Creates per-cycle metrics and writes them as JSON lines plus a Prometheus textfile.
+
+    `profile` wraps each cycle in cProfile and dumps the stats next to the snapshots;
+    `trace_memory` records the cycle's peak traced allocation and top allocation sites.
+    """
+
+    def __init__(self, metrics_dir: str = "metrics", profile: bool = False, trace_memory: bool = False):
+        self.metrics_dir = metrics_dir
+        self.profile = profile
+        self.trace_memory = trace_memory
+
+    def _ensure_directory_exists(self):
+        if not os.path.exists(self.metrics_dir):
+            os.makedirs(self.metrics_dir)
+
+    def start_cycle(self) -> CycleMetrics:
+        if self.trace_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            elif hasattr(tracemalloc, 'reset_peak'):
+                tracemalloc.reset_peak()
+        cycle = CycleMetrics()
+        if self.profile:
+            cycle.profiler = cProfile.Profile()
+            cycle.profiler.enable()
+        return cycle
+
+    def _top_allocations(self, limit: int = 15) -> List[Dict]:
+        stats = tracemalloc.take_snapshot().statistics('lineno')[:limit]
+        return [{'location': str(stat.traceback), 'size_bytes': stat.size, 'count': stat.count} for stat in stats]
+
+    def finish_cycle(self, cycle: CycleMetrics) -> Dict:
+        snapshot = cycle.to_dict()
+        timestamp = cycle.started_at.strftime('%Y%m%d_%H%M%S')
+        self._ensure_directory_exists()
+
+        if cycle.profiler is not None:
+            cycle.profiler.disable()
+            profile_path = os.path.join(self.metrics_dir, f"profile_{timestamp}.prof")
+            cycle.profiler.dump_stats(profile_path)
+            snapshot['profile'] = profile_path
+            cycle.profiler = None
+        if self.trace_memory and tracemalloc.is_tracing():
+            snapshot['tracemalloc_peak_bytes'] = tracemalloc.get_traced_memory()[1]
+            snapshot['top_allocations'] = self._top_allocations()
+
+        with open(os.path.join(self.metrics_dir, "cycle_metrics.jsonl"), 'a') as f:
+            f.write(json.dumps(snapshot) + "\n")
+
+        # Write-then-rename so the textfile collector never reads a partial file
+        prom_path = os.path.join(self.metrics_dir, "crypto_momentum.prom")
+        with open(prom_path + ".tmp", 'w') as f:
+            f.write(to_prometheus(snapshot))
+        os.replace(prom_path + ".tmp", prom_path)
+
+        return snapshot
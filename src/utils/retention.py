@@ -0,0 +1,101 @@
+import os
+import re
+import time
+import zipfile
+from datetime import datetime, timedelta
+from typing import Iterable, Optional, Set
+
+# Folders whose files carry a `_YYYYMMDD_HHMMSS` timestamp before the extension
+ARTIFACT_DIRS = ('reports', 'visualizations', 'exports')
+TIMESTAMPED = re.compile(r'_(\d{8})_(\d{6})\.\w+$')
+ARCHIVE = re.compile(r'_\d{8}\.zip$')
+# Stored as the zip comment when an archive is created; the archive's age is counted from it
+CREATED = re.compile(rb'^created=(\d+(?:\.\d+)?)$')
+
+class ArtifactRetention:
+    """Compacts old timestamped artifacts into one zip per folder and day, and drops old archives.
+
+    Files older than `compact_after_days` move into `<archive_dir>/<folder>_<YYYYMMDD>.zip`; archives
+    created more than `keep_days` ago are deleted (None keeps them forever), but never in the pass that
+    wrote to them. A pass runs at most once per `interval` seconds.
+    """
+
+    def __init__(self, directories: Iterable[str] = ARTIFACT_DIRS, archive_dir: str = "archive",
+                 compact_after_days: float = 1.0, keep_days: Optional[float] = 30.0, interval: float = 3600.0):
+        self.directories = list(directories)
+        self.archive_dir = archive_dir
+        self.compact_after_days = compact_after_days
+        self.keep_days = keep_days
+        self.interval = interval
+        self.last_run = 0.0
+
+    def _ensure_directory_exists(self):
+        if not os.path.exists(self.archive_dir):
+            os.makedirs(self.archive_dir)
+
+    def compact(self, now: datetime, written: Optional[Set[str]] = None) -> int:
+        """Archive old artifacts; the archives written to are added to `written`"""
+        cutoff = now - timedelta(days=self.compact_after_days)
+        compacted = 0
+        for directory in self.directories:
+            if not os.path.isdir(directory):
+                continue
+            by_day = {}
+            for name in os.listdir(directory):
+                match = TIMESTAMPED.search(name)
+                if match and datetime.strptime(match.group(1) + match.group(2), '%Y%m%d%H%M%S') < cutoff:
+                    by_day.setdefault(match.group(1), []).append(name)
+
+            for day, names in sorted(by_day.items()):
+                self._ensure_directory_exists()
+                archive_path = os.path.join(self.archive_dir, f"{os.path.basename(directory)}_{day}.zip")
+                with zipfile.ZipFile(archive_path, 'a', compression=zipfile.ZIP_DEFLATED) as archive:
+                    if not CREATED.match(archive.comment):
+                        archive.comment = f"created={now.timestamp()}".encode()
+                    archived = set(archive.namelist())
+                    for name in sorted(names):
+                        # A pass interrupted between archiving and removing a file leaves it in both places
+                        if name not in archived:
+                            archive.write(os.path.join(directory, name), arcname=name)
+                for name in names:
+                    os.remove(os.path.join(directory, name))
+                compacted += len(names)
+                if written is not None:
+                    written.add(archive_path)
+        return compacted
+
+    @staticmethod
+    def created_at(archive_path: str) -> float:
+        """When the archive was created, from its comment; archives without one fall back to their mtime"""
+        try:
+            with zipfile.ZipFile(archive_path) as archive:
+                match = CREATED.match(archive.comment)
+        except zipfile.BadZipFile:
+            match = None
+        return float(match.group(1)) if match else os.path.getmtime(archive_path)
+
+    def prune(self, now: datetime, written: Optional[Set[str]] = None) -> int:
+        """Delete archives created more than `keep_days` ago, except those in `written`"""
+        if self.keep_days is None or not os.path.isdir(self.archive_dir):
+            return 0
+        cutoff = (now - timedelta(days=self.keep_days)).timestamp()
+        pruned = 0
+        for name in os.listdir(self.archive_dir):
+            path = os.path.join(self.archive_dir, name)
+            if not ARCHIVE.search(name) or (written and path in written):
+                continue
+            if self.created_at(path) < cutoff:
+                os.remove(path)
+                pruned += 1
+        return pruned
+
+    def run(self, now: Optional[datetime] = None, force: bool = False):
+        if not force and time.time() - self.last_run < self.interval:
+            return
+        self.last_run = time.time()
+        now = now or datetime.now()
+        written = set()
+        compacted = self.compact(now, written)
+        pruned = self.prune(now, written)
+        if compacted or pruned:
+            print(f"Retention: archived {compacted} artifacts into '{self.archive_dir}', removed {pruned} old archives")
@@ -1,163 +1,287 @@
+import asyncio
+import matplotlib
+matplotlib.use('Agg')
 import matplotlib.pyplot as plt
+import multiprocessing
 import numpy as np
+import pandas as pd
 import os
+from concurrent.futures import Executor, ProcessPoolExecutor
 from datetime import datetime
-from typing import List, Dict
+from typing import Dict, List, Optional, Tuple
+from .render_presets import RENDER_PRESETS, check_preset
+from .results_table import indicator_column
 
-plt.style.use('seaborn-v0_8-darkgrid')
+CHART_STYLE = 'seaborn-v0_8-darkgrid'
+
+def _save_figure(path: str, preset: Dict):
+    plt.savefig(f"{path}.{preset['format']}", dpi=preset['dpi'], bbox_inches=preset['bbox_inches'])
+    plt.close('all')
+
+def plot_momentum_score_rankings(chart_data: Dict, path: str, preset: Dict):
+    """Momentum Score Distribution"""
+    scores = chart_data['scores']
+    plt.figure(figsize=(12, 8))
+    colors = ['red' if s < 0.4 else 'orange' if s < 0.6 else 'green' for s in scores]
+    bars = plt.bar(range(len(scores)), scores, color=colors, alpha=0.7)
+    plt.title('Momentum Score Rankings', fontsize=16, fontweight='bold')
+    plt.xlabel('Trading Pairs (Ranked)')
+    plt.ylabel('Momentum Score')
+    plt.axhline(y=0.6, color='green', linestyle='--', alpha=0.7, label='Bullish Threshold')
+    plt.axhline(y=0.4, color='red', linestyle='--', alpha=0.7, label='Bearish Threshold')
+    plt.legend()
+    plt.grid(True, alpha=0.3)
+    plt.tight_layout()
+    _save_figure(path, preset)
+
+def plot_rsi_analysis(chart_data: Dict, path: str, preset: Dict):
+    """RSI Analysis for all timeframes"""
+    scores = chart_data['scores']
+    timeframe_data = chart_data['timeframe_data']
+    fig, axes = plt.subplots(2, 3, figsize=(18, 12))
+    axes = axes.flatten()
+
+    for i, (tf, data) in enumerate(timeframe_data.items()):
+        if i < len(axes):
+            scatter_colors = ['red' if s < 0.4 else 'orange' if s < 0.6 else 'green' for s in scores]
+            axes[i].scatter(data['rsi'], scores, c=scatter_colors, alpha=0.6, s=30)
+            axes[i].axvline(x=50, color='blue', linestyle='--', alpha=0.5, label='RSI 50')
+            axes[i].axvline(x=70, color='orange', linestyle='--', alpha=0.5, label='RSI 70')
+            axes[i].axhline(y=0.6, color='green', linestyle='--', alpha=0.5, label='Bullish Score')
+            axes[i].set_title(f'RSI Analysis - {tf}min' if tf != '1D' else 'RSI Analysis - Daily')
+            axes[i].set_xlabel('RSI (14-period)')
+            axes[i].set_ylabel('Momentum Score')
+            axes[i].legend()
+            axes[i].grid(True, alpha=0.3)
+
+    if len(timeframe_data) < len(axes):
+        fig.delaxes(axes[-1])
+
+    plt.tight_layout()
+    _save_figure(path, preset)
+
+def plot_volume_analysis(chart_data: Dict, path: str, preset: Dict):
+    """Volume Analysis for all timeframes"""
+    scores = chart_data['scores']
+    timeframe_data = chart_data['timeframe_data']
+    fig, axes = plt.subplots(2, 3, figsize=(18, 12))
+    axes = axes.flatten()
+
+    for i, (tf, data) in enumerate(timeframe_data.items()):
+        if i < len(axes):
+            volume_colors = ['lightcoral' if v < 1.5 else 'lightgreen' for v in data['volume']]
+            axes[i].scatter(data['volume'], scores, c=volume_colors, alpha=0.6, s=30)
+            axes[i].axvline(x=1.5, color='red', linestyle='--', alpha=0.7, label='High Volume Threshold(1.5x)')
+            axes[i].set_title(f'Volume Analysis - {tf}min' if tf != '1D' else 'Volume Analysis - Daily')
+            axes[i].set_xlabel('Volume Ratio (Recent/Average)')
+            axes[i].set_ylabel('Momentum Score')
+            axes[i].legend()
+            axes[i].grid(True, alpha=0.3)
+
+    if len(timeframe_data) < len(axes):
+        fig.delaxes(axes[-1])
+
+    plt.tight_layout()
+    _save_figure(path, preset)
+
+def plot_score_distribution(chart_data: Dict, path: str, preset: Dict):
+    """Score Distribution Histogram"""
+    scores = chart_data['scores']
+    plt.figure(figsize=(10, 6))
+    plt.hist(scores, bins=30, color='skyblue', alpha=0.7, edgecolor='black')
+    plt.axvline(x=np.mean(scores), color='red', linestyle='-', linewidth=2, label=f'Mean: {np.mean(scores):.3f}')
+    plt.axvline(x=np.median(scores), color='green', linestyle='-', linewidth=2, label=f'Median: {np.median(scores):.3f}')
+    plt.title('Momentum Score Distribution', fontsize=16, fontweight='bold')
+    plt.xlabel('Momentum Score')
+    plt.ylabel('Frequency')
+    plt.legend()
+    plt.grid(True, alpha=0.3)
+    plt.tight_layout()
+    _save_figure(path, preset)
+
+def plot_top_performers(chart_data: Dict, path: str, preset: Dict):
+    """Top 20 Performers"""
+    scores = chart_data['scores']
+    pairs = chart_data['pairs']
+    plt.figure(figsize=(12, 10))
+    top_20_pairs = pairs[:20]
+    top_20_scores = scores[:20]
+    colors_top20 = plt.cm.RdYlGn([s for s in top_20_scores])
+
+    bars = plt.barh(range(len(top_20_pairs)), top_20_scores, color=colors_top20)
+    plt.yticks(range(len(top_20_pairs)), top_20_pairs)
+    plt.title('Top 20 Momentum Leaders', fontsize=16, fontweight='bold')
+    plt.xlabel('Momentum Score')
+    plt.grid(True, alpha=0.3)
+
+    for i, (bar, score) in enumerate(zip(bars, top_20_scores)):
+        plt.text(bar.get_width() + 0.01, bar.get_y() + bar.get_height()/2, 
+                f'{score:.3f}', va='center', fontweight='bold')
+
+    plt.tight_layout()
+    _save_figure(path, preset)
+
+def plot_market_sentiment(chart_data: Dict, path: str, preset: Dict):
+    """Market Sentiment Pie Chart"""
+    scores = chart_data['scores']
+    plt.figure(figsize=(8, 8))
+    bullish_count = sum(1 for s in scores if s > 0.6)
+    neutral_count = sum(1 for s in scores if 0.4 <= s <= 0.6)
+    bearish_count = sum(1 for s in scores if s < 0.4)
+
+    sizes = [bullish_count, neutral_count, bearish_count]
+    labels = ['Bullish', 'Neutral', 'Bearish']
+    colors = ['green', 'orange', 'red']
+    explode = (0.1, 0, 0)
+
+    plt.pie(sizes, explode=explode, labels=labels, colors=colors, autopct='%1.1f%%',
+            shadow=True, startangle=90)
+    plt.title('Market Sentiment Distribution', fontsize=16, fontweight='bold')
+    plt.tight_layout()
+    _save_figure(path, preset)
+
+CHARTS = [
+    ('momentum_score_rankings', plot_momentum_score_rankings),
+    ('rsi_analysis_all_timeframes', plot_rsi_analysis),
+    ('volume_analysis_all_timeframes', plot_volume_analysis),
+    ('score_distribution', plot_score_distribution),
+    ('top_performers', plot_top_performers),
+    ('market_sentiment', plot_market_sentiment)
+]
+
+# What each chart is drawn from, in ChangeTracker.stale terms; the rest plot the whole table
+CHART_INPUTS = {'top_performers': 20, 'market_sentiment': 'sentiment'}
+
+def render_chart(plot_func, chart_data: Dict, path: str, preset: Dict) -> str:
+    # Applied per chart rather than at import, so importing this module leaves global pyplot state alone
+    with plt.style.context(CHART_STYLE):
+        plot_func(chart_data, path, preset)
+    return path
 
 class Visualizer:
-    def __init__(self):
+    def __init__(self, preset: str = 'full', max_workers: Optional[int] = None):
         self.visualizations_dir = "visualizations"
-        self._ensure_directory_exists()
+        self.preset = check_preset(preset)
+        # One chart per worker; 0 renders in-process
+        self.max_workers = max_workers if max_workers is not None else min(len(CHARTS), os.cpu_count() or 1)
+        self.pool: Optional[Executor] = None
     
     def _ensure_directory_exists(self):
         if not os.path.exists(self.visualizations_dir):
             os.makedirs(self.visualizations_dir)
     
-    def create_visualizations(self, results: List[Dict], timeframes: Dict):
-        if not results:
-            return
-        
+    def _get_pool(self) -> Optional[Executor]:
+        if self.max_workers <= 1:
+            return None
+        if self.pool is None:
+            # Spawned workers do not inherit the analyzer's threads or event loop
+            self.pool = ProcessPoolExecutor(max_workers=self.max_workers,
+                                            mp_context=multiprocessing.get_context('spawn'))
+        return self.pool
+    
+    @staticmethod
+    def _indicator_values(results: pd.DataFrame, field: str, timeframe: str, default: float) -> list:
+        column = indicator_column(field, timeframe)
+        if column not in results:
+            return [default] * len(results)
+        return results[column].fillna(default).tolist()
+    
+    def _chart_jobs(self, results: pd.DataFrame, timeframes: Dict,
+                    charts: Optional[List[str]] = None) -> Tuple[str, List]:
+        self._ensure_directory_exists()
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
         
-        pairs = [r['pair'].replace('B-', '').replace('_USDT', '') for r in results]
-        scores = [r['momentum_score'] for r in results]
+        pairs = results['pair'].str.replace('B-', '', regex=False).str.replace('_USDT', '', regex=False).tolist()
+        scores = results['momentum_score'].tolist()
         
         timeframe_data = {}
         for tf in timeframes.keys():
-            rsi_data = []
-            volume_data = []
-            price_change_data = []
-            
-            for result in results:
-                if tf in result['timeframe_data'] and result['timeframe_data'][tf]['indicators']:
-                    indicators = result['timeframe_data'][tf]['indicators']
-                    rsi_data.append(indicators.get('rsi', 50))
-                    volume_data.append(indicators.get('volume_ratio', 1))
-                    price_change_data.append(indicators.get('price_change', 0))
-                else:
-                    rsi_data.append(50)
-                    volume_data.append(1)
-                    price_change_data.append(0)
-            
             timeframe_data[tf] = {
-                'rsi': rsi_data,
-                'volume': volume_data,
-                'price_change': price_change_data
+                'rsi': self._indicator_values(results, 'rsi', tf, 50),
+                'volume': self._indicator_values(results, 'volume_ratio', tf, 1),
+                'price_change': self._indicator_values(results, 'price_change', tf, 0)
             }
         
-        # 1. Momentum Score Distribution
-        plt.figure(figsize=(12, 8))
-        colors = ['red' if s < 0.4 else 'orange' if s < 0.6 else 'green' for s in scores]
-        bars = plt.bar(range(len(scores)), scores, color=colors, alpha=0.7)
-        plt.title('Momentum Score Rankings', fontsize=16, fontweight='bold')
-        plt.xlabel('Trading Pairs (Ranked)')
-        plt.ylabel('Momentum Score')
-        plt.axhline(y=0.6, color='green', linestyle='--', alpha=0.7, label='Bullish Threshold')
-        plt.axhline(y=0.4, color='red', linestyle='--', alpha=0.7, label='Bearish Threshold')
-        plt.legend()
-        plt.grid(True, alpha=0.3)
-        plt.tight_layout()
-        plt.savefig(os.path.join(self.visualizations_dir, f'momentum_score_rankings_{timestamp}.png'), dpi=300, bbox_inches='tight')
-        plt.close()
-        
-        # 2. RSI Analysis for all timeframes
-        fig, axes = plt.subplots(2, 3, figsize=(18, 12))
-        axes = axes.flatten()
-        
-        for i, (tf, data) in enumerate(timeframe_data.items()):
-            if i < len(axes):
-                scatter_colors = ['red' if s < 0.4 else 'orange' if s < 0.6 else 'green' for s in scores]
-                axes[i].scatter(data['rsi'], scores, c=scatter_colors, alpha=0.6, s=30)
-                axes[i].axvline(x=50, color='blue', linestyle='--', alpha=0.5, label='RSI 50')
-                axes[i].axvline(x=70, color='orange', linestyle='--', alpha=0.5, label='RSI 70')
-                axes[i].axhline(y=0.6, color='green', linestyle='--', alpha=0.5, label='Bullish Score')
-                axes[i].set_title(f'RSI Analysis - {tf}min' if tf != '1D' else 'RSI Analysis - Daily')
-                axes[i].set_xlabel('RSI (14-period)')
-                axes[i].set_ylabel('Momentum Score')
-                axes[i].legend()
-                axes[i].grid(True, alpha=0.3)
-        
-        if len(timeframe_data) < len(axes):
-            fig.delaxes(axes[-1])
-        
-        plt.tight_layout()
-        plt.savefig(os.path.join(self.visualizations_dir, f'rsi_analysis_all_timeframes_{timestamp}.png'), dpi=300, bbox_inches='tight')
-        plt.close()
-        
-        # 3. Volume Analysis for all timeframes
-        fig, axes = plt.subplots(2, 3, figsize=(18, 12))
-        axes = axes.flatten()
-        
-        for i, (tf, data) in enumerate(timeframe_data.items()):
-            if i < len(axes):
-                volume_colors = ['lightcoral' if v < 1.5 else 'lightgreen' for v in data['volume']]
-                axes[i].scatter(data['volume'], scores, c=volume_colors, alpha=0.6, s=30)
-                axes[i].axvline(x=1.5, color='red', linestyle='--', alpha=0.7, label='High Volume Threshold(1.5x)')
-                axes[i].set_title(f'Volume Analysis - {tf}min' if tf != '1D' else 'Volume Analysis - Daily')
-                axes[i].set_xlabel('Volume Ratio (Recent/Average)')
-                axes[i].set_ylabel('Momentum Score')
-                axes[i].legend()
-                axes[i].grid(True, alpha=0.3)
-        
-        if len(timeframe_data) < len(axes):
-            fig.delaxes(axes[-1])
-        
-        plt.tight_layout()
-        plt.savefig(os.path.join(self.visualizations_dir, f'volume_analysis_all_timeframes_{timestamp}.png'), dpi=300, bbox_inches='tight')
-        plt.close()
-        
-        # 4. Score Distribution Histogram
-        plt.figure(figsize=(10, 6))
-        plt.hist(scores, bins=30, color='skyblue', alpha=0.7, edgecolor='black')
-        plt.axvline(x=np.mean(scores), color='red', linestyle='-', linewidth=2, label=f'Mean: {np.mean(scores):.3f}')
-        plt.axvline(x=np.median(scores), color='green', linestyle='-', linewidth=2, label=f'Median: {np.median(scores):.3f}')
-        plt.title('Momentum Score Distribution', fontsize=16, fontweight='bold')
-        plt.xlabel('Momentum Score')
-        plt.ylabel('Frequency')
-        plt.legend()
-        plt.grid(True, alpha=0.3)
-        plt.tight_layout()
-        plt.savefig(os.path.join(self.visualizations_dir, f'score_distribution_{timestamp}.png'), dpi=300, bbox_inches='tight')
-        plt.close()
-        
-        # 5. Top 20 Performers
-        plt.figure(figsize=(12, 10))
-        top_20_pairs = pairs[:20]
-        top_20_scores = scores[:20]
-        colors_top20 = plt.cm.RdYlGn([s for s in top_20_scores])
-        
-        bars = plt.barh(range(len(top_20_pairs)), top_20_scores, color=colors_top20)
-        plt.yticks(range(len(top_20_pairs)), top_20_pairs)
-        plt.title('Top 20 Momentum Leaders', fontsize=16, fontweight='bold')
-        plt.xlabel('Momentum Score')
-        plt.grid(True, alpha=0.3)
-        
-        for i, (bar, score) in enumerate(zip(bars, top_20_scores)):
-            plt.text(bar.get_width() + 0.01, bar.get_y() + bar.get_height()/2, 
-                    f'{score:.3f}', va='center', fontweight='bold')
+        # Each worker only receives the columns its chart draws
+        chart_inputs = {
+            'rsi_analysis_all_timeframes': {'scores': scores, 'timeframe_data': timeframe_data},
+            'volume_analysis_all_timeframes': {'scores': scores, 'timeframe_data': timeframe_data},
+            'top_performers': {'scores': scores[:20], 'pairs': pairs[:20]}
+        }
+        preset = RENDER_PRESETS[self.preset]
+        jobs = [
+            (plot_func, chart_inputs.get(name, {'scores': scores}),
+             os.path.join(self.visualizations_dir, f'{name}_{timestamp}'), preset)
+            for name, plot_func in CHARTS if charts is None or name in charts
+        ]
+        return timestamp, jobs
+    
+    @staticmethod
+    def _render_serial(jobs: List):
+        for job in jobs:
+            render_chart(*job)
+    
+    @staticmethod
+    def _render_each(jobs: List) -> List:
+        """Render jobs one by one, returning each one's path or the exception it raised"""
+        outcomes = []
+        for job in jobs:
+            try:
+                outcomes.append(render_chart(*job))
+            except Exception as e:
+                outcomes.append(e)
+        return outcomes
+    
+    def create_visualizations(self, results: pd.DataFrame, timeframes: Dict, charts: Optional[List[str]] = None):
+        """Render the charts named in `charts`, or all of them"""
+        if results is None or len(results) == 0:
+            return
         
-        plt.tight_layout()
-        plt.savefig(os.path.join(self.visualizations_dir, f'top_performers_{timestamp}.png'), dpi=300, bbox_inches='tight')
-        plt.close()
+        timestamp, jobs = self._chart_jobs(results, timeframes, charts)
+        pool = self._get_pool()
+        if pool is None:
+            self._render_serial(jobs)
+        else:
+            for future in [pool.submit(render_chart, *job) for job in jobs]:
+                future.result()
         
-        # 6. Market Sentiment Pie Chart
-        plt.figure(figsize=(8, 8))
-        bullish_count = sum(1 for s in scores if s > 0.6)
-        neutral_count = sum(1 for s in scores if 0.4 <= s <= 0.6)
-        bearish_count = sum(1 for s in scores if s < 0.4)
+        print(f"Visualizations saved in '{self.visualizations_dir}' directory with timestamp {timestamp}")
+    
+    async def create_visualizations_async(self, results: pd.DataFrame, timeframes: Dict,
+                                          charts: Optional[List[str]] = None) -> List[str]:
+        """Render charts without blocking the event loop and return the names of those saved.
         
-        sizes = [bullish_count, neutral_count, bearish_count]
-        labels = ['Bullish', 'Neutral', 'Bearish']
-        colors = ['green', 'orange', 'red']
-        explode = (0.1, 0, 0)
+        Rendering errors are reported, not raised; a chart that failed is left out of the returned names.
+        """
+        if results is None or len(results) == 0:
+            return []
         
-        plt.pie(sizes, explode=explode, labels=labels, colors=colors, autopct='%1.1f%%',
-                shadow=True, startangle=90)
-        plt.title('Market Sentiment Distribution', fontsize=16, fontweight='bold')
-        plt.tight_layout()
-        plt.savefig(os.path.join(self.visualizations_dir, f'market_sentiment_{timestamp}.png'), dpi=300, bbox_inches='tight')
-        plt.close()
+        names = [name for name, _ in CHARTS if charts is None or name in charts]
+        try:
+            timestamp, jobs = self._chart_jobs(results, timeframes, charts)
+            loop = asyncio.get_running_loop()
+            pool = self._get_pool()
+            if pool is None:
+                # pyplot is not thread-safe, so the in-process fallback renders on a single thread
+                outcomes = await loop.run_in_executor(None, self._render_each, jobs)
+            else:
+                outcomes = await asyncio.gather(*[loop.run_in_executor(pool, render_chart, *job) for job in jobs],
+                                                return_exceptions=True)
+        except Exception as e:
+            print(f"Error rendering visualizations: {str(e)}")
+            return []
         
-        print(f"Visualizations saved in '{self.visualizations_dir}' directory with timestamp {timestamp}")
\ No newline at end of file
+        saved = []
+        for name, outcome in zip(names, outcomes):
+            if isinstance(outcome, Exception):
+                print(f"Error rendering {name}: {str(outcome)}")
+            else:
+                saved.append(name)
+        if saved:
+            print(f"Visualizations saved in '{self.visualizations_dir}' directory with timestamp {timestamp}")
+        return saved
+    
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown(wait=True)
+            self.pool = None